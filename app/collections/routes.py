@@ -5,10 +5,12 @@ Rutas de Cobranzas (Collections).
 Endpoints para reportes de cuentas por cobrar.
 """
 
+from datetime import date
 from flask import request, jsonify, current_app
 from app.collections import collections_bp
 from app.collections.services import CollectionsService
 from app.core.odoo import OdooRepository
+from app.core.currency import CurrencyRateTable
 from app import cache
 
 
@@ -96,6 +98,9 @@ def report_account12():
             include_reconciled=include_reconciled
         )
 
+        # Tasas de cambio del día (en caché por proceso, sin RPC por request)
+        rate_table = CurrencyRateTable.for_repository(odoo_repo)
+
         def _summarize(rows):
             overall = {
                 'debit': 0.0,
@@ -104,9 +109,12 @@ def report_account12():
                 'paid_after_cutoff': 0.0,
                 'saldo': 0.0,
                 'overdue_amount': 0.0,
+                'pending_cutoff_company': 0.0,
+                'overdue_amount_company': 0.0,
                 'count': 0
             }
             accounts = {}
+            pendings = []
             for row in rows:
                 acc = row.get('account_id/code') or 'N/A'
                 acc_name = row.get('account_id/name') or ''
@@ -121,6 +129,8 @@ def report_account12():
                 paid_after = float(row.get('paid_after_cutoff', 0.0) or 0.0)
                 dias_vencido = int(row.get('dias_vencido', 0) or 0)
 
+                pendings.append((acc, pending, row.get('currency_id') or '', dias_vencido > 0))
+
                 overall['debit'] += debit
                 overall['credit'] += credit
                 overall['pending_cutoff'] += pending
@@ -139,6 +149,8 @@ def report_account12():
                         'paid_after_cutoff': 0.0,
                         'saldo': 0.0,
                         'overdue_amount': 0.0,
+                        'pending_cutoff_company': 0.0,
+                        'overdue_amount_company': 0.0,
                         'count': 0
                     }
                 accounts[acc]['debit'] += debit
@@ -153,11 +165,33 @@ def report_account12():
                 acc_data['saldo'] = acc_data['debit'] - acc_data['credit']
             overall['saldo'] = overall['debit'] - overall['credit']
 
+            # Consolidado en moneda de la compañía: sin corte el pendiente es
+            # amount_residual_with_retention (moneda del documento); con corte
+            # es el residual histórico de la línea, ya en moneda de la compañía.
+            company_currency = rate_table.company_currency if rate_table else 'PEN'
+            amounts = [p[1] for p in pendings]
+            if rate_table and not cutoff_date:
+                amounts = rate_table.to_company_many(amounts, [p[2] for p in pendings], date.today())
+            currencies = {}
+            for (acc, pending, currency, overdue), amount in zip(pendings, amounts):
+                overall['pending_cutoff_company'] += amount
+                accounts[acc]['pending_cutoff_company'] += amount
+                if overdue:
+                    overall['overdue_amount_company'] += amount
+                    accounts[acc]['overdue_amount_company'] += amount
+                currency = currency or company_currency
+                if currency not in currencies:
+                    currencies[currency] = {'currency': currency, 'count': 0, 'pending_cutoff_company': 0.0}
+                currencies[currency]['count'] += 1
+                currencies[currency]['pending_cutoff_company'] += amount
+
             by_account = list(accounts.values())
             by_account.sort(key=lambda x: x['account_code'])
             return {
                 'overall': overall,
-                'by_account': by_account
+                'by_account': by_account,
+                'by_currency': sorted(currencies.values(), key=lambda x: x['currency']),
+                'company_currency': company_currency
             }
 
         summary = _summarize(data)
@@ -391,6 +425,46 @@ def filter_options():
         }), 500
 
 
+@collections_bp.route('/customers/search', methods=['GET'])
+def search_customers():
+    """
+    Endpoint de autocompletado para el filtro de clientes.
+    
+    Query Parameters:
+        - q (str): Texto a buscar (sin distinguir mayúsculas ni tildes)
+        - limit (int, optional): Máximo de resultados (default: 20)
+    
+    Response (JSON):
+        {
+            "success": true,
+            "data": [{"id": 1, "name": "...", "vat": "..."}, ...]
+        }
+    """
+    try:
+        query = (request.args.get('q') or '').strip()
+        limit = min(request.args.get('limit', type=int, default=20), 100)
+        
+        if not query:
+            return jsonify({'success': True, 'data': [], 'count': 0}), 200
+        
+        odoo_repo = _get_odoo_repository()
+        collections_service = CollectionsService(odoo_repo)
+        data = collections_service.search_customers(query, limit=limit)
+        
+        return jsonify({
+            'success': True,
+            'data': data,
+            'count': len(data)
+        }), 200
+        
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error en búsqueda de clientes: {str(e)}',
+            'data': []
+        }), 500
+
+
 @collections_bp.route('/report/account12/rows', methods=['GET'])
 @cache.cached(timeout=300, query_string=True)
 def report_account12_rows():
@@ -509,6 +583,7 @@ def status():
             '/report/national',
             '/report/international',
             '/filter-options',
+            '/customers/search',
             '/status'
         ]
     }), 200
@@ -10,12 +10,24 @@ import os
 from datetime import datetime
 from concurrent.futures import ThreadPoolExecutor
 from app.core.calculators import calcular_mora, calcular_dias_vencido, clasificar_antiguedad
+from app.core.accounts import AccountCodeResolver
+from app.core.partners import PartnerSearchIndex
+from app.core.report_cache import ReportDatasetCache
+from app.core.snapshots import ReportSnapshotStore
 
 
 class CollectionsService:
     """
     Servicio para generar reportes de cuentas por cobrar.
     """
+
+    # Columnas de un corte que siguen cambiando después del cierre (pagos
+    # posteriores, estado y residual actual): no se congelan en el snapshot
+    SNAPSHOT_LIVE_FIELDS = (
+        'payment_state', 'amount_residual_with_retention', 'amount_residual_signed',
+        'amount_residual_currency', 'amount_residual_historical', 'paid_after_cutoff',
+        'reconciliation_date', 'paid_before_cutoff',
+    )
     
     def __init__(self, odoo_repository):
         """
@@ -142,6 +154,22 @@ class CollectionsService:
         
         return internacional_lines
     
+    def search_customers(self, text, limit=20):
+        """
+        Autocompletado de clientes para el filtro de reportes.
+        
+        Args:
+            text (str): Texto ingresado por el usuario
+            limit (int): Máximo de resultados
+        
+        Returns:
+            list: [{'id', 'name', 'vat'}, ...]
+        """
+        if not self.repository.is_connected():
+            return []
+        index = PartnerSearchIndex.for_repository(self.repository)
+        return index.search(text, limit=limit, rank_field='customer_rank')
+    
     def _build_report_domain(self, start_date=None, end_date=None, customer=None,
                             account_codes=None, sales_channel_id=None, doc_type_id=None,
                             cutoff_date=None, include_reconciled=False):
@@ -172,29 +200,11 @@ class CollectionsService:
             ('move_id.move_type', 'in', ['out_invoice', 'out_refund', 'out_bill', 'entry']),
         ]
         
-        # Construir OR para códigos de cuenta
-        if len(codes) > 1:
-            or_operators = ['|'] * (len(codes) - 1)
-            code_conditions = []
-            for code in codes:
-                # Si el usuario pasa un código "completo" (ej: 1312001), hacemos match exacto.
-                # Si pasa un prefijo (ej: 13, 1312), usamos prefijo.
-                is_exact = code.isdigit() and len(code) >= 6
-                if is_exact:
-                    code_conditions.append(('account_id.code', '=', code))
-                else:
-                    code_conditions.append(('account_id.code', '=like', f'{code}%'))
-            domain = or_operators + code_conditions + domain
-        else:
-            code0 = codes[0]
-            is_exact = code0.isdigit() and len(code0) >= 6
-            if is_exact:
-                domain.insert(0, ('account_id.code', '=', code0))
-            else:
-                domain.insert(0, ('account_id.code', '=like', f'{code0}%'))
-        
-        # Excluir cuenta específica de letras
-        domain.append(('account_id.code', '!=', '1239001'))
+        # Cuentas resueltas a IDs (account_id in [...]), excluyendo la cuenta de letras
+        account_domain = AccountCodeResolver(self.repository).build_domain(
+            codes, excluded_codes=['1239001']
+        )
+        domain = account_domain + domain
         
         # Filtros adicionales / histórico
         if cutoff_date:
@@ -207,7 +217,8 @@ class CollectionsService:
             if not include_reconciled:
                 domain.append(('reconciled', '=', False))
         if customer:
-            domain.append(('partner_id.name', 'ilike', customer))
+            # Resuelve el texto a partner_id in [...] con el índice local de socios
+            domain += PartnerSearchIndex.for_repository(self.repository).build_domain(customer)
         if sales_channel_id:
             domain.append(('move_id.sales_channel_id', '=', sales_channel_id))
             if doc_type_id:
@@ -273,6 +284,16 @@ class CollectionsService:
         
         return nacional_lines
     
+    @staticmethod
+    def get_cached_report_lines(**filters):
+        """
+        Filas de get_report_lines en caché para los mismos argumentos, sin consultar Odoo.
+
+        Returns:
+            list: Líneas de reporte CxC o None si no están en caché
+        """
+        return ReportDatasetCache.get('cxc', filters)
+
     def get_report_lines(self, start_date=None, end_date=None, customer=None, limit=0,
                          account_codes=None, sales_channel_id=None, doc_type_id=None,
                          cutoff_date=None, include_reconciled=False):
@@ -298,6 +319,44 @@ class CollectionsService:
                 print("[ERROR] No hay conexión a Odoo disponible")
                 return []
             
+            # Mismo reporte recién calculado (p.ej. la vista antes de exportar)
+            dataset_filters = {
+                'start_date': start_date,
+                'end_date': end_date,
+                'customer': customer,
+                'limit': limit,
+                'account_codes': account_codes,
+                'sales_channel_id': sales_channel_id,
+                'doc_type_id': doc_type_id,
+                'cutoff_date': cutoff_date,
+                'include_reconciled': include_reconciled,
+            }
+            cached_rows = ReportDatasetCache.get('cxc', dataset_filters)
+            if cached_rows is not None:
+                return cached_rows
+            
+            # Cortes de períodos cerrados: servir desde snapshot congelado
+            snapshot_store = None
+            snapshot_filters = None
+            lock_date = None
+            if cutoff_date:
+                store = ReportSnapshotStore()
+                lock_date = store.closed_lock_date(self.repository, cutoff_date)
+                if lock_date:
+                    snapshot_store = store
+                    snapshot_filters = {
+                        'customer': customer,
+                        'limit': limit,
+                        'account_codes': account_codes,
+                        'sales_channel_id': sales_channel_id,
+                        'doc_type_id': doc_type_id,
+                        'include_reconciled': include_reconciled,
+                    }
+                    cached_rows = snapshot_store.load('cxc', cutoff_date, snapshot_filters, lock_date)
+                    if cached_rows is not None:
+                        rows = self._join_live_columns(cached_rows, cutoff_date, include_reconciled)
+                        return self._refresh_aging(rows)
+            
             line_domain = self._build_report_domain(
                 start_date=start_date,
                 end_date=end_date,
@@ -423,6 +482,8 @@ class CollectionsService:
             
             # Combinar datos
             rows = []
+            snapshot_rows = []
+            row_line_ids = []
             today = datetime.today().date()
             
             def m2o_name(val):
@@ -473,8 +534,12 @@ class CollectionsService:
                 paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
                 paid_before_cutoff = float(rec_info.get('paid_before', 0.0) or 0.0)
 
-                if cutoff_date and reconcile_date and reconcile_date <= cutoff_date and not include_reconciled:
-                    # Estaba pagado antes del corte y no queremos mostrar conciliados
+                # Estaba pagado antes del corte y no queremos mostrar conciliados.
+                # El snapshot guarda igual la fila: un pago posterior puede mover
+                # la última conciliación después del corte y volver a incluirla.
+                excluded = bool(cutoff_date and reconcile_date and reconcile_date <= cutoff_date
+                                and not include_reconciled)
+                if excluded and not snapshot_store:
                     continue
 
                 current_residual = abs(line.get('amount_residual', 0.0) or 0.0)
@@ -530,9 +595,18 @@ class CollectionsService:
                     'paid_before_cutoff': paid_before_cutoff,
                 }
                 
-                rows.append(row)
+                if snapshot_store:
+                    snapshot_rows.append(row)
+                    row_line_ids.append(line['id'])
+                if not excluded:
+                    rows.append(row)
             
             print(f"[OK] Procesadas {len(rows)} líneas de CxC con TODOS los campos")
+            
+            if snapshot_store:
+                snapshot_store.save('cxc', cutoff_date, snapshot_filters, snapshot_rows,
+                                    row_line_ids, lock_date, self.SNAPSHOT_LIVE_FIELDS)
+            ReportDatasetCache.set('cxc', dataset_filters, rows)
             return rows
             
         except Exception as e:
@@ -541,6 +615,91 @@ class CollectionsService:
             traceback.print_exc()
             return []
     
+    def _join_live_columns(self, rows, cutoff_date, include_reconciled=False):
+        """
+        Completa filas de un snapshot con las columnas vivas (SNAPSHOT_LIVE_FIELDS).
+
+        Lee de Odoo por ID las líneas, sus conciliaciones y facturas, y aplica
+        el mismo cálculo que get_report_lines; descarta las filas que hoy ya
+        no saldrían en el corte (conciliadas al corte sin include_reconciled).
+
+        Args:
+            rows (list): Filas leídas de un snapshot (con ID de línea)
+            cutoff_date (str): Fecha de corte
+            include_reconciled (bool): Incluir conciliados al corte
+
+        Returns:
+            list: Filas completas
+        """
+        line_ids = [row.pop(ReportSnapshotStore.LINE_ID_KEY, None) for row in rows]
+        ids = [line_id for line_id in line_ids if line_id]
+        lines = self.repository.read(
+            'account.move.line', ids,
+            ['id', 'move_id', 'amount_residual', 'matched_debit_ids', 'matched_credit_ids']
+        ) if ids else []
+        line_map = {l['id']: l for l in lines}
+
+        move_ids = list(set([l['move_id'][0] for l in lines if l.get('move_id')]))
+        moves = self.repository.read(
+            'account.move', move_ids,
+            ['id', 'payment_state', 'amount_residual_with_retention', 'amount_residual_signed']
+        ) if move_ids else []
+        move_map = {m['id']: m for m in moves}
+        reconciliation_map = self._get_reconciliation_amounts(lines, cutoff_date)
+
+        joined = []
+        for row, line_id in zip(rows, line_ids):
+            line = line_map.get(line_id)
+            if line is None:
+                continue
+            move = move_map.get(line['move_id'][0] if line.get('move_id') else None, {})
+
+            rec_info = reconciliation_map.get(line['id'], {})
+            reconcile_date = rec_info.get('max_date')
+            paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
+            paid_before_cutoff = float(rec_info.get('paid_before', 0.0) or 0.0)
+
+            if reconcile_date and reconcile_date <= cutoff_date and not include_reconciled:
+                continue
+
+            current_residual = abs(line.get('amount_residual', 0.0) or 0.0)
+            amount_residual_historical = current_residual + paid_after_cutoff
+            if reconcile_date and reconcile_date <= cutoff_date and include_reconciled:
+                amount_residual_historical = 0.0
+
+            row.update({
+                'payment_state': move.get('payment_state', ''),
+                'amount_residual_with_retention': move.get('amount_residual_with_retention', 0.0),
+                'amount_residual_signed': move.get('amount_residual_signed', 0.0),
+                'amount_residual_currency': line.get('amount_residual', 0.0),
+                'amount_residual_historical': amount_residual_historical,
+                'paid_after_cutoff': paid_after_cutoff,
+                'reconciliation_date': reconcile_date,
+                'paid_before_cutoff': paid_before_cutoff,
+            })
+            joined.append(row)
+        return joined
+    
+    @staticmethod
+    def _refresh_aging(rows):
+        """
+        Recalcula los campos de antigüedad (relativos a hoy) de filas congeladas.
+        
+        Args:
+            rows (list): Filas de reporte CxC leídas de un snapshot
+        
+        Returns:
+            list: Las mismas filas con dias_vencido, estado_deuda y antiguedad al día
+        """
+        today = datetime.today().date()
+        for row in rows:
+            date_maturity = row.get('date_maturity')
+            dias_vencido = calcular_dias_vencido(date_maturity, today) if date_maturity else 0
+            row['dias_vencido'] = dias_vencido
+            row['estado_deuda'] = 'VENCIDO' if dias_vencido > 0 else 'VIGENTE'
+            row['antiguedad'] = clasificar_antiguedad(max(0, dias_vencido))
+        return rows
+    
     def get_report_lines_paginated(self, page=1, per_page=50, **kwargs):
         """
         Obtiene líneas de reporte con paginación eficiente en Odoo.
@@ -1140,15 +1299,14 @@ class CollectionsService:
             line_domain = [
                 ('parent_state', '=', 'posted'),
                 ('reconciled', '=', False),  # Solo no pagadas
-                ('account_id.code', '=like', '12%'),
-            ]
+            ] + AccountCodeResolver(self.repository).build_domain(['12'])
             
             if start_date:
                 line_domain.append(('date', '>=', start_date))
             if end_date:
                 line_domain.append(('date', '<=', end_date))
             if customer:
-                line_domain.append(('partner_id.name', 'ilike', customer))
+                line_domain += PartnerSearchIndex.for_repository(self.repository).build_domain(customer)
             
             # Campos a extraer (incluir amount_residual_with_retention)
             line_fields = [
@@ -0,0 +1,181 @@
+# -*- coding: utf-8 -*-
+"""
+Resolución de códigos de cuenta contable.
+
+Convierte prefijos y códigos exactos del plan contable (ej: '42', '1312001')
+en una lista concreta de IDs de account.account. Así los reportes filtran por
+`account_id in [...]` (indexado) en lugar de cadenas OR de
+`account_id.code =like '42%'`, que obligan a Odoo a hacer JOIN con
+account.account y evaluar LIKE en cada línea.
+"""
+
+import threading
+import time
+
+
+def is_exact_account_code(code):
+    """
+    Indica si un código de cuenta debe tratarse como código completo.
+
+    Un código "completo" (ej: 1312001) se compara exacto; cualquier otro
+    valor (ej: 13, 1312) se trata como prefijo.
+
+    Args:
+        code (str): Código de cuenta
+
+    Returns:
+        bool: True si es un código exacto
+    """
+    return code.isdigit() and len(code) >= 6
+
+
+def build_account_code_domain(codes, excluded_codes=None):
+    """
+    Construye el domain clásico por código de cuenta (cadena OR de =like).
+
+    Se usa como respaldo cuando no se puede resolver el plan contable.
+
+    Args:
+        codes (list): Códigos o prefijos de cuenta
+        excluded_codes (list, optional): Códigos exactos a excluir
+
+    Returns:
+        list: Domain de Odoo
+    """
+    conditions = []
+    for code in codes:
+        if is_exact_account_code(code):
+            conditions.append(('account_id.code', '=', code))
+        else:
+            conditions.append(('account_id.code', '=like', f'{code}%'))
+
+    domain = ['|'] * (len(conditions) - 1) + conditions
+    for code in excluded_codes or []:
+        domain.append(('account_id.code', '!=', code))
+    return domain
+
+
+class AccountCodeResolver:
+    """
+    Resuelve códigos de cuenta a IDs de account.account con caché por versión
+    del plan contable.
+
+    El plan contable (id, code) se descarga una sola vez y se reutiliza entre
+    requests mientras su versión (cantidad de cuentas + último write_date) no
+    cambie. La versión se verifica como máximo cada VERSION_CHECK_INTERVAL
+    segundos para no agregar un RPC por reporte.
+    """
+
+    # Segundos entre verificaciones de versión del plan contable
+    VERSION_CHECK_INTERVAL = 300
+
+    # Caché compartida a nivel de clase: {cache_key: {...}}
+    _charts = {}
+    _lock = threading.Lock()
+
+    def __init__(self, odoo_repository):
+        """
+        Inicializa el resolvedor.
+
+        Args:
+            odoo_repository (OdooRepository): Instancia del repositorio de Odoo
+        """
+        self.repository = odoo_repository
+
+    def _cache_key(self):
+        return f"{self.repository.url}|{self.repository.db}"
+
+    def _fetch_version(self):
+        """Obtiene la versión actual del plan contable (count, max write_date)."""
+        count = self.repository.search_count('account.account', [])
+        latest = self.repository.search_read(
+            'account.account', [], ['write_date'],
+            limit=1, order='write_date desc'
+        )
+        last_write = latest[0].get('write_date') if latest else None
+        return (count, last_write)
+
+    def _get_chart(self):
+        """
+        Retorna el plan contable en caché, recargándolo si cambió de versión.
+
+        Returns:
+            list: Tuplas (id, code) ordenadas por código, o None si no se pudo cargar
+        """
+        key = self._cache_key()
+        now = time.monotonic()
+
+        with self._lock:
+            entry = AccountCodeResolver._charts.get(key)
+            if entry and now - entry['checked_at'] < self.VERSION_CHECK_INTERVAL:
+                return entry['accounts']
+
+            version = self._fetch_version()
+            if entry and entry['version'] == version:
+                entry['checked_at'] = now
+                return entry['accounts']
+
+            accounts = self.repository.search_read('account.account', [], ['id', 'code'])
+            if not accounts:
+                return entry['accounts'] if entry else None
+
+            chart = sorted(
+                ((a['id'], a.get('code') or '') for a in accounts),
+                key=lambda item: item[1]
+            )
+            AccountCodeResolver._charts[key] = {
+                'version': version,
+                'accounts': chart,
+                'checked_at': now,
+            }
+            print(f"[INFO] Plan contable cargado en caché: {len(chart)} cuentas")
+            return chart
+
+    def resolve(self, codes, excluded_codes=None):
+        """
+        Resuelve códigos/prefijos a IDs de cuentas.
+
+        Args:
+            codes (list): Códigos o prefijos de cuenta
+            excluded_codes (list, optional): Códigos exactos a excluir
+
+        Returns:
+            list: IDs de cuentas ordenados, o None si el plan contable no está disponible
+        """
+        if not self.repository or not self.repository.is_connected():
+            return None
+
+        try:
+            chart = self._get_chart()
+        except Exception as e:
+            print(f"[WARN] No se pudo cargar el plan contable: {e}")
+            return None
+
+        if chart is None:
+            return None
+
+        exact = {c for c in codes if is_exact_account_code(c)}
+        prefixes = tuple(c for c in codes if not is_exact_account_code(c))
+        excluded = set(excluded_codes or [])
+
+        account_ids = [
+            account_id for account_id, code in chart
+            if code not in excluded and (code in exact or (prefixes and code.startswith(prefixes)))
+        ]
+        return sorted(account_ids)
+
+    def build_domain(self, codes, excluded_codes=None):
+        """
+        Construye el domain de cuentas, usando IDs resueltos cuando es posible.
+
+        Args:
+            codes (list): Códigos o prefijos de cuenta
+            excluded_codes (list, optional): Códigos exactos a excluir
+
+        Returns:
+            list: Domain de Odoo (`account_id in [...]` o cadena OR de respaldo)
+        """
+        account_ids = self.resolve(codes, excluded_codes)
+        if account_ids is None:
+            return build_account_code_domain(codes, excluded_codes)
+        return [('account_id', 'in', account_ids)]
@@ -0,0 +1,186 @@
+# -*- coding: utf-8 -*-
+"""
+Conversión de monedas para totales consolidados.
+
+Las filas de CxC/CxP mezclan documentos en PEN y USD; sumar sus montos como
+floats da totales sin sentido. Este módulo carga `res.currency.rate` una vez
+al día (por proceso y base de datos) en arreglos compactos indexados por fecha
+y convierte montos en bloque a la moneda de la compañía, sin RPCs adicionales
+por request.
+
+Convención de Odoo: `rate` = unidades de la moneda por 1 unidad de la moneda
+de la compañía, por lo que monto_compañía = monto / rate. Para una fecha se usa
+la tasa más reciente en o antes de esa fecha; si no hay, la más antigua.
+"""
+
+import threading
+from array import array
+from bisect import bisect_right
+from datetime import date, datetime
+
+
+def _to_ordinal(value):
+    """Convierte 'YYYY-MM-DD', date o datetime a ordinal; None si no es válido."""
+    if isinstance(value, datetime):
+        return value.date().toordinal()
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, str) and value:
+        try:
+            return datetime.strptime(value[:10], '%Y-%m-%d').date().toordinal()
+        except ValueError:
+            return None
+    return None
+
+
+class CurrencyRateTable:
+    """
+    Tabla de tasas de cambio por moneda, indexada por fecha.
+
+    Por cada moneda guarda dos arreglos paralelos ordenados por fecha:
+    ordinales de fecha (`array('l')`) y tasas (`array('d')`).
+    """
+
+    # Tamaño de página al leer res.currency.rate
+    PAGE_SIZE = 5000
+
+    _tables = {}
+    _lock = threading.Lock()
+
+    def __init__(self, company_currency, rates=None):
+        """
+        Inicializa la tabla.
+
+        Args:
+            company_currency (str): Código de la moneda de la compañía (ej: 'PEN')
+            rates (dict, optional): {moneda: [(fecha, tasa), ...]}
+        """
+        self.company_currency = company_currency
+        self.loaded_on = date.today()
+        self._dates = {}
+        self._rates = {}
+        for currency, points in (rates or {}).items():
+            points = sorted(
+                (ordinal, float(rate))
+                for ordinal, rate in ((_to_ordinal(d), r) for d, r in points)
+                if ordinal is not None and rate
+            )
+            self._dates[currency] = array('l', (p[0] for p in points))
+            self._rates[currency] = array('d', (p[1] for p in points))
+
+    @classmethod
+    def for_repository(cls, odoo_repository):
+        """
+        Retorna la tabla del día para la base de datos del repositorio.
+
+        La tabla se carga una sola vez por día y por proceso.
+
+        Args:
+            odoo_repository (OdooRepository): Repositorio de Odoo
+
+        Returns:
+            CurrencyRateTable: Tabla de tasas, o None si no se pudo cargar
+        """
+        key = f"{odoo_repository.url}|{odoo_repository.db}"
+        today = date.today()
+        with cls._lock:
+            table = cls._tables.get(key)
+            if table and table.loaded_on == today:
+                return table
+
+            if not odoo_repository.is_connected():
+                return table
+
+            try:
+                table = cls._load(odoo_repository)
+            except Exception as e:
+                print(f"[WARN] No se pudieron cargar las tasas de cambio: {e}")
+                return cls._tables.get(key)
+
+            cls._tables[key] = table
+            return table
+
+    @classmethod
+    def _load(cls, odoo_repository):
+        """Lee la moneda de la compañía y todas sus tasas desde Odoo."""
+        companies = odoo_repository.search_read(
+            'res.company', [], ['id', 'currency_id'], limit=1, order='id asc'
+        )
+        company = companies[0] if companies else {}
+        company_id = company.get('id')
+        company_currency = company['currency_id'][1] if company.get('currency_id') else 'PEN'
+
+        domain = ['|', ('company_id', '=', False), ('company_id', '=', company_id)] if company_id else []
+        rates = {}
+        offset = 0
+        while True:
+            page = odoo_repository.execute_kw(
+                'res.currency.rate', 'search_read', [domain],
+                {
+                    'fields': ['name', 'currency_id', 'rate'],
+                    'limit': cls.PAGE_SIZE,
+                    'offset': offset,
+                    'order': 'id asc',
+                }
+            ) or []
+            for record in page:
+                if record.get('currency_id'):
+                    rates.setdefault(record['currency_id'][1], []).append((record['name'], record['rate']))
+            if len(page) < cls.PAGE_SIZE:
+                break
+            offset += cls.PAGE_SIZE
+
+        table = cls(company_currency, rates)
+        print(f"[INFO] Tasas de cambio cargadas: {sum(len(r) for r in rates.values())} tasas, "
+              f"{len(rates)} monedas (moneda compañía: {company_currency})")
+        return table
+
+    def rate_at(self, currency, on_date):
+        """
+        Tasa de una moneda en una fecha.
+
+        Args:
+            currency (str): Código de moneda (ej: 'USD')
+            on_date (str|date): Fecha de la tasa
+
+        Returns:
+            float: Tasa (1.0 para la moneda de la compañía o monedas sin tasas)
+        """
+        if not currency or currency == self.company_currency:
+            return 1.0
+        dates = self._dates.get(currency)
+        if not dates:
+            return 1.0
+        ordinal = _to_ordinal(on_date)
+        if ordinal is None:
+            ordinal = date.today().toordinal()
+        pos = bisect_right(dates, ordinal) - 1
+        return self._rates[currency][max(pos, 0)]
+
+    def to_company_many(self, amounts, currencies, dates):
+        """
+        Convierte montos en bloque a la moneda de la compañía.
+
+        Agrupa por (moneda, fecha) para buscar cada tasa una sola vez.
+
+        Args:
+            amounts (list): Montos en la moneda de cada documento
+            currencies (list): Código de moneda de cada monto
+            dates (list|str|date): Fecha de cada monto, o una fecha única para todos
+
+        Returns:
+            list: Montos convertidos a la moneda de la compañía
+        """
+        single_date = not isinstance(dates, (list, tuple))
+        lookup = {}
+        converted = []
+        for i, amount in enumerate(amounts):
+            currency = currencies[i]
+            on_date = dates if single_date else dates[i]
+            key = (currency, on_date)
+            rate = lookup.get(key)
+            if rate is None:
+                rate = self.rate_at(currency, on_date)
+                lookup[key] = rate
+            converted.append((amount or 0.0) / rate)
+        return converted
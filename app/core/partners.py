@@ -0,0 +1,271 @@
+# -*- coding: utf-8 -*-
+"""
+Índice local de búsqueda de socios (res.partner).
+
+Reemplaza el filtro `('partner_id.name', 'ilike', texto)` de los reportes,
+que obliga a Odoo a un JOIN con ILIKE sin índice sobre res.partner. El índice
+mantiene en memoria los nombres normalizados (minúsculas, sin tildes) con un
+índice de trigramas, y se actualiza incrementalmente por `write_date`.
+"""
+
+import threading
+import time
+import unicodedata
+
+
+def normalize_text(value):
+    """
+    Normaliza texto para búsqueda: minúsculas, sin tildes y espacios simples.
+
+    Args:
+        value (str): Texto original
+
+    Returns:
+        str: Texto normalizado
+    """
+    if not value:
+        return ''
+    decomposed = unicodedata.normalize('NFKD', str(value))
+    stripped = ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return ' '.join(stripped.lower().split())
+
+
+def _trigrams(text):
+    """Retorna el conjunto de trigramas de un texto normalizado."""
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class PartnerSearchIndex:
+    """
+    Índice en memoria de socios con búsqueda por subcadena/prefijo.
+
+    Se comparte a nivel de proceso por base de datos de Odoo. La primera
+    consulta carga todos los socios; las siguientes solo traen los modificados
+    desde el último `write_date` (como máximo cada REFRESH_INTERVAL segundos).
+    """
+
+    # Segundos entre refrescos incrementales desde Odoo
+    REFRESH_INTERVAL = 120
+
+    # Máximo de IDs a enviar como `partner_id in [...]` antes de volver a ilike
+    MAX_RESOLVED_IDS = 1000
+
+    # Tamaño de página al leer res.partner
+    PAGE_SIZE = 5000
+
+    PARTNER_FIELDS = ['id', 'name', 'vat', 'write_date', 'customer_rank', 'supplier_rank']
+
+    _indexes = {}
+    _registry_lock = threading.Lock()
+
+    def __init__(self, odoo_repository):
+        """
+        Inicializa el estado vacío del índice.
+
+        Args:
+            odoo_repository (OdooRepository): Instancia del repositorio de Odoo
+        """
+        self.repository = odoo_repository
+        self.partners = {}  # id -> {'name', 'vat', 'norm', ...}
+        self.trigram_index = {}  # trigrama -> set(ids)
+        self.last_write_date = None
+        self.refreshed_at = 0.0
+        # lock: estructuras del índice (lecturas y escrituras)
+        # refresh_lock: un solo refresco a la vez; la lectura de Odoo no bloquea búsquedas
+        self.lock = threading.Lock()
+        self.refresh_lock = threading.Lock()
+
+    @classmethod
+    def for_repository(cls, odoo_repository):
+        """
+        Retorna el índice compartido para la base de datos del repositorio.
+
+        Args:
+            odoo_repository (OdooRepository): Instancia del repositorio de Odoo
+
+        Returns:
+            PartnerSearchIndex: Índice (compartido por proceso)
+        """
+        key = f"{odoo_repository.url}|{odoo_repository.db}"
+        with cls._registry_lock:
+            index = cls._indexes.get(key)
+            if index is None:
+                index = cls(odoo_repository)
+                cls._indexes[key] = index
+            else:
+                # Reutilizar la conexión más reciente
+                index.repository = odoo_repository
+            return index
+
+    def _fetch_partners(self, domain):
+        """Lee socios paginados (incluye archivados, igual que la búsqueda por relación)."""
+        records = []
+        offset = 0
+        while True:
+            page = self.repository.execute_kw(
+                'res.partner', 'search_read', [domain],
+                {
+                    'fields': self.PARTNER_FIELDS,
+                    'limit': self.PAGE_SIZE,
+                    'offset': offset,
+                    'order': 'id asc',
+                    'context': {'active_test': False},
+                }
+            ) or []
+            records.extend(page)
+            if len(page) < self.PAGE_SIZE:
+                return records
+            offset += self.PAGE_SIZE
+
+    def _add_partner(self, record):
+        """Agrega o actualiza un socio en las estructuras del índice."""
+        partner_id = record['id']
+        old = self.partners.get(partner_id)
+        if old:
+            for tri in _trigrams(old['norm']):
+                ids = self.trigram_index.get(tri)
+                if ids:
+                    ids.discard(partner_id)
+
+        norm = normalize_text(record.get('name'))
+        self.partners[partner_id] = {
+            'id': partner_id,
+            'name': record.get('name') or '',
+            'vat': record.get('vat') or '',
+            'norm': norm,
+            'customer_rank': record.get('customer_rank') or 0,
+            'supplier_rank': record.get('supplier_rank') or 0,
+        }
+        for tri in _trigrams(norm):
+            self.trigram_index.setdefault(tri, set()).add(partner_id)
+
+    def refresh(self, force=False):
+        """
+        Sincroniza el índice con Odoo (carga completa o incremental).
+
+        Args:
+            force (bool): Ignorar el intervalo mínimo de refresco
+
+        Returns:
+            bool: True si el índice tiene datos utilizables
+        """
+        if not self.repository or not self.repository.is_connected():
+            return bool(self.partners)
+
+        now = time.monotonic()
+        with self.refresh_lock:
+            if not force and self.partners and now - self.refreshed_at < self.REFRESH_INTERVAL:
+                return True
+
+            try:
+                if self.last_write_date:
+                    domain = [('write_date', '>=', self.last_write_date)]
+                else:
+                    domain = []
+                records = self._fetch_partners(domain)
+            except Exception as e:
+                print(f"[WARN] No se pudo refrescar el índice de socios: {e}")
+                return bool(self.partners)
+
+            with self.lock:
+                for record in records:
+                    self._add_partner(record)
+                    write_date = record.get('write_date')
+                    if write_date and (not self.last_write_date or write_date > self.last_write_date):
+                        self.last_write_date = write_date
+
+            if records:
+                print(f"[INFO] Índice de socios actualizado: {len(records)} cambios, {len(self.partners)} socios")
+
+            self.refreshed_at = now
+            return bool(self.partners)
+
+    def _match_ids(self, query_norm):
+        """
+        Retorna los IDs cuyo nombre contiene la consulta normalizada.
+        Debe llamarse con `self.lock` tomado (refresh modifica las estructuras).
+        """
+        if len(query_norm) < 3:
+            # Consultas de 1-2 caracteres no tienen trigramas: recorrido lineal
+            return {pid for pid, p in self.partners.items() if query_norm in p['norm']}
+
+        candidate_sets = [self.trigram_index.get(tri, set()) for tri in _trigrams(query_norm)]
+        candidate_sets.sort(key=len)
+        candidates = set(candidate_sets[0])
+        for ids in candidate_sets[1:]:
+            candidates &= ids
+            if not candidates:
+                break
+        return {pid for pid in candidates if query_norm in self.partners[pid]['norm']}
+
+    def resolve_ids(self, text, limit=None):
+        """
+        Resuelve un filtro de texto a IDs de socios.
+
+        Args:
+            text (str): Texto ingresado por el usuario
+            limit (int, optional): Máximo de IDs aceptado (default: MAX_RESOLVED_IDS)
+
+        Returns:
+            list: IDs de socios, o None si el índice no está disponible, no hay
+                  coincidencias o el resultado excede el límite (usar ilike
+                  como respaldo)
+        """
+        query_norm = normalize_text(text)
+        if not query_norm or not self.refresh():
+            return None
+
+        with self.lock:
+            matches = self._match_ids(query_norm)
+        if not matches:
+            # Puede ser un socio creado después del último refresco: que decida Odoo
+            return None
+        if len(matches) > (limit or self.MAX_RESOLVED_IDS):
+            return None
+        return sorted(matches)
+
+    def build_domain(self, text, field='partner_id'):
+        """
+        Construye el domain de socio para un filtro de texto.
+
+        Args:
+            text (str): Texto ingresado por el usuario
+            field (str): Campo Many2One a filtrar
+
+        Returns:
+            list: `[(field, 'in', ids)]` o `[(field + '.name', 'ilike', text)]` de respaldo
+        """
+        partner_ids = self.resolve_ids(text)
+        if partner_ids is None:
+            return [(f'{field}.name', 'ilike', text)]
+        return [(field, 'in', partner_ids)]
+
+    def search(self, text, limit=20, rank_field=None):
+        """
+        Búsqueda para autocompletado (typeahead).
+
+        Los nombres que empiezan con el texto aparecen primero.
+
+        Args:
+            text (str): Texto ingresado por el usuario
+            limit (int): Máximo de resultados
+            rank_field (str, optional): 'customer_rank' o 'supplier_rank' para
+                                        limitar a clientes o proveedores
+
+        Returns:
+            list: [{'id', 'name', 'vat'}, ...]
+        """
+        query_norm = normalize_text(text)
+        if not query_norm or not self.refresh():
+            return []
+
+        with self.lock:
+            partners = [self.partners[pid] for pid in self._match_ids(query_norm)]
+        if rank_field:
+            partners = [p for p in partners if p.get(rank_field, 0) > 0]
+        partners.sort(key=lambda p: (not p['norm'].startswith(query_norm), p['norm']))
+
+        return [
+            {'id': p['id'], 'name': p['name'], 'vat': p['vat']}
+            for p in partners[:limit]
+        ]
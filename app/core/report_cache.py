@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+Caché de datasets de reportes CxC/CxP.
+
+El flujo típico es ver el reporte y luego exportarlo con los mismos filtros.
+La caché de Flask-Caching de los endpoints guarda la respuesta JSON, no las
+filas, así que la exportación repetía toda la consulta a Odoo. Aquí se guardan
+las filas calculadas por los servicios, con clave por tipo de reporte y filtros
+normalizados (mismo hash que los snapshots), para que la vista, las
+exportaciones síncronas y los trabajos asíncronos las compartan.
+
+Usa el backend de caché de la app (Redis en producción, compartido con el
+worker de Celery; memoria del proceso en desarrollo). Fuera de un contexto
+de aplicación no hace nada.
+"""
+
+from flask import has_app_context
+
+from app.core.snapshots import ReportSnapshotStore
+
+
+class ReportDatasetCache:
+    """Filas de reportes recién calculadas, por tipo y filtros."""
+
+    # Misma vigencia que la caché de los endpoints de reporte
+    TIMEOUT = 300
+
+    @staticmethod
+    def _cache():
+        if not has_app_context():
+            return None
+        from app import cache
+        return cache
+
+    @staticmethod
+    def key(kind, filters):
+        return f"report-dataset:{kind}:{ReportSnapshotStore.filters_key(filters)}"
+
+    @classmethod
+    def get(cls, kind, filters):
+        """
+        Devuelve las filas cacheadas de un reporte.
+
+        Args:
+            kind (str): Tipo de reporte ('cxc' o 'cxp')
+            filters (dict): Todos los argumentos del reporte
+
+        Returns:
+            list: Filas del reporte o None si no están en caché
+        """
+        cache = cls._cache()
+        if cache is None:
+            return None
+        try:
+            rows = cache.get(cls.key(kind, filters))
+        except Exception as e:
+            print(f"[WARN] Caché de dataset {kind} no disponible: {e}")
+            return None
+        if rows is not None:
+            print(f"[OK] Dataset {kind} reutilizado de caché: {len(rows)} filas")
+        return rows
+
+    @classmethod
+    def set(cls, kind, filters, rows):
+        """Guarda las filas calculadas de un reporte."""
+        cache = cls._cache()
+        if cache is None:
+            return False
+        try:
+            return bool(cache.set(cls.key(kind, filters), rows, timeout=cls.TIMEOUT))
+        except Exception as e:
+            print(f"[WARN] No se pudo cachear dataset {kind}: {e}")
+            return False
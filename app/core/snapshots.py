@@ -0,0 +1,327 @@
+# -*- coding: utf-8 -*-
+"""
+Snapshots históricos de reportes CxC/CxP.
+
+Los reportes con fecha de corte de un período cerrado no cambian, pero hasta
+ahora se regeneraban desde Odoo en cada request. Este módulo congela las filas
+calculadas en un archivo columnar Arrow IPC comprimido (zstd) con un manifest
+JSON, y las sirve luego con lectura memory-mapped.
+
+Un período se considera cerrado si la fecha de corte es menor o igual a la
+fecha de bloqueo contable (fiscalyear_lock_date) de todas las compañías en
+Odoo. Para períodos abiertos siempre se calcula en vivo. El manifest guarda la
+fecha de bloqueo con la que se congeló; si contabilidad la mueve (p. ej. reabre
+el período, corrige y vuelve a cerrar) el snapshot se descarta y se recalcula.
+
+Aun en un período cerrado, algunas columnas de un corte siguen cambiando
+(pagos posteriores al corte, estado de pago, residual actual). Esas columnas
+no se congelan: el snapshot guarda el ID de línea de cada fila y el servicio
+vuelve a leerlas de Odoo al servirlo.
+
+Requiere `pyarrow`; si no está instalado los snapshots quedan deshabilitados.
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - dependencia opcional
+    pa = None
+    feather = None
+
+
+# v2: sin columnas vivas (pagos posteriores, estado, residual actual) y con ID de línea
+# v3: con la fecha de bloqueo contable del congelamiento
+SNAPSHOT_FORMAT_VERSION = 3
+
+
+def _column_kind(values):
+    """
+    Determina cómo almacenar una columna según los tipos Python de sus valores.
+
+    Returns:
+        str: 'null', 'bool', 'int', 'float', 'str' o 'json' (tipos mixtos)
+    """
+    kinds = set()
+    for value in values:
+        if value is None:
+            continue
+        if isinstance(value, bool):
+            kinds.add('bool')
+        elif isinstance(value, int):
+            kinds.add('int')
+        elif isinstance(value, float):
+            kinds.add('float')
+        elif isinstance(value, str):
+            kinds.add('str')
+        else:
+            kinds.add('json')
+        if len(kinds) > 1:
+            return 'json'
+    return kinds.pop() if kinds else 'null'
+
+
+_ARROW_TYPES = {
+    'null': lambda: pa.null(),
+    'bool': lambda: pa.bool_(),
+    'int': lambda: pa.int64(),
+    'float': lambda: pa.float64(),
+    'str': lambda: pa.string(),
+    'json': lambda: pa.string(),
+}
+
+
+class ReportSnapshotStore:
+    """
+    Almacén de snapshots de reportes por fecha de corte.
+
+    Estructura en disco:
+        <base_dir>/<kind>/<cutoff_date>/<filters_hash>.arrow
+        <base_dir>/<kind>/<cutoff_date>/<filters_hash>.json   (manifest)
+    """
+
+    # Segundos que se reutiliza la fecha de bloqueo leída de Odoo
+    LOCK_DATE_TTL = 3600
+
+    # Columna con el ID de account.move.line de cada fila congelada
+    LINE_ID_KEY = '_line_id'
+
+    _lock_dates = {}
+    _lock = threading.Lock()
+
+    def __init__(self, base_dir=None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            base_dir (str, optional): Directorio raíz. Si es None usa
+                REPORT_SNAPSHOT_DIR de la configuración o 'data/snapshots'
+                en el directorio del proyecto.
+        """
+        if base_dir is None:
+            try:
+                from flask import current_app
+                base_dir = current_app.config.get('REPORT_SNAPSHOT_DIR')
+            except RuntimeError:
+                base_dir = None
+        if not base_dir:
+            base_dir = Path(__file__).parent.parent.parent / 'data' / 'snapshots'
+        self.base_dir = Path(base_dir)
+
+    @staticmethod
+    def is_available():
+        """Indica si pyarrow está instalado."""
+        return pa is not None
+
+    @staticmethod
+    def filters_key(filters):
+        """Hash estable de los filtros normalizados (sin valores vacíos)."""
+        normalized = {k: v for k, v in sorted(filters.items()) if v not in (None, '', False)}
+        payload = json.dumps(normalized, sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:20]
+
+    def _paths(self, kind, cutoff_date, filters):
+        folder = self.base_dir / kind / cutoff_date
+        key = self.filters_key(filters)
+        return folder / f'{key}.arrow', folder / f'{key}.json'
+
+    def get_lock_date(self, repository):
+        """
+        Obtiene la fecha hasta la que todas las compañías están cerradas.
+
+        Solo cuenta `fiscalyear_lock_date` (bloqueo para todos los usuarios);
+        `period_lock_date` es un bloqueo consultivo: los asesores aún pueden
+        registrar asientos detrás de él. Se usa la fecha más antigua entre
+        compañías: un período solo está cerrado si lo está en todas.
+
+        Args:
+            repository (OdooRepository): Repositorio de Odoo
+
+        Returns:
+            str: Fecha 'YYYY-MM-DD' o None si alguna compañía no tiene bloqueo
+        """
+        key = f"{repository.url}|{repository.db}"
+        now = time.monotonic()
+        with self._lock:
+            cached = ReportSnapshotStore._lock_dates.get(key)
+            if cached and now - cached[1] < self.LOCK_DATE_TTL:
+                return cached[0]
+
+        companies = repository.search_read(
+            'res.company', [], ['fiscalyear_lock_date']
+        )
+        dates = [company.get('fiscalyear_lock_date') for company in companies]
+        lock_date = min(dates) if dates and all(dates) else None
+
+        with self._lock:
+            ReportSnapshotStore._lock_dates[key] = (lock_date, now)
+        return lock_date
+
+    def closed_lock_date(self, repository, cutoff_date):
+        """
+        Fecha de bloqueo contable vigente si el corte pertenece a un período cerrado.
+
+        Args:
+            repository (OdooRepository): Repositorio de Odoo
+            cutoff_date (str): Fecha de corte 'YYYY-MM-DD'
+
+        Returns:
+            str: Fecha de bloqueo 'YYYY-MM-DD' (se pasa a load/save) o None
+                 si el corte no es inmutable
+        """
+        if not cutoff_date or not self.is_available():
+            return None
+        if not repository or not repository.is_connected():
+            return None
+        try:
+            lock_date = self.get_lock_date(repository)
+        except Exception as e:
+            print(f"[WARN] No se pudo obtener fecha de bloqueo contable: {e}")
+            return None
+        return lock_date if lock_date and cutoff_date <= lock_date else None
+
+    def is_closed_period(self, repository, cutoff_date):
+        """
+        Indica si la fecha de corte pertenece a un período cerrado en Odoo.
+
+        Args:
+            repository (OdooRepository): Repositorio de Odoo
+            cutoff_date (str): Fecha de corte 'YYYY-MM-DD'
+
+        Returns:
+            bool: True si el corte es inmutable y puede congelarse
+        """
+        return bool(self.closed_lock_date(repository, cutoff_date))
+
+    def load(self, kind, cutoff_date, filters, lock_date):
+        """
+        Lee un snapshot existente (memory-mapped).
+
+        Args:
+            kind (str): Tipo de reporte ('cxc' o 'cxp')
+            cutoff_date (str): Fecha de corte
+            filters (dict): Filtros del reporte
+            lock_date (str): Fecha de bloqueo contable vigente (closed_lock_date);
+                un snapshot congelado con otra fecha no es válido
+
+        Returns:
+            list: Filas del reporte (con LINE_ID_KEY y sin las columnas vivas)
+                  o None si no existe snapshot válido
+        """
+        if not self.is_available() or not cutoff_date:
+            return None
+
+        data_path, manifest_path = self._paths(kind, cutoff_date, filters)
+        if not data_path.exists() or not manifest_path.exists():
+            return None
+
+        try:
+            with open(manifest_path, 'r', encoding='utf-8') as f:
+                manifest = json.load(f)
+            if manifest.get('format_version') != SNAPSHOT_FORMAT_VERSION:
+                return None
+            if manifest.get('lock_date') != lock_date:
+                print(f"[INFO] Snapshot {kind} al {cutoff_date} congelado con bloqueo "
+                      f"{manifest.get('lock_date')} (vigente {lock_date}), se recalcula")
+                return None
+
+            table = feather.read_table(str(data_path), memory_map=True)
+            columns = manifest['columns']
+            decoded = {}
+            for name, column_kind in columns:
+                values = table.column(name).to_pylist()
+                if column_kind == 'json':
+                    values = [json.loads(v) if v is not None else None for v in values]
+                decoded[name] = values
+
+            names = [name for name, _ in columns]
+            rows = [dict(zip(names, values)) for values in zip(*(decoded[n] for n in names))]
+            if not names:
+                rows = [{} for _ in range(manifest.get('row_count', 0))]
+
+            print(f"[OK] Snapshot {kind} al {cutoff_date} leído: {len(rows)} filas")
+            return rows
+        except Exception as e:
+            print(f"[WARN] Snapshot {kind} al {cutoff_date} ilegible, se recalcula: {e}")
+            return None
+
+    def save(self, kind, cutoff_date, filters, rows, line_ids, lock_date, live_fields=()):
+        """
+        Congela las filas calculadas de un corte en disco.
+
+        Args:
+            kind (str): Tipo de reporte ('cxc' o 'cxp')
+            cutoff_date (str): Fecha de corte
+            filters (dict): Filtros del reporte
+            rows (list): Filas calculadas (no se modifican)
+            line_ids (list): ID de account.move.line de cada fila
+            lock_date (str): Fecha de bloqueo contable con la que se congela
+            live_fields (tuple): Columnas que cambian después del cierre; no se
+                guardan y el servicio las vuelve a leer al servir el snapshot
+
+        Returns:
+            bool: True si el snapshot se guardó
+        """
+        if not self.is_available() or not cutoff_date:
+            return False
+
+        data_path, manifest_path = self._paths(kind, cutoff_date, filters)
+        try:
+            live_fields = set(live_fields)
+            rows = [
+                {**{k: v for k, v in row.items() if k not in live_fields}, self.LINE_ID_KEY: line_id}
+                for row, line_id in zip(rows, line_ids)
+            ]
+            names = []
+            for row in rows:
+                for name in row:
+                    if name not in names:
+                        names.append(name)
+
+            columns = []
+            arrays = []
+            for name in names:
+                values = [row.get(name) for row in rows]
+                column_kind = _column_kind(values)
+                if column_kind == 'json':
+                    values = [json.dumps(v) if v is not None else None for v in values]
+                arrays.append(pa.array(values, type=_ARROW_TYPES[column_kind]()))
+                columns.append((name, column_kind))
+
+            table = pa.table(arrays, names=names) if names else pa.table({})
+
+            data_path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_data = data_path.with_suffix('.arrow.tmp')
+            feather.write_feather(table, str(tmp_data), compression='zstd')
+            os.replace(tmp_data, data_path)
+
+            manifest = {
+                'format_version': SNAPSHOT_FORMAT_VERSION,
+                'kind': kind,
+                'cutoff_date': cutoff_date,
+                'lock_date': lock_date,
+                'filters': filters,
+                'row_count': len(rows),
+                'columns': columns,
+                'live_fields': sorted(live_fields),
+                'file': data_path.name,
+                'size_bytes': data_path.stat().st_size,
+                'created_at': datetime.now().isoformat(),
+            }
+            tmp_manifest = manifest_path.with_suffix('.json.tmp')
+            with open(tmp_manifest, 'w', encoding='utf-8') as f:
+                json.dump(manifest, f, ensure_ascii=False, indent=2, default=str)
+            os.replace(tmp_manifest, manifest_path)
+
+            print(f"[OK] Snapshot {kind} al {cutoff_date} guardado: {len(rows)} filas")
+            return True
+        except Exception as e:
+            print(f"[WARN] No se pudo guardar snapshot {kind} al {cutoff_date}: {e}")
+            return False
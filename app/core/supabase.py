@@ -1,11 +1,16 @@
 """
 Módulo de conexión con Supabase.
 Provee la instancia del cliente y utilidades de base de datos.
+
+Con WAREHOUSE_BACKEND=sqlite el cliente es el warehouse local embebido
+(scripts/etl/warehouse.py), con la misma interfaz que el de Supabase.
 """
 import os
 from supabase import create_client, Client
 from flask import current_app
 
+from scripts.etl.warehouse import LocalWarehouse
+
 class SupabaseClient:
     _instance: Client = None
     
@@ -20,9 +25,23 @@ class SupabaseClient:
             try:
                 url = current_app.config.get('SUPABASE_URL')
                 key = current_app.config.get('SUPABASE_KEY')
+                backend = current_app.config.get('WAREHOUSE_BACKEND')
+                sqlite_path = current_app.config.get('WAREHOUSE_SQLITE_PATH')
             except Exception:
                 url = None
                 key = None
+                backend = None
+                sqlite_path = None
+
+            backend = (backend or os.environ.get('WAREHOUSE_BACKEND') or 'supabase').strip().lower()
+            if backend == 'sqlite':
+                try:
+                    cls._instance = LocalWarehouse(sqlite_path or os.environ.get('WAREHOUSE_SQLITE_PATH'))
+                    print(f"[OK] Warehouse local inicializado: {cls._instance.path}")
+                except Exception as e:
+                    print(f"[ERROR] Fallo al inicializar warehouse local: {e}")
+                    return None
+                return cls._instance
             
             # Fallback a variables de entorno directas
             if not url or not key:
@@ -49,11 +68,17 @@ class SupabaseClient:
 def get_db_connection_string():
     """
     Retorna el string de conexión para SQLAlchemy/Psycopg2.
+    (None con el warehouse local: no hay PostgreSQL detrás)
     """
     try:
         uri = current_app.config.get('SUPABASE_DB_URI')
+        backend = current_app.config.get('WAREHOUSE_BACKEND')
     except Exception:
         uri = None
+        backend = None
+
+    if (backend or os.environ.get('WAREHOUSE_BACKEND') or '').strip().lower() == 'sqlite':
+        return None
         
     if not uri:
         uri = os.environ.get('SUPABASE_DB_URI')
@@ -4,12 +4,11 @@ Módulo de Emails.
 
 Maneja el envío de correos masivos y automatizados.
 
+Envíos de letras encolados en Celery (app/emails/batches.py) y enviados
+por un pool de conexiones SMTP (app/emails/smtp_pool.py).
+
 Features pendientes de implementación:
-- Envío de letras por recuperar
-- Envío de letras en banco
 - Envío de constancias de detracción
-- Templates de correos HTML
-- Sistema de cola de correos
 """
 
 from flask import Blueprint
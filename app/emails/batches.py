@@ -0,0 +1,122 @@
+# -*- coding: utf-8 -*-
+"""
+Cola de envíos de correos de letras (Celery).
+
+Las rutas de envío registran el lote en la auditoría (EmailLogger) y lo
+encolan; la respuesta devuelve el ID del lote de inmediato. El worker envía
+por el pool de conexiones SMTP y a los destinatarios con error temporal los
+vuelve a encolar con espera exponencial, hasta MAIL_MAX_ATTEMPTS intentos. El
+progreso por destinatario se consulta con EmailLogger.get_batch.
+
+MAIL_POOL_SIZE limita las sesiones SMTP de un lote; el límite por worker lo
+da la cola: las tareas van a MAIL_QUEUE, que consume un worker dedicado con
+--concurrency=1 (un lote a la vez). N workers de correo abren como máximo
+N x MAIL_POOL_SIZE sesiones.
+"""
+
+import uuid
+from datetime import datetime, timedelta
+
+from flask import current_app
+
+from app.emails.email_logger import EmailLogger
+from app.emails.email_service import EmailService
+
+# Tipo de lote -> método de EmailService que lo envía
+EMAIL_BATCH_KINDS = {
+    'acceptance': 'send_acceptance_reminders',
+    'recover': 'send_letters_to_recover',
+    'bank': 'send_letters_in_bank',
+}
+
+# Tipos cuyo envío se audita en email_logs (reciben `final_attempt`)
+AUDITED_BATCH_KINDS = ('acceptance',)
+
+
+def retry_delay(attempt):
+    """Segundos de espera antes del intento siguiente a `attempt` (exponencial, con tope)."""
+    base = current_app.config.get('MAIL_RETRY_BACKOFF', 30)
+    limit = current_app.config.get('MAIL_RETRY_MAX_DELAY', 900)
+    return min(base * (2 ** (attempt - 1)), limit)
+
+
+def enqueue_email_batch(kind, recipients_data, sender_email=None):
+    """
+    Registra y encola un lote de correos.
+
+    Args:
+        kind (str): Tipo de lote (EMAIL_BATCH_KINDS)
+        recipients_data (list): Destinatarios con 'email', 'name' y 'letters'
+        sender_email (str): Remitente solicitado (se valida al enviar)
+
+    Returns:
+        dict: Progreso inicial del lote (EmailLogger.get_batch)
+    """
+    from app.tasks import task_send_email_batch
+
+    if kind not in EMAIL_BATCH_KINDS:
+        raise ValueError(f"Tipo de lote no válido: {kind}")
+
+    batch_id = uuid.uuid4().hex
+    logger = EmailLogger()
+    logger.create_batch(batch_id, kind, recipients_data)
+    task_send_email_batch.delay(batch_id, kind, recipients_data, sender_email)
+    print(f"[INFO] Lote de correos {batch_id} ({kind}) encolado: {len(recipients_data)} destinatarios")
+    return logger.get_batch(batch_id)
+
+
+def run_email_batch(batch_id, kind, recipients_data, sender_email=None, attempt=1):
+    """
+    Envía un intento de un lote y clasifica los resultados por destinatario.
+
+    Args:
+        batch_id (str): ID del lote
+        kind (str): Tipo de lote
+        recipients_data (list): Destinatarios pendientes en este intento
+        sender_email (str): Remitente solicitado
+        attempt (int): Número de intento (1 = primer envío)
+
+    Returns:
+        list: Destinatarios a reintentar (error temporal y quedan intentos)
+    """
+    logger = EmailLogger()
+    logger.update_batch_recipients(batch_id, [
+        {'email': r.get('email'), 'status': 'sending'} for r in recipients_data
+    ])
+
+    max_attempts = current_app.config.get('MAIL_MAX_ATTEMPTS', 4)
+    send_kwargs = {'sender_email': sender_email}
+    if kind in AUDITED_BATCH_KINDS:
+        # Los errores temporales con intentos pendientes no van a la auditoría
+        send_kwargs['final_attempt'] = attempt >= max_attempts
+
+    service = EmailService()
+    try:
+        results = getattr(service, EMAIL_BATCH_KINDS[kind])(recipients_data, **send_kwargs)
+        outcomes = {r['email']: r for r in results['recipients']}
+    except Exception as e:
+        # Falla del lote completo (p. ej. sin servidor SMTP): todos reintentables
+        print(f"[ERROR] Lote de correos {batch_id}: {e}")
+        outcomes = {r.get('email'): {'status': 'failed', 'error': str(e), 'retryable': True}
+                    for r in recipients_data}
+
+    delay = retry_delay(attempt)
+    next_attempt_at = (datetime.now() + timedelta(seconds=delay)).isoformat()
+
+    updates = []
+    pending = []
+    for recipient in recipients_data:
+        email = recipient.get('email')
+        outcome = outcomes.get(email) or {'status': 'failed', 'error': 'Sin resultado de envío', 'retryable': False}
+        update = {'email': email, 'status': outcome['status'], 'error': outcome.get('error'), 'attempted': True}
+        if outcome['status'] == 'failed' and outcome.get('retryable') and attempt < max_attempts:
+            update.update(status='retrying', next_attempt_at=next_attempt_at)
+            pending.append(recipient)
+        updates.append(update)
+    logger.update_batch_recipients(batch_id, updates)
+
+    sent = sum(1 for u in updates if u['status'] == 'sent')
+    retry_note = f" (en {delay}s)" if pending else ""
+    print(f"[INFO] Lote de correos {batch_id} intento {attempt}: {sent} enviados, "
+          f"{len(pending)} a reintentar{retry_note}, {len(updates) - sent - len(pending)} fallidos")
+    return pending
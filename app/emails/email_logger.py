@@ -3,10 +3,19 @@
 Módulo de Logging para Auditoría de Envíos de Correos.
 
 Sistema simple de logging usando SQLite para registrar todos los envíos de correos.
+
+Una conexión por proceso y archivo (modo WAL, synchronous=NORMAL): registrar
+un correo no abre conexiones ni fuerza un fsync. El esquema se crea una sola
+vez por proceso. Dentro de `batch()` los registros se acumulan y se escriben
+en una sola transacción al cerrar el lote de envío. Las estadísticas salen de
+una tabla de totales diarios que se actualiza en la misma transacción.
 """
 
 import sqlite3
 import os
+import threading
+from collections import Counter
+from contextlib import contextmanager
 from datetime import datetime
 from pathlib import Path
 
@@ -15,13 +24,35 @@ class EmailLogger:
     """
     Logger simple para auditoría de envíos de correos.
     """
-    
+
+    # Conexión compartida por (archivo, proceso): (conexión, lock)
+    _connections = {}
+    _connections_lock = threading.Lock()
+    # Archivos con el esquema ya verificado en este proceso
+    _initialized = set()
+
+    # Registros pendientes que fuerzan la escritura aunque el lote siga abierto
+    FLUSH_SIZE = 500
+
+    _INSERT_LOG = '''
+        INSERT INTO email_logs
+        (timestamp, recipient_email, recipient_name, subject, letter_count, status, error_message, letter_ids)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    '''
+    _UPSERT_DAILY = '''
+        INSERT INTO email_daily_stats (day, status, emails, letters)
+        VALUES (?, ?, ?, ?)
+        ON CONFLICT(day, status) DO UPDATE SET
+            emails = emails + excluded.emails,
+            letters = letters + excluded.letters
+    '''
+
     def __init__(self, db_path=None):
         """
         Inicializa el logger.
-        
+
         Args:
-            db_path (str, optional): Ruta al archivo SQLite. 
+            db_path (str, optional): Ruta al archivo SQLite.
                                      Si es None, usa 'logs/email_audit.db' en el directorio del proyecto.
         """
         if db_path is None:
@@ -30,45 +61,157 @@ class EmailLogger:
             logs_dir = project_root / 'logs'
             logs_dir.mkdir(exist_ok=True)
             db_path = logs_dir / 'email_audit.db'
-        
+
         self.db_path = str(db_path)
-        self._init_database()
-    
+        self._pending = []
+        self._batch_depth = 0
+        if self.db_path not in self._initialized:
+            self._init_database()
+
+    def _connection(self):
+        """Conexión del proceso para este archivo (se abre una vez; se reabre tras un fork)."""
+        key = (self.db_path, os.getpid())
+        entry = self._connections.get(key)
+        if entry is None:
+            with self._connections_lock:
+                entry = self._connections.get(key)
+                if entry is None:
+                    conn = sqlite3.connect(self.db_path, timeout=10, check_same_thread=False)
+                    conn.row_factory = sqlite3.Row
+                    conn.execute('PRAGMA journal_mode=WAL')
+                    conn.execute('PRAGMA synchronous=NORMAL')
+                    entry = self._connections[key] = (conn, threading.RLock())
+        return entry
+
+    @contextmanager
+    def _transaction(self):
+        """Conexión bloqueada para este hilo; confirma al salir o revierte si hay error."""
+        conn, lock = self._connection()
+        with lock:
+            with conn:
+                yield conn
+
     def _init_database(self):
         """Inicializa la base de datos SQLite con la tabla de logs."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS email_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                timestamp DATETIME NOT NULL,
-                recipient_email TEXT NOT NULL,
-                recipient_name TEXT,
-                subject TEXT NOT NULL,
-                letter_count INTEGER NOT NULL,
-                status TEXT NOT NULL,
-                error_message TEXT,
-                letter_ids TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # Índice para búsquedas rápidas por fecha y email
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_timestamp ON email_logs(timestamp)
-        ''')
-        cursor.execute('''
-            CREATE INDEX IF NOT EXISTS idx_email ON email_logs(recipient_email)
-        ''')
-        
-        conn.commit()
-        conn.close()
-    
+        with self._transaction() as conn:
+            cursor = conn.cursor()
+
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS email_logs (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp DATETIME NOT NULL,
+                    recipient_email TEXT NOT NULL,
+                    recipient_name TEXT,
+                    subject TEXT NOT NULL,
+                    letter_count INTEGER NOT NULL,
+                    status TEXT NOT NULL,
+                    error_message TEXT,
+                    letter_ids TEXT,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+
+            # Índice para búsquedas rápidas por fecha y email
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_timestamp ON email_logs(timestamp)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_email ON email_logs(recipient_email)
+            ''')
+
+            # Totales diarios por estado (get_stats no recorre email_logs)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS email_daily_stats (
+                    day TEXT NOT NULL,
+                    status TEXT NOT NULL,
+                    emails INTEGER NOT NULL DEFAULT 0,
+                    letters INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (day, status)
+                )
+            ''')
+            # Bases existentes: calcular los totales una vez a partir del log
+            cursor.execute('''
+                INSERT INTO email_daily_stats (day, status, emails, letters)
+                SELECT substr(timestamp, 1, 10), status, COUNT(*), COALESCE(SUM(letter_count), 0)
+                FROM email_logs
+                WHERE NOT EXISTS (SELECT 1 FROM email_daily_stats)
+                GROUP BY substr(timestamp, 1, 10), status
+            ''')
+
+            # Progreso por destinatario de los lotes encolados (Celery)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS email_batch_recipients (
+                    batch_id TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    recipient_email TEXT NOT NULL,
+                    recipient_name TEXT,
+                    status TEXT NOT NULL,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error_message TEXT,
+                    next_attempt_at DATETIME,
+                    updated_at DATETIME NOT NULL,
+                    PRIMARY KEY (batch_id, recipient_email)
+                )
+            ''')
+
+        self._initialized.add(self.db_path)
+
+    @contextmanager
+    def batch(self):
+        """
+        Agrupa los registros de un lote de envío en una sola escritura.
+
+        Uso:
+            with logger.batch():
+                logger.log_email_sent(...)
+                ...
+        """
+        self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            self._batch_depth -= 1
+            if not self._batch_depth:
+                self.flush()
+
+    def flush(self):
+        """Escribe los registros pendientes y sus totales diarios en una transacción."""
+        if not self._pending:
+            return
+        rows, self._pending = self._pending, []
+        try:
+            self._write(rows)
+        except sqlite3.IntegrityError:
+            # Un registro inválido no debe perder el resto del lote
+            for row in rows:
+                try:
+                    self._write([row])
+                except sqlite3.IntegrityError as e:
+                    print(f"[WARN] Registro de auditoría descartado ({row[1]}): {e}")
+
+    def _write(self, rows):
+        daily = Counter()
+        letters = Counter()
+        for row in rows:
+            key = (row[0][:10], row[5])
+            daily[key] += 1
+            letters[key] += row[4] or 0
+
+        with self._transaction() as conn:
+            conn.executemany(self._INSERT_LOG, rows)
+            conn.executemany(self._UPSERT_DAILY, [
+                (day, status, count, letters[(day, status)]) for (day, status), count in daily.items()
+            ])
+
+    def _log(self, row):
+        self._pending.append(row)
+        if not self._batch_depth or len(self._pending) >= self.FLUSH_SIZE:
+            self.flush()
+
     def log_email_sent(self, recipient_email, recipient_name, subject, letter_count, letter_ids=None):
         """
         Registra un envío exitoso de correo.
-        
+
         Args:
             recipient_email (str): Email del destinatario
             recipient_name (str): Nombre del destinatario
@@ -76,31 +219,23 @@ class EmailLogger:
             letter_count (int): Cantidad de letras incluidas
             letter_ids (list, optional): IDs de las letras enviadas
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         letter_ids_str = ','.join(map(str, letter_ids)) if letter_ids else None
-        
-        cursor.execute('''
-            INSERT INTO email_logs 
-            (timestamp, recipient_email, recipient_name, subject, letter_count, status, letter_ids)
-            VALUES (?, ?, ?, ?, ?, 'sent', ?)
-        ''', (
+
+        self._log((
             datetime.now().isoformat(),
             recipient_email,
             recipient_name,
             subject,
             letter_count,
+            'sent',
+            None,
             letter_ids_str
         ))
-        
-        conn.commit()
-        conn.close()
-    
+
     def log_email_failed(self, recipient_email, recipient_name, subject, error_message, letter_ids=None):
         """
         Registra un fallo en el envío de correo.
-        
+
         Args:
             recipient_email (str): Email del destinatario
             recipient_name (str): Nombre del destinatario
@@ -108,116 +243,199 @@ class EmailLogger:
             error_message (str): Mensaje de error
             letter_ids (list, optional): IDs de las letras que se intentaron enviar
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
         letter_ids_str = ','.join(map(str, letter_ids)) if letter_ids else None
-        
-        cursor.execute('''
-            INSERT INTO email_logs 
-            (timestamp, recipient_email, recipient_name, subject, letter_count, status, error_message, letter_ids)
-            VALUES (?, ?, ?, ?, ?, 'failed', ?, ?)
-        ''', (
+
+        self._log((
             datetime.now().isoformat(),
             recipient_email,
             recipient_name,
             subject,
             len(letter_ids) if letter_ids else 0,
+            'failed',
             error_message,
             letter_ids_str
         ))
-        
-        conn.commit()
-        conn.close()
-    
+
+    @staticmethod
+    def _end_of_day(end_date):
+        # Los timestamps son ISO ('YYYY-MM-DDTHH:MM:SS...'): incluir todo el día final
+        return end_date + 'T23:59:59.999999' if len(end_date) == 10 else end_date
+
     def get_logs(self, start_date=None, end_date=None, recipient_email=None, limit=100):
         """
         Obtiene logs de envíos.
-        
+
         Args:
             start_date (str, optional): Fecha inicial (YYYY-MM-DD)
             end_date (str, optional): Fecha final (YYYY-MM-DD)
             recipient_email (str, optional): Filtrar por email
             limit (int): Límite de registros (default: 100)
-        
+
         Returns:
             list: Lista de diccionarios con los logs
         """
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
-        cursor = conn.cursor()
-        
+        self.flush()
+
         query = 'SELECT * FROM email_logs WHERE 1=1'
         params = []
-        
+
         if start_date:
             query += ' AND timestamp >= ?'
             params.append(start_date)
-        
+
         if end_date:
             query += ' AND timestamp <= ?'
-            params.append(end_date + ' 23:59:59')
-        
+            params.append(self._end_of_day(end_date))
+
         if recipient_email:
             query += ' AND recipient_email = ?'
             params.append(recipient_email)
-        
+
         query += ' ORDER BY timestamp DESC LIMIT ?'
         params.append(limit)
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
-        conn.close()
-        
+
+        with self._transaction() as conn:
+            rows = conn.execute(query, params).fetchall()
+
         return [dict(row) for row in rows]
-    
+
     def get_stats(self, start_date=None, end_date=None):
         """
         Obtiene estadísticas de envíos.
-        
+
+        Con fechas YYYY-MM-DD (o sin fechas) se suman los totales diarios;
+        con fecha y hora se cuenta sobre email_logs.
+
         Args:
             start_date (str, optional): Fecha inicial (YYYY-MM-DD)
             end_date (str, optional): Fecha final (YYYY-MM-DD)
-        
+
         Returns:
             dict: Estadísticas (total_sent, total_failed, total_emails, total_letters)
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = 'SELECT status, COUNT(*) as count, SUM(letter_count) as total_letters FROM email_logs WHERE 1=1'
+        self.flush()
+
+        by_day = all(not value or len(value) == 10 for value in (start_date, end_date))
+        if by_day:
+            query = 'SELECT status, SUM(emails) AS count, SUM(letters) AS total_letters FROM email_daily_stats WHERE 1=1'
+            column = 'day'
+        else:
+            query = 'SELECT status, COUNT(*) AS count, SUM(letter_count) AS total_letters FROM email_logs WHERE 1=1'
+            column = 'timestamp'
         params = []
-        
+
         if start_date:
-            query += ' AND timestamp >= ?'
+            query += f' AND {column} >= ?'
             params.append(start_date)
-        
+
         if end_date:
-            query += ' AND timestamp <= ?'
-            params.append(end_date + ' 23:59:59')
-        
+            query += f' AND {column} <= ?'
+            params.append(end_date if by_day else self._end_of_day(end_date))
+
         query += ' GROUP BY status'
-        
-        cursor.execute(query, params)
-        rows = cursor.fetchall()
-        
+
+        with self._transaction() as conn:
+            rows = conn.execute(query, params).fetchall()
+
         stats = {
             'total_sent': 0,
             'total_failed': 0,
             'total_emails': 0,
             'total_letters': 0
         }
-        
+
         for row in rows:
-            status, count, letters = row
+            status, count, letters = row['status'], row['count'], row['total_letters']
             stats['total_emails'] += count
             stats['total_letters'] += letters or 0
             if status == 'sent':
                 stats['total_sent'] = count
             elif status == 'failed':
                 stats['total_failed'] = count
-        
-        conn.close()
+
         return stats
 
+    def create_batch(self, batch_id, kind, recipients):
+        """
+        Registra un lote encolado con todos sus destinatarios en estado 'queued'.
+
+        Args:
+            batch_id (str): ID del lote
+            kind (str): Tipo de envío ('acceptance', 'recover', 'bank')
+            recipients (list): Destinatarios (dict con 'email' y 'name')
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany('''
+                INSERT OR REPLACE INTO email_batch_recipients
+                (batch_id, kind, recipient_email, recipient_name, status, attempts, updated_at)
+                VALUES (?, ?, ?, ?, 'queued', 0, ?)
+            ''', [
+                (batch_id, kind, r.get('email'), r.get('name'), now) for r in recipients
+            ])
+
+    def update_batch_recipients(self, batch_id, updates):
+        """
+        Actualiza el estado de destinatarios de un lote.
+
+        Args:
+            batch_id (str): ID del lote
+            updates (list): dict con 'email', 'status' ('sending', 'sent',
+                'retrying', 'failed') y opcionalmente 'error', 'next_attempt_at'
+                y 'attempted' (suma un intento)
+        """
+        now = datetime.now().isoformat()
+        with self._transaction() as conn:
+            conn.executemany('''
+                UPDATE email_batch_recipients
+                SET status = ?, error_message = ?, next_attempt_at = ?,
+                    attempts = attempts + ?, updated_at = ?
+                WHERE batch_id = ? AND recipient_email = ?
+            ''', [
+                (u['status'], u.get('error'), u.get('next_attempt_at'),
+                 1 if u.get('attempted') else 0, now, batch_id, u['email'])
+                for u in updates
+            ])
+
+    def get_batch(self, batch_id):
+        """
+        Obtiene el progreso de un lote.
+
+        Returns:
+            dict: batch_id, kind, status, total, conteo por estado y
+                  destinatarios; None si el lote no existe
+        """
+        with self._transaction() as conn:
+            rows = conn.execute('''
+                SELECT * FROM email_batch_recipients
+                WHERE batch_id = ?
+                ORDER BY recipient_email
+            ''', (batch_id,)).fetchall()
+
+        if not rows:
+            return None
+
+        counts = {'queued': 0, 'sending': 0, 'retrying': 0, 'sent': 0, 'failed': 0}
+        for row in rows:
+            counts[row['status']] = counts.get(row['status'], 0) + 1
+        pending = counts['queued'] + counts['sending'] + counts['retrying']
+
+        return {
+            'batch_id': batch_id,
+            'kind': rows[0]['kind'],
+            'status': 'done' if not pending else ('queued' if counts['queued'] == len(rows) else 'sending'),
+            'total': len(rows),
+            'counts': counts,
+            'recipients': [
+                {
+                    'email': row['recipient_email'],
+                    'name': row['recipient_name'],
+                    'status': row['status'],
+                    'attempts': row['attempts'],
+                    'error': row['error_message'],
+                    'next_attempt_at': row['next_attempt_at'],
+                    'updated_at': row['updated_at'],
+                }
+                for row in rows
+            ]
+        }
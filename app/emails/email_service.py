@@ -3,16 +3,43 @@
 Servicio de Envío de Emails.
 """
 
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from functools import lru_cache
 from pathlib import Path
 from flask_mail import Mail, Message
 from flask import current_app
 from jinja2 import Environment, FileSystemLoader
 from app.emails.email_logger import EmailLogger
+from app.emails.smtp_pool import SMTPConnectionPool
+
+
+@lru_cache(maxsize=4096)
+def _format_odoo_date(value):
+    """
+    'YYYY-MM-DD' de Odoo -> 'DD/MM/YYYY' (memoizado: en un lote las letras
+    comparten pocas fechas). Devuelve None si no es una fecha válida.
+    """
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').strftime('%d/%m/%Y')
+    except (TypeError, ValueError):
+        return None
+
 
 class EmailService:
     """
     Servicio para envío de correos electrónicos.
     """
+
+    # Caché de renderizado por proceso: entornos Jinja (con sus templates
+    # compilados) por directorio y adjuntos inline leídos una sola vez
+    _environments = {}
+    _inline_assets = {}
+    _render_lock = threading.Lock()
+
+    # Logo corporativo adjunto como CID (<logo_agrovet>) en los correos de letras
+    LOGO_ASSET = ('public', 'img', 'agrovet-market.png')
     
     def __init__(self, mail_instance=None):
         """
@@ -51,49 +78,141 @@ class EmailService:
         project_root = Path(current_app.root_path).parent
         return project_root / 'frontend' / 'email-templates'
 
+    def _get_template_environment(self):
+        """
+        Entorno Jinja2 del proceso para frontend/email-templates.
+
+        Se crea una sola vez; los templates quedan compilados en su caché.
+        Solo en modo debug revisa si el archivo cambió en disco.
+        """
+        templates_dir = str(self._get_frontend_templates_dir())
+        env = self._environments.get(templates_dir)
+        if env is None:
+            with self._render_lock:
+                env = self._environments.get(templates_dir)
+                if env is None:
+                    env = Environment(
+                        loader=FileSystemLoader(templates_dir),
+                        auto_reload=current_app.debug
+                    )
+                    self._environments[templates_dir] = env
+        return env
+
     def _render_email_template(self, template_name, **context):
         """
         Renderiza un template Jinja2 desde frontend/email-templates.
         """
-        templates_dir = self._get_frontend_templates_dir()
-        env = Environment(loader=FileSystemLoader(str(templates_dir)))
-        template = env.get_template(template_name)
+        template = self._get_template_environment().get_template(template_name)
         return template.render(**context)
-    
-    def send_letters_to_recover(self, recipients_data, sender_email=None):
+
+    def _get_inline_asset(self, *parts):
         """
-        Envía correos de letras por recuperar.
-        
+        Contenido (bytes) de un recurso de frontend/ para adjuntar inline.
+
+        Se lee del disco una vez por proceso. Devuelve None si no existe.
+        """
+        path = Path(current_app.root_path).parent.joinpath('frontend', *parts)
+        key = str(path)
+        if key not in self._inline_assets:
+            try:
+                data = path.read_bytes()
+            except OSError as e:
+                print(f"[WARN] No se pudo leer el recurso inline {path}: {e}")
+                data = None
+            self._inline_assets[key] = data
+        return self._inline_assets[key]
+
+    def _send_all(self, messages):
+        """
+        Envía un lote de mensajes reutilizando un pool de conexiones SMTP.
+
+        En vez de una conexión (STARTTLS + login) por correo, abre como máximo
+        MAIL_POOL_SIZE conexiones autenticadas y reparte los mensajes entre
+        ellas; una conexión que el servidor corta se reabre y el correo se
+        reintenta.
+
         Args:
-            recipients_data (list): Lista de dict con datos de destinatarios
-                [{
-                    'email': 'cliente@example.com',
-                    'name': 'Cliente',
-                    'letters': [...]  # Datos de letras
-                }, ...]
-        
+            messages (list): Mensajes (flask_mail.Message)
+
         Returns:
-            dict: Resultado del envío
+            list: Error de cada mensaje (None si se envió), en el mismo orden
+        """
+        if not messages:
+            return []
+
+        size = min(int(current_app.config.get('MAIL_POOL_SIZE', 3) or 1), len(messages))
+        # Connection.send necesita contexto de aplicación (señal email_dispatched)
+        app = current_app._get_current_object()
+
+        with SMTPConnectionPool(self.mail, size=size) as pool:
+            def deliver(msg):
+                with app.app_context():
+                    try:
+                        pool.send(msg)
+                        return None
+                    except Exception as e:
+                        return e
+
+            if size == 1:
+                errors = [deliver(msg) for msg in messages]
+            else:
+                with ThreadPoolExecutor(max_workers=size) as executor:
+                    errors = list(executor.map(deliver, messages))
+
+        print(f"[INFO] Lote SMTP: {len(messages)} correos, {pool.connections_opened} conexiones")
+        return errors
+
+    @staticmethod
+    def _tally(results, email, label, error=None):
+        """
+        Registra el resultado de un destinatario en el resumen del envío.
+
+        'recipients' detalla cada destinatario (estado y si el error es
+        temporal), para que la cola de correos reintente solo a esos.
+
+        Returns:
+            str: Mensaje de error (None si se envió)
+        """
+        if error is None:
+            results['sent'] += 1
+            results['recipients'].append({'email': email, 'status': 'sent', 'error': None, 'retryable': False})
+            return None
+
+        error_msg = f"Error enviando a {label}: {str(error)}"
+        results['failed'] += 1
+        results['errors'].append(error_msg)
+        results['recipients'].append({
+            'email': email,
+            'status': 'failed',
+            'error': str(error),
+            'retryable': SMTPConnectionPool.is_transient(error)
+        })
+        return error_msg
+
+    def _send_letters(self, recipients_data, template_name, subject_prefix, sender_email=None):
+        """
+        Renderiza y envía correos de letras (por recuperar / en banco) en lote.
         """
         results = {
             'sent': 0,
             'failed': 0,
-            'errors': []
+            'errors': [],
+            'recipients': []
         }
-        
+        outgoing = []
+
         for recipient in recipients_data:
             try:
                 # Renderizar template (ubicado en frontend/email-templates)
                 html_body = self._render_email_template(
-                    'letters_recover.html',
+                    template_name,
                     customer_name=recipient['name'],
                     letters=recipient['letters']
                 )
                 
                 # Configurar mensaje
-                subject = f"Recordatorio de Firma de Letras - {recipient['name']}"
+                subject = f"{subject_prefix} - {recipient['name']}"
                 
-                # Enviar correo
                 if self.mail:
                     resolved_sender = self._resolve_sender_email(sender_email)
                     msg = Message(
@@ -103,69 +222,58 @@ class EmailService:
                         sender=resolved_sender,
                         reply_to=resolved_sender
                     )
-                    self.mail.send(msg)
-                    print(f"[OK] Email enviado a {recipient['email']}")
+                    outgoing.append((recipient, msg))
                 else:
                     # MOCK SEND: Imprimir en consola si no hay configuración de mail
                     print(f"--- SIMULATING EMAIL SEND TO {recipient['email']} ---")
                     print(f"Subject: {subject}")
                     print("------------------------------------------------")
-                
-                results['sent'] += 1
+                    self._tally(results, recipient.get('email'), recipient.get('name', 'Unknown'))
                 
             except Exception as e:
-                results['failed'] += 1
-                results['errors'].append(f"Error enviando a {recipient.get('name', 'Unknown')}: {str(e)}")
+                self._tally(results, recipient.get('email'), recipient.get('name', 'Unknown'), e)
+
+        # Enviar correos por el pool de conexiones
+        errors = self._send_all([msg for _, msg in outgoing])
+        for (recipient, _), error in zip(outgoing, errors):
+            self._tally(results, recipient['email'], recipient.get('name', 'Unknown'), error)
+            if error is None:
+                print(f"[OK] Email enviado a {recipient['email']}")
         
         return results
     
+    def send_letters_to_recover(self, recipients_data, sender_email=None):
+        """
+        Envía correos de letras por recuperar.
+        
+        Args:
+            recipients_data (list): Lista de dict con datos de destinatarios
+                [{
+                    'email': 'cliente@example.com',
+                    'name': 'Cliente',
+                    'letters': [...]  # Datos de letras
+                }, ...]
+        
+        Returns:
+            dict: Resultado del envío
+        """
+        return self._send_letters(
+            recipients_data,
+            'letters_recover.html',
+            'Recordatorio de Firma de Letras',
+            sender_email
+        )
+    
     def send_letters_in_bank(self, recipients_data, sender_email=None):
         """
         Envía correos de letras en banco.
         """
-        results = {
-            'sent': 0,
-            'failed': 0,
-            'errors': []
-        }
-        
-        for recipient in recipients_data:
-            try:
-                # Renderizar template (ubicado en frontend/email-templates)
-                html_body = self._render_email_template(
-                    'letters_bank.html',
-                    customer_name=recipient['name'],
-                    letters=recipient['letters']
-                )
-                
-                # Configurar mensaje
-                subject = f"Aviso de Letras Disponibles para Pago - {recipient['name']}"
-                
-                # Enviar correo
-                if self.mail:
-                    resolved_sender = self._resolve_sender_email(sender_email)
-                    msg = Message(
-                        subject=subject,
-                        recipients=[recipient['email']],
-                        html=html_body,
-                        sender=resolved_sender,
-                        reply_to=resolved_sender
-                    )
-                    self.mail.send(msg)
-                    print(f"[OK] Email enviado a {recipient['email']}")
-                else:
-                    # MOCK SEND
-                    print(f"--- SIMULATING EMAIL SEND TO {recipient['email']} ---")
-                    print(f"Subject: {subject}")
-                    print("------------------------------------------------")
-                
-                results['sent'] += 1
-                
-            except Exception as e:
-                results['failed'] += 1
-                results['errors'].append(f"Error enviando a {recipient.get('name', 'Unknown')}: {str(e)}")
-                
-        return results
+        return self._send_letters(
+            recipients_data,
+            'letters_bank.html',
+            'Aviso de Letras Disponibles para Pago',
+            sender_email
+        )
     
     def send_detraction_certificates(self, recipients_data):
         """
@@ -173,7 +281,7 @@ class EmailService:
         """
         raise NotImplementedError("Funcionalidad pendiente de implementación")
     
-    def send_acceptance_reminders(self, recipients_data, sender_email=None):
+    def send_acceptance_reminders(self, recipients_data, sender_email=None, final_attempt=True):
         """
         Envía correos para firma de letras (estado 'to_accept').
         
@@ -184,49 +292,55 @@ class EmailService:
                     'name': 'Cliente',
                     'letters': [...]  # Datos de letras
                 }, ...]
+            final_attempt (bool): False si la cola reintentará los errores
+                temporales; esos no se registran en la auditoría (solo el
+                resultado final de cada destinatario)
         
         Returns:
             dict: Resultado del envío
         """
+        # Auditoría del lote escrita en una sola transacción al terminar
+        with self.logger.batch():
+            return self._send_acceptance_reminders(recipients_data, sender_email, final_attempt)
+
+    def _send_acceptance_reminders(self, recipients_data, sender_email=None, final_attempt=True):
         results = {
             'sent': 0,
             'failed': 0,
-            'errors': []
+            'errors': [],
+            'recipients': []
         }
-        
+
         # Verificar si estamos en modo desarrollo
         dev_mode = current_app.config.get('DEV_EMAIL_MODE', False)
         dev_email = current_app.config.get('DEV_EMAIL_RECIPIENT', 'creditosycobranzas@agrovetmarket.com')
         
-        from datetime import datetime
         now = datetime.now()
         # Formato 3/2/2026 para el cuerpo y 03/02/26 para el asunto
         today_str = f"{now.day}/{now.month}/{now.year}"
         subject_date = now.strftime("%d/%m/%y")
 
+        # Logo precargado (se adjunta inline como CID en cada correo)
+        logo_bytes = self._get_inline_asset(*self.LOGO_ASSET) if self.mail else None
+
+        # Fase 1: renderizar y armar los mensajes; fase 2: enviarlos por el pool
+        outgoing = []
+
         for recipient in recipients_data:
+            subject = None
             try:
                 # Formatear fechas para el reporte
                 formatted_letters = []
                 for l in recipient['letters']:
                     # Clonar y formatear fecha de vencimiento y factura
                     letter_copy = l.copy()
-                    if l.get('due_date'):
-                        try:
-                            date_obj = datetime.strptime(l['due_date'], '%Y-%m-%d')
-                            letter_copy['due_date'] = date_obj.strftime('%d/%m/%Y')
-                        except:
-                            pass
-                    
-                    if l.get('invoice_date'):
-                        try:
-                            # Odoo a veces envía datetime o string YYYY-MM-DD
-                            inv_date = l['invoice_date']
-                            if isinstance(inv_date, str):
-                                date_obj = datetime.strptime(inv_date, '%Y-%m-%d')
-                                letter_copy['invoice_date'] = date_obj.strftime('%d/%m/%Y')
-                        except:
-                            pass
+                    # Odoo a veces envía datetime o string YYYY-MM-DD
+                    for field in ('due_date', 'invoice_date'):
+                        value = l.get(field)
+                        if value and isinstance(value, str):
+                            formatted = _format_odoo_date(value)
+                            if formatted:
+                                letter_copy[field] = formatted
                     
                     formatted_letters.append(letter_copy)
 
@@ -251,7 +365,6 @@ class EmailService:
                 if dev_mode:
                     subject = f"[DEV - Original: {original_email}] {subject}"
                 
-                # Enviar correo
                 if self.mail:
                     resolved_sender = self._resolve_sender_email(sender_email)
                     msg = Message(
@@ -263,36 +376,16 @@ class EmailService:
                     )
                     
                     # Adjuntar logo como CID para que se muestre inline
-                    try:
-                        import os
-                        logo_path = os.path.join(current_app.root_path, '..', 'frontend', 'public', 'img', 'agrovet-market.png')
-                        if os.path.exists(logo_path):
-                            with open(logo_path, 'rb') as f:
-                                msg.attach(
-                                    "agrovet-market.png",
-                                    "image/png",
-                                    f.read(),
-                                    'inline',
-                                    headers=[['Content-ID', '<logo_agrovet>']]
-                                )
-                    except Exception as img_err:
-                        print(f"[WARN] No se pudo adjuntar el logo: {img_err}")
-
-                    self.mail.send(msg)
-                    
-                    if dev_mode:
-                        print(f"[DEV MODE] Email redirigido de {original_email} a {actual_recipient}")
-                    else:
-                        print(f"[OK] Email de aceptación enviado a {original_email}")
-                    
-                    # Log exitoso
-                    self.logger.log_email_sent(
-                        recipient_email=original_email,
-                        recipient_name=recipient['name'],
-                        subject=subject,
-                        letter_count=len(recipient['letters']),
-                        letter_ids=letter_ids
-                    )
+                    if logo_bytes:
+                        msg.attach(
+                            "agrovet-market.png",
+                            "image/png",
+                            logo_bytes,
+                            'inline',
+                            headers=[['Content-ID', '<logo_agrovet>']]
+                        )
+
+                    outgoing.append((recipient, msg, letter_ids))
                 else:
                     # MOCK SEND (para desarrollo sin configuración SMTP)
                     print(f"--- SIMULATING EMAIL SEND TO {actual_recipient} ---")
@@ -309,32 +402,128 @@ class EmailService:
                         letter_count=len(recipient['letters']),
                         letter_ids=letter_ids
                     )
-                
-                results['sent'] += 1
+                    self._tally(results, original_email, recipient['name'])
                 
             except Exception as e:
-                results['failed'] += 1
-                error_msg = f"Error enviando a {recipient.get('name', 'Unknown')}: {str(e)}"
-                results['errors'].append(error_msg)
-                print(f"[ERROR] {error_msg}")
-                
-                # Log del error
-                letter_ids = [l.get('id') for l in recipient.get('letters', []) if l.get('id')]
-                self.logger.log_email_failed(
-                    recipient_email=recipient.get('email', 'unknown'),
-                    recipient_name=recipient.get('name', 'Unknown'),
-                    subject=subject,
-                    error_message=str(e),
-                    letter_ids=letter_ids
-                )
-                
+                self._record_acceptance_failure(results, recipient, subject, e, final_attempt)
                 import traceback
                 traceback.print_exc()
+
+        # Enviar correos por el pool de conexiones
+        errors = self._send_all([msg for _, msg, _ in outgoing])
+        for (recipient, msg, letter_ids), error in zip(outgoing, errors):
+            if error is not None:
+                self._record_acceptance_failure(results, recipient, msg.subject, error, final_attempt)
+                continue
+
+            if dev_mode:
+                print(f"[DEV MODE] Email redirigido de {recipient['email']} a {msg.recipients[0]}")
+            else:
+                print(f"[OK] Email de aceptación enviado a {recipient['email']}")
+            
+            # Log exitoso
+            self.logger.log_email_sent(
+                recipient_email=recipient['email'],
+                recipient_name=recipient['name'],
+                subject=msg.subject,
+                letter_count=len(recipient['letters']),
+                letter_ids=letter_ids
+            )
+            self._tally(results, recipient['email'], recipient['name'])
         
         return results
+
+    def _record_acceptance_failure(self, results, recipient, subject, error, final_attempt=True):
+        """
+        Registra un envío de aceptación fallido en el resultado y la auditoría.
+
+        Un error temporal que la cola va a reintentar no se audita: quedaría
+        como fallido un correo que quizá se envía en el intento siguiente.
+        """
+        error_msg = self._tally(results, recipient.get('email'), recipient.get('name', 'Unknown'), error)
+        print(f"[ERROR] {error_msg}")
+        if not final_attempt and results['recipients'][-1]['retryable']:
+            return
+        
+        # Log del error
+        letter_ids = [l.get('id') for l in recipient.get('letters', []) if l.get('id')]
+        self.logger.log_email_failed(
+            recipient_email=recipient.get('email', 'unknown'),
+            recipient_name=recipient.get('name', 'Unknown'),
+            subject=subject or '',
+            error_message=str(error),
+            letter_ids=letter_ids
+        )
     
-    def send_bulk_email(self, recipients, subject, body_html, attachments=None):
+    def send_bulk_email(self, recipients, subject, body_html, attachments=None, sender_email=None):
         """
         Método genérico para envío masivo de correos.
+
+        Envía el mismo asunto y cuerpo a cada destinatario (un correo por
+        destinatario) reutilizando el pool de conexiones SMTP.
+
+        Args:
+            recipients (list): Emails o dict {'email': ..., 'name': ...}
+            subject (str): Asunto
+            body_html (str): Cuerpo HTML
+            attachments (list): Adjuntos como tuplas (filename, content_type, data)
+                o dict {'filename', 'content_type', 'data', 'disposition', 'headers'}
+            sender_email (str): Remitente (se valida contra el dominio corporativo)
+
+        Returns:
+            dict: Resultado del envío
         """
-        raise NotImplementedError("Funcionalidad pendiente de implementación")
+        results = {
+            'sent': 0,
+            'failed': 0,
+            'errors': [],
+            'recipients': []
+        }
+        outgoing = []
+        resolved_sender = self._resolve_sender_email(sender_email) if self.mail else None
+
+        for recipient in recipients:
+            email = recipient.get('email') if isinstance(recipient, dict) else recipient
+            try:
+                if not email:
+                    raise ValueError("Destinatario sin email")
+
+                if not self.mail:
+                    # MOCK SEND
+                    print(f"--- SIMULATING EMAIL SEND TO {email} ---")
+                    print(f"Subject: {subject}")
+                    print("------------------------------------------------")
+                    self._tally(results, email, email)
+                    continue
+
+                msg = Message(
+                    subject=subject,
+                    recipients=[email],
+                    html=body_html,
+                    sender=resolved_sender,
+                    reply_to=resolved_sender
+                )
+                for attachment in attachments or []:
+                    if isinstance(attachment, dict):
+                        msg.attach(
+                            attachment['filename'],
+                            attachment.get('content_type', 'application/octet-stream'),
+                            attachment['data'],
+                            attachment.get('disposition', 'attachment'),
+                            headers=attachment.get('headers')
+                        )
+                    else:
+                        msg.attach(*attachment)
+                outgoing.append((email, msg))
+
+            except Exception as e:
+                self._tally(results, email, email or 'Unknown', e)
+
+        # Enviar correos por el pool de conexiones
+        errors = self._send_all([msg for _, msg in outgoing])
+        for (email, _), error in zip(outgoing, errors):
+            self._tally(results, email, email, error)
+            if error is None:
+                print(f"[OK] Email enviado a {email}")
+
+        return results
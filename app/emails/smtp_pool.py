@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Pool de conexiones SMTP para envíos masivos.
+
+`mail.send(msg)` de Flask-Mail abre una conexión nueva por correo (conexión,
+STARTTLS y login): enviar a 200 clientes son 200 handshakes, lento y con
+riesgo de que Gmail limite la cuenta. El pool mantiene unas pocas conexiones
+autenticadas (`mail.connect()`) que se reutilizan para todos los correos de un
+lote y se reabren solas si el servidor las corta.
+"""
+
+import queue
+import smtplib
+import threading
+
+
+class SMTPConnectionPool:
+    """
+    Conexiones SMTP autenticadas reutilizables durante un envío masivo.
+
+    Uso:
+        with SMTPConnectionPool(mail, size=3) as pool:
+            pool.send(msg)
+    """
+
+    # Errores que indican conexión caída: se reconecta y se reintenta el correo
+    RECONNECT_ERRORS = (
+        smtplib.SMTPServerDisconnected,
+        smtplib.SMTPConnectError,
+        smtplib.SMTPHeloError,
+        ConnectionError,
+        TimeoutError,
+    )
+    # 421: servicio no disponible / demasiadas conexiones (cierra la sesión)
+    RECONNECT_CODES = (421,)
+
+    def __init__(self, mail, size=2, reconnect_attempts=1):
+        """
+        Args:
+            mail: Estado de Flask-Mail (`current_app.extensions['mail']`)
+            size (int): Máximo de conexiones abiertas a la vez
+            reconnect_attempts (int): Reconexiones por correo ante conexión caída
+        """
+        self.mail = mail
+        self.size = max(1, int(size))
+        self.reconnect_attempts = reconnect_attempts
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+        self._open = []
+        self.connections_opened = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
+
+    def _connect(self):
+        connection = self.mail.connect()
+        connection.__enter__()
+        with self._lock:
+            self._open.append(connection)
+            self.connections_opened += 1
+        return connection
+
+    def _discard(self, connection):
+        with self._lock:
+            if connection in self._open:
+                self._open.remove(connection)
+        try:
+            connection.__exit__(None, None, None)
+        except Exception:
+            # La conexión ya estaba caída; no hay sesión que cerrar
+            pass
+
+    def _acquire(self):
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            return self._connect()
+        except Exception:
+            self._slots.release()
+            raise
+
+    def _release(self, connection):
+        self._idle.put(connection)
+        self._slots.release()
+
+    def _is_disconnect(self, error):
+        if isinstance(error, self.RECONNECT_ERRORS):
+            return True
+        return isinstance(error, smtplib.SMTPResponseException) and error.smtp_code in self.RECONNECT_CODES
+
+    @classmethod
+    def is_transient(cls, error):
+        """
+        Indica si un error de envío es temporal (conviene reintentar más tarde).
+
+        Conexión caída y respuestas 4xx son temporales; destinatario rechazado
+        con 5xx, errores de autenticación o del propio mensaje no lo son.
+        """
+        if isinstance(error, smtplib.SMTPRecipientsRefused):
+            codes = [code for code, _ in error.recipients.values()]
+            return bool(codes) and all(400 <= code < 500 for code in codes)
+        if isinstance(error, smtplib.SMTPResponseException):
+            return 400 <= error.smtp_code < 500
+        return isinstance(error, cls.RECONNECT_ERRORS + (OSError,))
+
+    def send(self, message):
+        """
+        Envía un mensaje por una conexión del pool.
+
+        Si la conexión está caída se descarta, se abre otra y se reintenta el
+        mismo mensaje. Errores propios del correo (destinatario rechazado,
+        etc.) se propagan sin reconectar.
+
+        Args:
+            message (flask_mail.Message): Mensaje a enviar
+        """
+        attempt = 0
+        while True:
+            connection = self._acquire()
+            try:
+                connection.send(message)
+            except Exception as e:
+                if not self._is_disconnect(e):
+                    self._release(connection)
+                    raise
+                self._discard(connection)
+                self._slots.release()
+                if attempt >= self.reconnect_attempts:
+                    raise
+                attempt += 1
+                print(f"[WARN] Conexión SMTP perdida ({e}); reconectando...")
+                continue
+            self._release(connection)
+            return
+
+    def close(self):
+        """Cierra (QUIT) todas las conexiones abiertas."""
+        with self._lock:
+            connections, self._open = self._open, []
+        for connection in connections:
+            try:
+                connection.__exit__(None, None, None)
+            except Exception:
+                pass
+        while not self._idle.empty():
+            self._idle.get_nowait()
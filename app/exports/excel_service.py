@@ -3,298 +3,318 @@
 Servicio de Exportación a Excel.
 
 Genera archivos Excel a partir de datos de reportes.
+
+Los reportes se escriben en modo `write_only` de openpyxl: cada fila se
+serializa al XML de la hoja en cuanto se agrega, así la memoria no crece con
+el número de filas. Los estilos son estilos con nombre registrados una sola vez
+por libro y asignados por columna (una celda prototipo por columna que se
+reutiliza en cada fila), en lugar de crear bordes/fuentes/formatos por celda.
+El archivo se arma en un temporal que `send_file` transmite por bloques.
+
+Las hojas resumen (summaries.py) se acumulan durante la misma pasada que
+escribe el detalle y se agregan al final del libro.
 """
 
-from io import BytesIO
-from datetime import datetime
+import tempfile
 import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
 
+from app.exports.export_plan import COLUMN_KINDS, ExportPlan
+from app.exports.summaries import SummarySheet
+
 
 class ExcelExportService:
     """
     Servicio para exportar datos a archivos Excel con formato profesional.
     """
-    
+
     # Estilos predefinidos
     HEADER_FILL = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
     HEADER_FONT = Font(bold=True, color="FFFFFF", size=11)
     HEADER_ALIGNMENT = Alignment(horizontal="center", vertical="center", wrap_text=True)
-    
+
     CELL_BORDER = Border(
         left=Side(style='thin'),
         right=Side(style='thin'),
         top=Side(style='thin'),
         bottom=Side(style='thin')
     )
-    
+
+    # Columnas del reporte de cobranzas: (campo, encabezado, tipo, ancho)
+    # Tipos: text, money, days, status (ver export_plan.COLUMN_KINDS)
+    COLLECTIONS_COLUMNS = [
+        ('invoice_date', 'Fecha Factura', 'text', 12),
+        ('date', 'Fecha Contabilización', 'text', 14),
+        ('l10n_latam_document_type_id', 'Tipo Documento', 'text', 14),
+        ('move_name', 'Número Documento', 'text', 16),
+        ('l10n_latam_boe_number', 'Letra', 'text', 12),
+        ('invoice_origin', 'Origen', 'text', 12),
+        ('account_id/code', 'Cuenta', 'text', 10),
+        ('account_id/name', 'Nombre Cuenta', 'text', 25),
+        ('patner_id/vat', 'RUC/DNI', 'text', 12),
+        ('patner_id', 'Cliente', 'text', 30),
+        ('currency_id', 'Moneda', 'text', 10),
+        ('amount_currency', 'Total Moneda Origen', 'money', 18),
+        ('amount_residual_with_retention', 'Adeudado', 'money', 18),
+        ('amount_residual_signed', 'Adeudado S/.', 'money', 18),
+        ('debit', 'Débito', 'money', 14),
+        ('credit', 'Haber', 'money', 14),
+        ('amount_residual_historical', 'Pendiente al corte', 'money', 18),
+        ('paid_after_cutoff', 'Pagado después corte', 'money', 18),
+        ('date_maturity', 'Fecha Vencimiento', 'text', 14),
+        ('dias_vencido', 'Días Vencido', 'days', 12),
+        ('estado_deuda', 'Estado', 'status', 12),
+        ('antiguedad', 'Antigüedad', 'text', 20),
+        ('ref', 'Referencia', 'text', 14),
+        ('invoice_payment_term_id', 'Condición Pago', 'text', 18),
+        ('name', 'Descripción', 'text', 30),
+        ('move_id/invoice_user_id', 'Vendedor', 'text', 20),
+        ('patner_id/state_id', 'Provincia', 'text', 18),
+        ('patner_id/l10n_pe_district', 'Distrito', 'text', 18),
+        ('patner_id/country_code', 'Código País', 'text', 12),
+        ('patner_id/country_id', 'País', 'text', 18),
+        ('team_id', 'Equipo de Ventas', 'text', 20),
+        ('partner_groups', 'Grupos', 'text', 25),
+        ('sub_channel_id', 'Sub Canal', 'text', 18),
+        ('move_id/sales_channel_id', 'Canal de Venta', 'text', 20),
+        ('move_id/sales_type_id', 'Tipo de Venta', 'text', 18),
+    ]
+
+    # Columnas del reporte de tesorería: (campo, encabezado, tipo, ancho)
+    TREASURY_COLUMNS = [
+        ('invoice_date', 'Fecha Factura', 'text', 12),
+        ('date', 'Fecha Contabilización', 'text', 14),
+        ('l10n_latam_document_type_id', 'Tipo Documento', 'text', 14),
+        ('move_name', 'Número Documento', 'text', 16),
+        ('l10n_latam_boe_number', 'Número Letra', 'text', 14),
+        ('ref', 'Referencia', 'text', 12),
+        ('invoice_origin', 'Origen', 'text', 10),
+        ('account_code', 'Cuenta', 'text', 10),
+        ('account_name', 'Nombre Cuenta', 'text', 25),
+        ('supplier_vat', 'RUC Proveedor', 'text', 14),
+        ('supplier_name', 'Proveedor', 'text', 30),
+        ('supplier_country', 'País', 'text', 12),
+        ('supplier_state', 'Provincia', 'text', 18),
+        ('supplier_city', 'Ciudad', 'text', 18),
+        ('supplier_email', 'Email', 'text', 18),
+        ('currency_id', 'Moneda', 'text', 10),
+        ('amount_total_in_currency_signed', 'Total Origen', 'money', 18),
+        ('amount_residual_with_retention', 'Adeudado Origen', 'money', 18),
+        ('amount_total_signed', 'Total S/.', 'money', 18),
+        ('debit', 'Débito', 'money', 14),
+        ('credit', 'Haber', 'money', 14),
+        ('amount_residual_historical', 'Pendiente al corte', 'money', 18),
+        ('paid_after_cutoff', 'Pagado después corte', 'money', 18),
+        ('invoice_date_due', 'Fecha Vencimiento', 'text', 14),
+        ('dias_vencido', 'Días Vencido', 'days', 12),
+        ('estado_deuda', 'Estado', 'status', 12),
+        ('antiguedad', 'Antigüedad', 'text', 20),
+        ('invoice_payment_term_id', 'Condición Pago', 'text', 18),
+        ('payment_state', 'Estado Pago', 'text', 14),
+        ('state', 'Estado Factura', 'text', 14),
+        ('invoice_user_id', 'Usuario Responsable', 'text', 20),
+        ('name', 'Descripción', 'text', 30),
+    ]
+
+    @classmethod
+    def _named_styles(cls):
+        """Estilos con nombre del libro (se registran una vez por archivo)."""
+        center = Alignment(horizontal='center')
+        money_format = COLUMN_KINDS['money'].number_format
+        days_format = COLUMN_KINDS['days'].number_format
+        return [
+            NamedStyle(name='agv_header', fill=cls.HEADER_FILL, font=cls.HEADER_FONT,
+                       alignment=cls.HEADER_ALIGNMENT, border=cls.CELL_BORDER),
+            NamedStyle(name='agv_text', border=cls.CELL_BORDER),
+            NamedStyle(name='agv_money', border=cls.CELL_BORDER, number_format=money_format,
+                       alignment=Alignment(horizontal='right')),
+            NamedStyle(name='agv_days', border=cls.CELL_BORDER, number_format=days_format,
+                       alignment=center),
+            # Resaltar en rojo si está vencido
+            NamedStyle(name='agv_days_overdue', border=cls.CELL_BORDER, number_format=days_format,
+                       alignment=center, font=Font(color="FF0000", bold=True)),
+            # Color de fondo según estado
+            NamedStyle(name='agv_status_ok', border=cls.CELL_BORDER, alignment=center,
+                       fill=PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")),
+            NamedStyle(name='agv_status_overdue', border=cls.CELL_BORDER, alignment=center,
+                       fill=PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")),
+        ]
+
     @staticmethod
-    def export_collections_report(data, filename="reporte_cobranzas.xlsx"):
+    def collections_summaries(cutoff_date=None):
+        """
+        Hojas resumen del reporte de cobranzas: por cuenta, antigüedad y cliente.
+
+        Args:
+            cutoff_date (str, optional): En corte histórico el pendiente es
+                el saldo al corte (misma lógica que el resumen de la vista)
+
+        Returns:
+            list: Instancias nuevas de SummarySheet (acumulan estado)
+        """
+        pending = 'amount_residual_historical' if cutoff_date else 'amount_residual_with_retention'
+        amounts = [
+            ('Documentos', None, 'count', 12),
+            ('Débito', 'debit', 'sum', 16),
+            ('Haber', 'credit', 'sum', 16),
+            ('Pendiente', pending, 'sum', 18),
+            ('Vencido', pending, 'sum_overdue', 18),
+            ('Vigente', pending, 'sum_current', 18),
+        ]
+        max_days = ('Días Vencido Máx.', 'dias_vencido', 'max', 16)
+        return [
+            SummarySheet('Resumen por Cuenta',
+                         [('account_id/code', 'Cuenta', 10), ('account_id/name', 'Nombre Cuenta', 30)],
+                         amounts),
+            # Los tramos no se solapan: ordenar por días máximos los deja en orden
+            SummarySheet('Resumen por Antigüedad',
+                         [('antiguedad', 'Antigüedad', 22)],
+                         [('Documentos', None, 'count', 12), ('Pendiente', pending, 'sum', 18), max_days],
+                         sort_by='Días Vencido Máx.'),
+            SummarySheet('Resumen por Cliente',
+                         [('patner_id/vat', 'RUC/DNI', 14), ('patner_id', 'Cliente', 40)],
+                         amounts + [max_days],
+                         sort_by='Pendiente', descending=True),
+        ]
+
+    @classmethod
+    def _write_summary(cls, wb, summary):
+        """Agrega una hoja resumen ya acumulada (filas, y totales al final)."""
+        ws = wb.create_sheet(summary.title)
+        plan = ExportPlan.compile(summary.columns())
+        for col_num, width in enumerate(plan.widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+        header = []
+        for title in plan.titles:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.style = 'agv_header'
+            header.append(cell)
+        ws.append(header)
+
+        rows, total = summary.rows()
+        cells = []
+        for kind in plan.kinds:
+            cell = WriteOnlyCell(ws)
+            cell.style = kind.style
+            cells.append(cell)
+        for values in rows + [total]:
+            for cell, kind, value in zip(cells, plan.kinds, values):
+                cell.value = kind.convert(value)
+            ws.append(cells)
+
+    @classmethod
+    def write_report(cls, rows, columns, sheet_title, output=None, summaries=()):
+        """
+        Escribe un reporte en streaming (memoria constante respecto a las filas).
+
+        Args:
+            rows (iterable): Registros (dicts); puede ser un generador
+            columns (list): Columnas (campo, encabezado, tipo, ancho)
+            sheet_title (str): Nombre de la hoja
+            output (file, optional): Archivo binario destino. Por defecto un
+                temporal que se borra al cerrarse.
+            summaries (list, optional): Hojas resumen (SummarySheet) que se
+                acumulan en la misma pasada y se agregan después del detalle
+
+        Returns:
+            file: Archivo con el Excel, posicionado al inicio
+        """
+        wb = openpyxl.Workbook(write_only=True)
+        for style in cls._named_styles():
+            wb.add_named_style(style)
+        ws = wb.create_sheet(sheet_title)
+        plan = ExportPlan.compile(columns)
+
+        # Anchos y fila de encabezado (deben definirse antes de escribir filas)
+        for col_num, width in enumerate(plan.widths, 1):
+            ws.column_dimensions[get_column_letter(col_num)].width = width
+        header = []
+        for title in plan.titles:
+            cell = WriteOnlyCell(ws, value=title)
+            cell.style = 'agv_header'
+            header.append(cell)
+        ws.append(header)
+
+        # Una celda prototipo por columna (y por estilo resaltado): write_only
+        # serializa cada fila al agregarla, así que se pueden reutilizar.
+        # Conversores y estilos vienen resueltos del plan compilado.
+        cells = []
+        for kind in plan.kinds:
+            cell = WriteOnlyCell(ws)
+            cell.style = kind.style
+            cells.append(cell)
+        marked = {}
+        for index, _ in plan.highlights:
+            cell = WriteOnlyCell(ws)
+            cell.style = plan.kinds[index].highlight_style
+            marked[index] = cell
+
+        values_of = plan.values
+        highlights = plan.highlights
+        accumulators = [summary.bind(plan) for summary in summaries]
+        for record in rows:
+            values = values_of(record)
+            for accumulate in accumulators:
+                accumulate(values)
+            for cell, value in zip(cells, values):
+                cell.value = value
+            row = cells
+            for index, highlight in highlights:
+                value = values[index]
+                if highlight(value):
+                    if row is cells:
+                        row = list(cells)
+                    row[index] = marked[index]
+                    marked[index].value = value
+            ws.append(row)
+
+        for summary in summaries:
+            cls._write_summary(wb, summary)
+
+        if output is None:
+            output = tempfile.TemporaryFile(suffix='.xlsx')
+        wb.save(output)
+        output.seek(0)
+        return output
+
+    @staticmethod
+    def export_collections_report(data, filename="reporte_cobranzas.xlsx", output=None,
+                                  cutoff_date=None, summaries=True):
         """
         Exporta reporte de cobranzas a Excel con todas las columnas.
         Formato simplificado y profesional similar al reporte de tesorería.
-        
+
         Args:
-            data (list): Lista de diccionarios con datos del reporte
+            data (iterable): Registros del reporte (lista o generador)
             filename (str): Nombre del archivo a generar
-        
+            output (file, optional): Archivo destino (por defecto un temporal)
+            cutoff_date (str, optional): Fecha de corte (pendiente histórico en resúmenes)
+            summaries (bool): Agregar hojas resumen por cuenta, antigüedad y cliente
+
         Returns:
-            BytesIO: Buffer con el archivo Excel generado
+            file: Archivo con el Excel generado (para send_file)
         """
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "CxC - Cuenta 12"
-        
-        # Definir columnas (incluye campos históricos y débitos/hábers)
-        columns = [
-            ('invoice_date', 'Fecha Factura'),
-            ('date', 'Fecha Contabilización'),
-            ('l10n_latam_document_type_id', 'Tipo Documento'),
-            ('move_name', 'Número Documento'),
-            ('l10n_latam_boe_number', 'Letra'),
-            ('invoice_origin', 'Origen'),
-            ('account_id/code', 'Cuenta'),
-            ('account_id/name', 'Nombre Cuenta'),
-            ('patner_id/vat', 'RUC/DNI'),
-            ('patner_id', 'Cliente'),
-            ('currency_id', 'Moneda'),
-            ('amount_currency', 'Total Moneda Origen'),
-            ('amount_residual_with_retention', 'Adeudado'),
-            ('amount_residual_signed', 'Adeudado S/.'),
-            ('debit', 'Débito'),
-            ('credit', 'Haber'),
-            ('amount_residual_historical', 'Pendiente al corte'),
-            ('paid_after_cutoff', 'Pagado después corte'),
-            ('date_maturity', 'Fecha Vencimiento'),
-            ('dias_vencido', 'Días Vencido'),
-            ('estado_deuda', 'Estado'),
-            ('antiguedad', 'Antigüedad'),
-            ('ref', 'Referencia'),
-            ('invoice_payment_term_id', 'Condición Pago'),
-            ('name', 'Descripción'),
-            ('move_id/invoice_user_id', 'Vendedor'),
-            ('patner_id/state_id', 'Provincia'),
-            ('patner_id/l10n_pe_district', 'Distrito'),
-            ('patner_id/country_code', 'Código País'),
-            ('patner_id/country_id', 'País'),
-            ('team_id', 'Equipo de Ventas'),
-            ('partner_groups', 'Grupos'),
-            ('sub_channel_id', 'Sub Canal'),
-            ('move_id/sales_channel_id', 'Canal de Venta'),
-            ('move_id/sales_type_id', 'Tipo de Venta'),
-        ]
-        
-        # Escribir encabezados
-        for col_num, (key, header) in enumerate(columns, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = ExcelExportService.HEADER_FILL
-            cell.font = ExcelExportService.HEADER_FONT
-            cell.alignment = ExcelExportService.HEADER_ALIGNMENT
-            cell.border = ExcelExportService.CELL_BORDER
-        
-        # Escribir datos
-        for row_num, record in enumerate(data, 2):
-            for col_num, (key, header) in enumerate(columns, 1):
-                value = record.get(key, '')
-                
-                # Convertir valores Many2One (listas) a string
-                if isinstance(value, (list, tuple)) and len(value) >= 2:
-                    value = str(value[1])  # Extraer el nombre
-                elif isinstance(value, (list, tuple)):
-                    value = str(value[0]) if value else ''
-                
-                # Convertir None a cadena vacía
-                if value is None:
-                    value = ''
-                
-                # Formatear valores numéricos
-                if key in ['amount_currency', 'amount_residual_with_retention', 'amount_residual_signed', 'amount_total', 'debit', 'credit', 'amount_residual_historical', 'paid_after_cutoff', 'dias_vencido']:
-                    try:
-                        value = float(value) if value else 0
-                        if key == 'dias_vencido':
-                            value = int(value)
-                    except:
-                        value = 0
-                
-                cell = ws.cell(row=row_num, column=col_num, value=value)
-                cell.border = ExcelExportService.CELL_BORDER
-                
-                # Formato especial para números
-                if key in ['amount_currency', 'amount_residual_with_retention', 'amount_residual_signed', 'amount_total', 'debit', 'credit', 'amount_residual_historical', 'paid_after_cutoff']:
-                    cell.number_format = '#,##0.00'
-                    cell.alignment = Alignment(horizontal='right')
-                elif key == 'dias_vencido':
-                    cell.alignment = Alignment(horizontal='center')
-                    # Resaltar en rojo si está vencido
-                    if value > 0:
-                        cell.font = Font(color="FF0000", bold=True)
-                elif key == 'estado_deuda':
-                    cell.alignment = Alignment(horizontal='center')
-                    # Color de fondo según estado
-                    if value == 'VENCIDO':
-                        cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-                    else:
-                        cell.fill = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-        
-        # Ajustar anchos de columna según contenido
-        column_widths = {
-            1: 12,  # Fecha Factura
-            2: 14,  # Fecha Contabilización
-            3: 14,  # Tipo Documento
-            4: 16,  # Número Documento
-            5: 12,  # Origen
-            6: 10,  # Cuenta
-            7: 25,  # Nombre Cuenta
-            8: 12,  # RUC/DNI
-            9: 30,  # Cliente
-            10: 10, # Moneda
-            11: 18, # Total Moneda Origen
-            12: 18, # Adeudado
-            13: 18, # Adeudado S/.
-            14: 14, # Fecha Vencimiento
-            15: 12, # Días Vencido
-            16: 12, # Estado
-            17: 20, # Antigüedad
-            18: 14, # Referencia
-            19: 18, # Condición Pago
-            20: 30, # Descripción
-            21: 20, # Vendedor
-            22: 18, # Provincia
-            23: 18, # Distrito
-            24: 12, # Código País
-            25: 18, # País
-            26: 20, # Equipo de Ventas
-            27: 25, # Grupos
-            28: 18, # Sub Canal
-            29: 20, # Canal de Venta
-            30: 18, # Tipo de Venta
-        }
-        
-        for col_num, width in column_widths.items():
-            ws.column_dimensions[get_column_letter(col_num)].width = width
-        
-        # Guardar en buffer
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        return buffer
-    
+        return ExcelExportService.write_report(
+            data, ExcelExportService.COLLECTIONS_COLUMNS, "CxC - Cuenta 12", output,
+            summaries=ExcelExportService.collections_summaries(cutoff_date) if summaries else ()
+        )
+
     @staticmethod
-    def export_treasury_report(data, filename="reporte_tesoreria.xlsx"):
+    def export_treasury_report(data, filename="reporte_tesoreria.xlsx", output=None):
         """
         Exporta reporte de tesorería (CxP) a Excel con todos los campos expandidos.
         Formato similar al reporte de collections.
-        
+
         Args:
-            data (list): Lista de diccionarios con datos del reporte
+            data (iterable): Registros del reporte (lista o generador)
             filename (str): Nombre del archivo a generar
-        
+            output (file, optional): Archivo destino (por defecto un temporal)
+
         Returns:
-            BytesIO: Buffer con el archivo Excel generado
+            file: Archivo con el Excel generado (para send_file)
         """
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "CxP - Cuenta 42"
-        
-        # Definir columnas expandidas (incluye históricos y débitos/hábers)
-        columns = [
-            ('invoice_date', 'Fecha Factura'),
-            ('date', 'Fecha Contabilización'),
-            ('l10n_latam_document_type_id', 'Tipo Documento'),
-            ('move_name', 'Número Documento'),
-            ('l10n_latam_boe_number', 'Número Letra'),
-            ('ref', 'Referencia'),
-            ('invoice_origin', 'Origen'),
-            ('account_code', 'Cuenta'),
-            ('account_name', 'Nombre Cuenta'),
-            ('supplier_vat', 'RUC Proveedor'),
-            ('supplier_name', 'Proveedor'),
-            ('supplier_country', 'País'),
-            ('supplier_state', 'Provincia'),
-            ('supplier_city', 'Ciudad'),
-            ('supplier_email', 'Email'),
-            ('currency_id', 'Moneda'),
-            ('amount_total_in_currency_signed', 'Total Origen'),
-            ('amount_residual_with_retention', 'Adeudado Origen'),
-            ('amount_total_signed', 'Total S/.'),
-            ('debit', 'Débito'),
-            ('credit', 'Haber'),
-            ('amount_residual_historical', 'Pendiente al corte'),
-            ('paid_after_cutoff', 'Pagado después corte'),
-            ('invoice_date_due', 'Fecha Vencimiento'),
-            ('dias_vencido', 'Días Vencido'),
-            ('estado_deuda', 'Estado'),
-            ('antiguedad', 'Antigüedad'),
-            ('invoice_payment_term_id', 'Condición Pago'),
-            ('payment_state', 'Estado Pago'),
-            ('state', 'Estado Factura'),
-            ('invoice_user_id', 'Usuario Responsable'),
-            ('name', 'Descripción'),
-        ]
-        
-        # Escribir encabezados
-        for col_num, (key, header) in enumerate(columns, 1):
-            cell = ws.cell(row=1, column=col_num, value=header)
-            cell.fill = ExcelExportService.HEADER_FILL
-            cell.font = ExcelExportService.HEADER_FONT
-            cell.alignment = ExcelExportService.HEADER_ALIGNMENT
-            cell.border = ExcelExportService.CELL_BORDER
-        
-        # Escribir datos
-        for row_num, record in enumerate(data, 2):
-            for col_num, (key, header) in enumerate(columns, 1):
-                value = record.get(key, '')
-                
-                # Convertir valores Many2One (listas) a string
-                if isinstance(value, (list, tuple)) and len(value) >= 2:
-                    value = str(value[1])  # Extraer el nombre
-                elif isinstance(value, (list, tuple)):
-                    value = str(value[0]) if value else ''
-                
-                # Convertir None a cadena vacía
-                if value is None:
-                    value = ''
-                
-                # Formatear valores numéricos
-                if key in ['amount_total_in_currency_signed', 'amount_residual_with_retention', 'amount_total_signed', 'debit', 'credit', 'amount_residual_historical', 'paid_after_cutoff', 'dias_vencido']:
-                    try:
-                        value = float(value) if value else 0
-                        if key == 'dias_vencido':
-                            value = int(value)
-                    except:
-                        value = 0
-                
-                cell = ws.cell(row=row_num, column=col_num, value=value)
-                cell.border = ExcelExportService.CELL_BORDER
-                
-                # Formato especial para números
-                if key in ['amount_total_in_currency_signed', 'amount_residual_with_retention', 'amount_total_signed', 'debit', 'credit', 'amount_residual_historical', 'paid_after_cutoff']:
-                    cell.number_format = '#,##0.00'
-                    cell.alignment = Alignment(horizontal='right')
-                elif key == 'dias_vencido':
-                    cell.alignment = Alignment(horizontal='center')
-                    # Resaltar en rojo si está vencido
-                    if value > 0:
-                        cell.font = Font(color="FF0000", bold=True)
-                elif key == 'estado_deuda':
-                    cell.alignment = Alignment(horizontal='center')
-                    # Color de fondo según estado
-                    if value == 'VENCIDO':
-                        cell.fill = PatternFill(start_color="FFCCCC", end_color="FFCCCC", fill_type="solid")
-                    else:
-                        cell.fill = PatternFill(start_color="CCFFCC", end_color="CCFFCC", fill_type="solid")
-        
-        # Ajustar anchos de columna
-        column_widths = [12, 14, 14, 16, 14, 12, 10, 25, 14, 30, 12, 18, 18, 18, 16, 25, 10, 18, 18, 18, 14, 12, 12, 20, 18, 14, 14, 20, 30]
-        for col, width in enumerate(column_widths, 1):
-            ws.column_dimensions[get_column_letter(col)].width = width
-        
-        # Guardar en buffer
-        buffer = BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        
-        return buffer
-
+        return ExcelExportService.write_report(
+            data, ExcelExportService.TREASURY_COLUMNS, "CxP - Cuenta 42", output
+        )
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+"""
+Plan compilado de exportación.
+
+Las columnas de un reporte se declaran como (campo, encabezado, tipo, ancho).
+El plan resuelve una sola vez, por columna, todo lo que depende del tipo:
+conversor de valores, formato numérico, estilos de Excel (normal y resaltado)
+y tipo Arrow. Los escritores (Excel, CSV, Parquet/Arrow) solo recorren las
+filas aplicando lo ya resuelto, sin volver a decidir por celda qué hacer con
+cada campo. Cobranzas y tesorería comparten los mismos tipos de columna.
+"""
+
+from collections import namedtuple
+
+
+def _text(value):
+    """Many2One [id, 'nombre'] -> 'nombre'; None -> ''."""
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        if len(value) >= 2:
+            return str(value[1])
+        return str(value[0]) if value else ''
+    return '' if value is None else value
+
+
+def _string(value):
+    """Many2One -> nombre; vacíos de Odoo (None, False, '') -> None."""
+    if isinstance(value, str):
+        return value or None
+    value = _text(value)
+    if value is None or value is False or value == '':
+        return None
+    return str(value)
+
+
+def _money(value):
+    if isinstance(value, float):
+        return value
+    try:
+        return float(value) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _days(value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        return value
+    try:
+        return int(float(value)) if value else 0
+    except (TypeError, ValueError):
+        return 0
+
+
+def _overdue_days(value):
+    return value > 0
+
+
+def _overdue_status(value):
+    return value == 'VENCIDO'
+
+
+# Tipo de columna: conversor para Excel, conversor para formatos tipados
+# (CSV/Arrow: vacíos como nulo), formato numérico, estilo con nombre, estilo
+# resaltado y cuándo aplicarlo, y tipo Arrow
+ColumnKind = namedtuple(
+    'ColumnKind',
+    'convert typed_convert number_format style highlight_style highlight arrow_type'
+)
+
+COLUMN_KINDS = {
+    'text': ColumnKind(_text, _string, 'General', 'agv_text', None, None, 'string'),
+    'money': ColumnKind(_money, _money, '#,##0.00', 'agv_money', None, None, 'float64'),
+    # Días vencidos (> 0) en rojo
+    'days': ColumnKind(_days, _days, '0', 'agv_days', 'agv_days_overdue', _overdue_days, 'int64'),
+    # Fondo según estado de la deuda
+    'status': ColumnKind(_text, _string, 'General', 'agv_status_ok', 'agv_status_overdue',
+                         _overdue_status, 'string'),
+}
+
+
+class ExportPlan:
+    """
+    Columnas de un reporte con su tipo ya resuelto.
+
+    Se compila una vez por definición de columnas y se reutiliza entre
+    exportaciones (caché a nivel de clase).
+    """
+
+    _compiled = {}
+
+    def __init__(self, columns):
+        self.columns = [tuple(column) for column in columns]
+        self.keys = [key for key, _, _, _ in self.columns]
+        self.titles = [title for _, title, _, _ in self.columns]
+        self.widths = [width for _, _, _, width in self.columns]
+        self.kinds = [COLUMN_KINDS[kind] for _, _, kind, _ in self.columns]
+        self.number_formats = [kind.number_format for kind in self.kinds]
+        # (campo, conversor) por columna, listos para el recorrido por filas
+        self.converters = [(key, kind.convert) for key, kind in zip(self.keys, self.kinds)]
+        self.typed_converters = [(key, kind.typed_convert) for key, kind in zip(self.keys, self.kinds)]
+        # Posiciones de las columnas con estilo resaltado: (índice, ¿resaltar?)
+        self.highlights = [
+            (index, kind.highlight) for index, kind in enumerate(self.kinds) if kind.highlight
+        ]
+
+    @classmethod
+    def compile(cls, columns):
+        """
+        Devuelve el plan de una definición de columnas (compilado una sola vez).
+
+        Args:
+            columns (list): Columnas (campo, encabezado, tipo, ancho)
+
+        Returns:
+            ExportPlan: Plan compilado
+        """
+        signature = tuple(tuple(column) for column in columns)
+        plan = cls._compiled.get(signature)
+        if plan is None:
+            plan = cls._compiled[signature] = cls(signature)
+        return plan
+
+    def values(self, record):
+        """Fila convertida para Excel (vacíos como '')."""
+        get = record.get
+        return [convert(get(key, '')) for key, convert in self.converters]
+
+    def typed_values(self, record):
+        """Fila convertida para CSV/Arrow (vacíos como None)."""
+        get = record.get
+        return [convert(get(key)) for key, convert in self.typed_converters]
+
+    def column(self, records, index):
+        """Valores tipados de una columna (conversión por columna, para Arrow)."""
+        key, convert = self.typed_converters[index]
+        return [convert(record.get(key)) for record in records]
@@ -0,0 +1,365 @@
+# -*- coding: utf-8 -*-
+"""
+Trabajos asíncronos de exportación.
+
+La exportación síncrona bloquea el worker HTTP durante toda la lectura de Odoo
+y el armado del libro; en rangos grandes el proxy corta la conexión. Aquí el
+endpoint solo registra el trabajo y lo encola en Celery; el worker escribe el
+archivo en disco (volumen compartido con el backend) y va publicando el
+progreso en un manifest JSON que consulta el frontend.
+
+Estructura en disco:
+    <base_dir>/jobs/<job_id>.json        (manifest: estado y progreso)
+    <base_dir>/files/<job_id>.<formato>  (archivo terminado)
+    <base_dir>/keys/<reporte>-<hash>     (trabajo vigente para esos filtros)
+
+Los trabajos expiran a los EXPORT_JOB_TTL segundos (desde que terminan, o desde
+que se crearon si nunca terminan) y se borran junto con su archivo. Pedir el
+mismo reporte con los mismos filtros devuelve el trabajo existente si aún está
+en curso; uno terminado solo se reutiliza si sus datos tienen menos de
+ReportDatasetCache.TIMEOUT segundos o si el corte es de un período cerrado
+(los datos ya no cambian). En otro caso se crea un trabajo nuevo.
+
+Mientras el worker procesa un trabajo renueva `updated_ts` en el manifest cada
+HEARTBEAT_INTERVAL segundos. Un trabajo en curso sin latido por más de
+EXPORT_JOB_STALE_AFTER segundos (worker caído, p. ej. sin memoria) se marca
+como fallido y el siguiente request igual lo reemplaza.
+
+La clave de filtros se publica ya escrita (archivo temporal + `os.link`), así
+un request concurrente nunca la ve vacía; y solo se retira si sigue apuntando
+al trabajo que se reemplaza.
+"""
+
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from app.core.report_cache import ReportDatasetCache
+from app.core.snapshots import ReportSnapshotStore
+from app.exports.reports import EXPORT_FORMATS, REPORTS, get_odoo_repository, load_rows, write_report
+
+# Cada cuántas filas escritas se actualiza el progreso en el manifest
+PROGRESS_EVERY = 1000
+
+# Estados de un trabajo aún en curso (se comparte entre requests iguales)
+IN_FLIGHT_STATUSES = ('queued', 'fetching', 'writing')
+
+
+class ExportJobStore:
+    """Almacén en disco de trabajos de exportación (manifest + archivo)."""
+
+    DEFAULT_TTL = 3600
+    # Segundos sin latido tras los que un trabajo en curso se da por muerto
+    DEFAULT_STALE_AFTER = 300
+    # Cada cuántos segundos el worker renueva el latido de un trabajo
+    HEARTBEAT_INTERVAL = 30
+
+    def __init__(self, base_dir=None, ttl=None, stale_after=None):
+        """
+        Inicializa el almacén.
+
+        Args:
+            base_dir (str, optional): Directorio raíz. Si es None usa
+                EXPORT_JOB_DIR de la configuración o 'data/exports'
+                en el directorio del proyecto.
+            ttl (int, optional): Segundos de vida de cada trabajo. Si es None
+                usa EXPORT_JOB_TTL de la configuración.
+            stale_after (int, optional): Segundos sin latido para dar por muerto
+                un trabajo en curso. Si es None usa EXPORT_JOB_STALE_AFTER.
+        """
+        config = {}
+        try:
+            from flask import current_app
+            config = current_app.config
+        except RuntimeError:
+            pass
+        base_dir = base_dir or config.get('EXPORT_JOB_DIR')
+        if not base_dir:
+            base_dir = Path(__file__).parent.parent.parent / 'data' / 'exports'
+        self.base_dir = Path(base_dir)
+        self.ttl = int(ttl or config.get('EXPORT_JOB_TTL') or self.DEFAULT_TTL)
+        self.stale_after = int(stale_after or config.get('EXPORT_JOB_STALE_AFTER') or self.DEFAULT_STALE_AFTER)
+        # El latido del worker escribe el mismo manifest desde otro hilo
+        self._lock = threading.Lock()
+        for folder in ('jobs', 'files', 'keys'):
+            (self.base_dir / folder).mkdir(parents=True, exist_ok=True)
+
+    def _manifest_path(self, job_id):
+        return self.base_dir / 'jobs' / f'{job_id}.json'
+
+    def _key_path(self, report, filters_key):
+        return self.base_dir / 'keys' / f'{report}-{filters_key}'
+
+    def file_path(self, job):
+        return self.base_dir / 'files' / f"{job['id']}.{EXPORT_FORMATS[job['format']][0]}"
+
+    @staticmethod
+    def _is_job_id(job_id):
+        try:
+            return uuid.UUID(job_id).hex == job_id
+        except (TypeError, ValueError):
+            return False
+
+    def _write(self, job):
+        job['updated_ts'] = time.time()
+        path = self._manifest_path(job['id'])
+        tmp = path.with_suffix('.json.tmp')
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump(job, f, ensure_ascii=False, indent=2, default=str)
+        os.replace(tmp, path)
+
+    def _read(self, job_id):
+        if not self._is_job_id(job_id):
+            return None
+        try:
+            with open(self._manifest_path(job_id), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def _publish_key(self, key_path, job_id):
+        """Crea la clave apuntando a `job_id` si no existe (nunca queda visible vacía)."""
+        tmp = key_path.with_name(f'.{job_id}.tmp')
+        tmp.write_text(job_id, encoding='utf-8')
+        try:
+            os.link(tmp, key_path)
+            return True
+        except FileExistsError:
+            return False
+        finally:
+            tmp.unlink()
+
+    def _retire_key(self, key_path, job_id):
+        """Quita la clave solo si todavía apunta a `job_id`."""
+        claimed = key_path.with_name(f'.{uuid.uuid4().hex}.retired')
+        try:
+            os.rename(key_path, claimed)
+        except FileNotFoundError:
+            return
+        try:
+            if claimed.read_text(encoding='utf-8') != job_id:
+                # Otro request ya la reemplazó: se devuelve
+                try:
+                    os.link(claimed, key_path)
+                except FileExistsError:
+                    pass
+        finally:
+            claimed.unlink()
+
+    def _delete(self, job):
+        self._retire_key(self._key_path(job['report'], job['filters_key']), job['id'])
+        for path in (self._manifest_path(job['id']), self.file_path(job)):
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def evict_expired(self):
+        """Borra los trabajos vencidos (manifest, archivo y clave de filtros)."""
+        now = time.time()
+        removed = 0
+        for path in (self.base_dir / 'jobs').glob('*.json'):
+            job = self._read(path.stem)
+            if job and job.get('expires_ts', 0) <= now:
+                self._delete(job)
+                removed += 1
+        # Claves huérfanas (su manifest ya no existe)
+        for path in (self.base_dir / 'keys').iterdir():
+            if path.name.startswith('.'):
+                continue  # Clave a medio publicar o retirar
+            try:
+                if not self._manifest_path(path.read_text(encoding='utf-8')).exists():
+                    path.unlink()
+            except FileNotFoundError:
+                pass
+        if removed:
+            print(f"[EXPORT] {removed} trabajos de exportación expirados eliminados")
+        return removed
+
+    @staticmethod
+    def _is_closed_cutoff(cutoff_date):
+        """Indica si el corte es de un período cerrado (sus datos ya no cambian)."""
+        if not cutoff_date:
+            return False
+        try:
+            return ReportSnapshotStore().is_closed_period(get_odoo_repository(), cutoff_date)
+        except Exception as e:
+            print(f"[WARN] No se pudo verificar el período del corte {cutoff_date}: {e}")
+            return False
+
+    def _is_stale(self, job, now):
+        """Indica si un trabajo en curso dejó de latir (su worker murió)."""
+        # Manifests sin latido: desde su creación
+        updated_ts = job.get('updated_ts') or job['expires_ts'] - self.ttl
+        return now - updated_ts > self.stale_after
+
+    def _is_reusable(self, job, now):
+        """
+        Indica si un trabajo existente sirve para un request con los mismos filtros.
+
+        Los trabajos en curso se comparten mientras sigan latiendo. Uno
+        terminado solo si sus datos
+        (leídos al iniciar) son más recientes que ReportDatasetCache.TIMEOUT,
+        o si el corte es de un período cerrado.
+        """
+        if not job or job['expires_ts'] <= now:
+            return False
+        if job['status'] in IN_FLIGHT_STATUSES:
+            return not self._is_stale(job, now)
+        if job['status'] != 'done':
+            return False
+        fetched_at = job.get('started_at') or job['created_at']
+        if now - datetime.fromisoformat(fetched_at).timestamp() < ReportDatasetCache.TIMEOUT:
+            return True
+        return self._is_closed_cutoff(job['filters'].get('cutoff_date'))
+
+    def create(self, report, filters, file_format='xlsx'):
+        """
+        Registra un trabajo o devuelve el reutilizable para los mismos filtros.
+
+        Args:
+            report (str): Reporte ('collections' o 'treasury')
+            filters (dict): Filtros normalizados del reporte
+            file_format (str): Formato del archivo (EXPORT_FORMATS)
+
+        Returns:
+            tuple: (manifest del trabajo, True si es nuevo y hay que encolarlo)
+        """
+        self.evict_expired()
+        filters_key = ReportSnapshotStore.filters_key(dict(filters, format=file_format))
+        key_path = self._key_path(report, filters_key)
+        now = time.time()
+        job = {
+            'id': uuid.uuid4().hex,
+            'report': report,
+            'format': file_format,
+            'filters': filters,
+            'filters_key': filters_key,
+            'status': 'queued',
+            'rows_fetched': None,
+            'rows_written': 0,
+            'error': None,
+            'file_name': None,
+            'size_bytes': None,
+            'created_at': datetime.now().isoformat(),
+            'started_at': None,
+            'finished_at': None,
+            'expires_ts': now + self.ttl,
+        }
+
+        # La clave se publica en exclusiva: dos requests iguales simultáneos
+        # no pueden registrar dos trabajos. El manifest va antes que la clave
+        # para que esta nunca apunte a un trabajo inexistente.
+        self._write(job)
+        for _ in range(3):
+            if self._publish_key(key_path, job['id']):
+                return job, True
+            try:
+                existing_id = key_path.read_text(encoding='utf-8')
+            except FileNotFoundError:
+                continue
+            existing = self._read(existing_id)
+            if self._is_reusable(existing, now):
+                self._manifest_path(job['id']).unlink()
+                return existing, False
+            if existing and existing['status'] in IN_FLIGHT_STATUSES:
+                print(f"[WARN] Trabajo de exportación {existing_id} sin latido hace más de "
+                      f"{self.stale_after}s; se reemplaza")
+                self.update(existing, status='failed', error='El worker dejó de responder')
+            # Trabajo fallido, muerto, vencido, con datos viejos o a medio registrar:
+            # se reemplaza (el anterior sigue descargable hasta que expire)
+            self._retire_key(key_path, existing_id)
+        self._manifest_path(job['id']).unlink()
+        raise RuntimeError("No se pudo registrar el trabajo de exportación")
+
+    def get(self, job_id):
+        """Devuelve el manifest de un trabajo vigente o None."""
+        self.evict_expired()
+        return self._read(job_id)
+
+    def update(self, job, **fields):
+        with self._lock:
+            job.update(fields)
+            if fields.get('status') in ('done', 'failed'):
+                job['finished_at'] = datetime.now().isoformat()
+                job['expires_ts'] = time.time() + self.ttl
+            self._write(job)
+        return job
+
+    @staticmethod
+    def public(job):
+        """Representación del trabajo para la API."""
+        data = {k: v for k, v in job.items() if k not in ('filters_key', 'expires_ts', 'updated_ts')}
+        data['expires_at'] = datetime.fromtimestamp(job['expires_ts']).isoformat()
+        return data
+
+
+def _counting(rows, store, job):
+    """Recorre las filas publicando cuántas se llevan escritas."""
+    written = 0
+    for row in rows:
+        yield row
+        written += 1
+        if written % PROGRESS_EVERY == 0:
+            store.update(job, rows_written=written)
+    job['rows_written'] = written
+
+
+def run_export_job(job_id, store=None):
+    """
+    Ejecuta un trabajo de exportación (lo llama la tarea Celery `run_export`).
+
+    Args:
+        job_id (str): ID del trabajo
+        store (ExportJobStore, optional): Almacén; por defecto el de la app
+
+    Returns:
+        dict: Manifest final del trabajo o None si ya no existe
+    """
+    store = store or ExportJobStore()
+    job = store.get(job_id)
+    if not job:
+        print(f"[WARN] Trabajo de exportación {job_id} no existe o expiró")
+        return None
+    if job['status'] == 'done':
+        return job
+
+    report = REPORTS[job['report']]
+    start = time.time()
+    # Latido: la lectura de Odoo no publica progreso y puede tardar minutos
+    stop_heartbeat = threading.Event()
+
+    def heartbeat():
+        while not stop_heartbeat.wait(store.HEARTBEAT_INTERVAL):
+            store.update(job)
+
+    threading.Thread(target=heartbeat, name=f'export-heartbeat-{job_id}', daemon=True).start()
+    try:
+        store.update(job, status='fetching', started_at=datetime.now().isoformat(), error=None)
+        rows = load_rows(job['report'], job['filters'])
+        store.update(job, status='writing', rows_fetched=len(rows))
+
+        path = store.file_path(job)
+        tmp = path.with_name(path.name + '.tmp')
+        with open(tmp, 'wb') as output:
+            write_report(job['report'], _counting(rows, store, job), job['format'], output,
+                         filters=job['filters'])
+        os.replace(tmp, path)
+
+        job = store.update(
+            job, status='done',
+            file_name=report['filename'](job['filters'], EXPORT_FORMATS[job['format']][0]),
+            size_bytes=path.stat().st_size
+        )
+        print(f"[EXPORT] {job['report']} {job_id}: {job['rows_written']} filas "
+              f"en {time.time() - start:.1f}s")
+    except Exception as e:
+        print(f"[ERROR] Exportación {job['report']} {job_id} falló: {e}")
+        job = store.update(job, status='failed', error=str(e))
+    finally:
+        stop_heartbeat.set()
+    return job
@@ -0,0 +1,222 @@
+# -*- coding: utf-8 -*-
+"""
+Definición de los reportes exportables.
+
+Cada reporte sabe leer sus filtros de un request (query string o JSON),
+obtener sus filas desde Odoo, escribir el archivo y nombrarlo. Lo usan tanto
+los endpoints síncronos (`/exports/<reporte>/<formato>`) como los trabajos
+asíncronos de exportación (jobs.py, worker de Celery).
+"""
+
+import tempfile
+from datetime import datetime
+
+from flask import current_app
+from werkzeug.datastructures import MultiDict
+
+from app.collections.services import CollectionsService
+from app.core.odoo import OdooRepository
+from app.exports.excel_service import ExcelExportService
+from app.exports.tabular_service import TabularExportService
+from app.treasury.services import TreasuryService
+
+XLSX_MIMETYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+# Formatos de exportación: (extensión, mimetype)
+EXPORT_FORMATS = {'xlsx': ('xlsx', XLSX_MIMETYPE)}
+EXPORT_FORMATS.update({
+    name: (extension, mimetype)
+    for name, (extension, mimetype, _) in TabularExportService.FORMATS.items()
+})
+
+
+def get_odoo_repository():
+    """Crea una instancia de OdooRepository con la configuración de la app."""
+    try:
+        return OdooRepository(
+            url=current_app.config['ODOO_URL'],
+            db=current_app.config['ODOO_DB'],
+            username=current_app.config['ODOO_USER'],
+            password=current_app.config['ODOO_PASSWORD']
+        )
+    except ValueError as e:
+        raise ValueError(f"Error de configuración de Odoo: {str(e)}")
+
+
+def _as_args(source):
+    """Query string (MultiDict) o dict JSON -> MultiDict con `get(key, type=...)`."""
+    return source if isinstance(source, MultiDict) else MultiDict(source or {})
+
+
+def _flag(value):
+    return value is True or str(value).lower() == 'true'
+
+
+# -- Cobranzas (CxC) ------------------------------------------------------------
+
+def collections_filters(source):
+    """
+    Filtros del reporte de cobranzas, con los nombres de CollectionsService.get_report_lines.
+
+    Query Parameters:
+        - date_from, date_to, customer, account_codes, sales_channel_id,
+          doc_type_id, limit, date_cutoff, include_reconciled
+    """
+    args = _as_args(source)
+    cutoff_date = args.get('date_cutoff')
+    return {
+        'start_date': args.get('date_from'),
+        'end_date': args.get('date_to'),
+        'customer': args.get('customer'),
+        'limit': args.get('limit', type=int, default=10000),
+        'account_codes': args.get('account_codes'),
+        'sales_channel_id': args.get('sales_channel_id', type=int),
+        'doc_type_id': args.get('doc_type_id', type=int),
+        'cutoff_date': cutoff_date,
+        # En corte histórico incluir conciliados
+        'include_reconciled': bool(cutoff_date) or _flag(args.get('include_reconciled')),
+    }
+
+
+def cached_collections(filters):
+    return CollectionsService.get_cached_report_lines(**filters)
+
+
+def fetch_collections(repository, filters):
+    return CollectionsService(repository).get_report_lines(**filters)
+
+
+def write_collections_excel(rows, filters, output=None):
+    return ExcelExportService.export_collections_report(
+        rows, output=output, cutoff_date=filters.get('cutoff_date')
+    )
+
+
+def collections_filename(filters, extension='xlsx'):
+    timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    filters_suffix = ""
+    if filters.get('cutoff_date'):
+        filters_suffix = f"_corte_{filters['cutoff_date']}"
+    elif filters.get('start_date') or filters.get('end_date'):
+        filters_suffix = f"_{filters.get('start_date') or 'inicio'}_{filters.get('end_date') or 'hoy'}"
+    return f"reporte_cxc_general{filters_suffix}_{timestamp}.{extension}"
+
+
+# -- Tesorería (CxP) --------------------------------------------------------------
+
+def treasury_filters(source):
+    """
+    Filtros del reporte de tesorería, con los nombres de TreasuryService.get_accounts_payable_report.
+
+    Query Parameters:
+        - date_from, date_to, date_cutoff, supplier, account_codes, payment_state,
+          doc_type_id, reference, has_retention, has_origin, only_vouchers,
+          include_reconciled, limit
+    """
+    args = _as_args(source)
+    cutoff_date = args.get('date_cutoff')
+    return {
+        'start_date': args.get('date_from'),
+        'end_date': args.get('date_to'),
+        'cutoff_date': cutoff_date,
+        'supplier': args.get('supplier'),
+        'limit': args.get('limit', type=int, default=10000),
+        'account_codes': args.get('account_codes'),
+        'payment_state': args.get('payment_state'),
+        'doc_type_id': args.get('doc_type_id', type=int),
+        'reference': args.get('reference'),
+        'has_retention': _flag(args.get('has_retention')),
+        'has_origin': _flag(args.get('has_origin')),
+        'only_vouchers': _flag(args.get('only_vouchers')),
+        # En corte histórico incluir conciliados para cuadrar con el mayor
+        # (misma lógica que /treasury/report/account42)
+        'include_reconciled': bool(cutoff_date) or _flag(args.get('include_reconciled')),
+    }
+
+
+def cached_treasury(filters):
+    return TreasuryService.get_cached_accounts_payable_report(**filters)
+
+
+def fetch_treasury(repository, filters):
+    return TreasuryService(repository).get_accounts_payable_report(**filters)
+
+
+def write_treasury_excel(rows, filters, output=None):
+    return ExcelExportService.export_treasury_report(rows, output=output)
+
+
+def treasury_filename(filters, extension='xlsx'):
+    if filters.get('cutoff_date'):
+        suffix = f"_corte_{filters['cutoff_date']}"
+    else:
+        suffix = f"_{filters.get('start_date') or 'inicio'}_{filters.get('end_date') or 'hoy'}"
+    return f"reporte_tesoreria{suffix}.{extension}"
+
+
+# Reportes exportables: filtros, filas en caché, obtención de filas, escritura
+# y nombre de archivo
+REPORTS = {
+    'collections': {
+        'filters': collections_filters,
+        'cached': cached_collections,
+        'fetch': fetch_collections,
+        'write': write_collections_excel,
+        'columns': ExcelExportService.COLLECTIONS_COLUMNS,
+        'filename': collections_filename,
+    },
+    'treasury': {
+        'filters': treasury_filters,
+        'cached': cached_treasury,
+        'fetch': fetch_treasury,
+        'write': write_treasury_excel,
+        'columns': ExcelExportService.TREASURY_COLUMNS,
+        'filename': treasury_filename,
+    },
+}
+
+
+def load_rows(name, filters):
+    """
+    Filas del reporte: las ya calculadas con los mismos filtros (vista del
+    reporte, snapshot en caché o exportación previa) o, si no hay, desde Odoo.
+
+    Args:
+        name (str): Reporte ('collections' o 'treasury')
+        filters (dict): Filtros normalizados del reporte
+
+    Returns:
+        list: Filas del reporte
+    """
+    report = REPORTS[name]
+    rows = report['cached'](filters)
+    if rows is None:
+        rows = report['fetch'](get_odoo_repository(), filters)
+    return rows
+
+
+def is_format_available(file_format):
+    """Indica si el formato es válido y sus dependencias están instaladas."""
+    return file_format == 'xlsx' or TabularExportService.is_available(file_format)
+
+
+def write_report(name, rows, file_format='xlsx', output=None, filters=None):
+    """
+    Escribe un reporte en el formato pedido.
+
+    Args:
+        name (str): Reporte ('collections' o 'treasury')
+        rows (iterable): Registros (lista o generador)
+        file_format (str): Formato de EXPORT_FORMATS
+        output (file, optional): Archivo binario destino (por defecto un temporal)
+        filters (dict, optional): Filtros normalizados (p.ej. corte para los resúmenes)
+
+    Returns:
+        file: Archivo generado, posicionado al inicio
+    """
+    report = REPORTS[name]
+    if file_format == 'xlsx':
+        return report['write'](rows, filters or {}, output=output)
+    if output is None:
+        output = tempfile.TemporaryFile(suffix=f'.{EXPORT_FORMATS[file_format][0]}')
+    return TabularExportService.write(rows, report['columns'], file_format, output)
@@ -3,169 +3,246 @@
 Rutas de Exportación.
 
 Endpoints para exportar reportes a diferentes formatos.
+
+Los endpoints `/<reporte>/<formato>` generan el archivo en el mismo request
+(excel/xlsx, csv, csv.gz, parquet, arrow); CSV se transmite en streaming.
+Para rangos grandes usar los trabajos asíncronos (`/jobs`): se encolan en
+Celery, informan su progreso y el archivo se descarga al terminar.
 """
 
-from flask import request, send_file, jsonify, current_app
+from flask import Response, request, send_file, jsonify, stream_with_context
 from app.exports import exports_bp
-from app.exports.excel_service import ExcelExportService
-from app.collections.services import CollectionsService
-from app.treasury.services import TreasuryService
-from app.core.odoo import OdooRepository
+from app.exports.jobs import ExportJobStore
+from app.exports.reports import (
+    EXPORT_FORMATS, REPORTS, XLSX_MIMETYPE, is_format_available, load_rows, write_report
+)
+from app.exports.tabular_service import TabularExportService
 
 
-def _get_odoo_repository():
-    """Helper para crear instancia de OdooRepository."""
+def _export_excel(name):
+    """Exporta un reporte a Excel en el mismo request."""
     try:
-        return OdooRepository(
-            url=current_app.config['ODOO_URL'],
-            db=current_app.config['ODOO_DB'],
-            username=current_app.config['ODOO_USER'],
-            password=current_app.config['ODOO_PASSWORD']
+        report = REPORTS[name]
+        filters = report['filters'](request.args)
+
+        # Obtener datos (reutiliza el reporte recién visto con los mismos filtros)
+        data = load_rows(name, filters)
+
+        # Generar Excel (temporal en disco; send_file lo transmite por bloques)
+        excel_buffer = write_report(name, data, filters=filters)
+
+        return send_file(
+            excel_buffer,
+            mimetype=XLSX_MIMETYPE,
+            as_attachment=True,
+            download_name=report['filename'](filters)
         )
-    except ValueError as e:
-        raise ValueError(f"Error de configuración de Odoo: {str(e)}")
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al exportar a Excel: {str(e)}'
+        }), 500
 
 
 @exports_bp.route('/collections/excel', methods=['GET'])
 def export_collections_excel():
     """
     Exporta reporte de cobranzas a Excel.
-    
+
     Query Parameters:
         - date_from, date_to, customer, account_codes, sales_channel_id, doc_type_id, limit
-    
+
     Response:
         Archivo Excel descargable
     """
-    try:
-        # Obtener parámetros (similares al reporte)
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-        customer = request.args.get('customer')
-        account_codes = request.args.get('account_codes')
-        sales_channel_id = request.args.get('sales_channel_id', type=int)
-        doc_type_id = request.args.get('doc_type_id', type=int)
-        limit = request.args.get('limit', type=int, default=10000)
-        cutoff_date = request.args.get('date_cutoff')
-        include_reconciled = request.args.get('include_reconciled') == 'true'
-        if cutoff_date:
-            include_reconciled = True
-        
-        # Obtener datos
-        odoo_repo = _get_odoo_repository()
-        collections_service = CollectionsService(odoo_repo)
-        
-        data = collections_service.get_report_lines(
-            start_date=date_from,
-            end_date=date_to,
-            customer=customer,
-            limit=limit,
-            account_codes=account_codes,
-            sales_channel_id=sales_channel_id,
-            doc_type_id=doc_type_id,
-            cutoff_date=cutoff_date,
-            include_reconciled=include_reconciled
-        )
-        
-        # Generar Excel
-        excel_buffer = ExcelExportService.export_collections_report(data)
-        
-        # Generar nombre de archivo con timestamp
-        from datetime import datetime
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filters_suffix = ""
-        if cutoff_date:
-            filters_suffix = f"_corte_{cutoff_date}"
-        elif date_from or date_to:
-            filters_suffix = f"_{date_from or 'inicio'}_{date_to or 'hoy'}"
-        
-        filename = f"reporte_cxc_general{filters_suffix}_{timestamp}.xlsx"
-        
-        return send_file(
-            excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
-            as_attachment=True,
-            download_name=filename
-        )
-        
-    except Exception as e:
-        return jsonify({
-            'success': False,
-            'message': f'Error al exportar a Excel: {str(e)}'
-        }), 500
+    return _export_excel('collections')
 
 
 @exports_bp.route('/treasury/excel', methods=['GET'])
 def export_treasury_excel():
     """
     Exporta reporte de tesorería a Excel.
-    
+
     Query Parameters:
         - date_from, date_to, date_cutoff, supplier, etc.
-    
+
     Response:
         Archivo Excel descargable
     """
+    return _export_excel('treasury')
+
+
+def _export_file(name, file_format):
+    """Exporta un reporte a CSV (streaming), Parquet o Arrow IPC en el mismo request."""
+    if file_format in ('excel', 'xlsx'):
+        return _export_excel(name)
+    if not is_format_available(file_format):
+        return jsonify({
+            'success': False,
+            'message': f"Formato no disponible: {file_format}. "
+                       f"Opciones: excel, {', '.join(f for f in EXPORT_FORMATS if is_format_available(f))}"
+        }), 400
+
     try:
-        # Obtener parámetros
-        date_from = request.args.get('date_from')
-        date_to = request.args.get('date_to')
-        date_cutoff = request.args.get('date_cutoff') # Nuevo parámetro
-        supplier = request.args.get('supplier')
-        account_codes = request.args.get('account_codes')
-        payment_state = request.args.get('payment_state')
-        doc_type_id = request.args.get('doc_type_id', type=int)
-        reference = request.args.get('reference')
-        has_retention = request.args.get('has_retention') == 'true'
-        has_origin = request.args.get('has_origin') == 'true'
-        include_reconciled = request.args.get('include_reconciled') == 'true'
-        limit = request.args.get('limit', type=int, default=10000)
-
-        # En corte histórico incluir conciliados para cuadrar con el mayor (misma lógica que /treasury/report/account42)
-        if date_cutoff:
-            include_reconciled = True
-        
-        # Obtener datos
-        odoo_repo = _get_odoo_repository()
-        treasury_service = TreasuryService(odoo_repo)
-        
-        data = treasury_service.get_accounts_payable_report(
-            start_date=date_from,
-            end_date=date_to,
-            cutoff_date=date_cutoff, # Pasando el parámetro
-            supplier=supplier,
-            limit=limit,
-            account_codes=account_codes,
-            payment_state=payment_state,
-            doc_type_id=doc_type_id,
-            reference=reference,
-            has_retention=has_retention,
-            has_origin=has_origin,
-            include_reconciled=include_reconciled
-        )
-        
-        # Generar Excel
-        excel_buffer = ExcelExportService.export_treasury_report(data)
-        
-        # Generar nombre de archivo
-        suffix = ""
-        if date_cutoff:
-            suffix = f"_corte_{date_cutoff}"
-        else:
-            suffix = f"_{date_from or 'inicio'}_{date_to or 'hoy'}"
-            
-        filename = f"reporte_tesoreria{suffix}.xlsx"
-        
+        report = REPORTS[name]
+        filters = report['filters'](request.args)
+        data = load_rows(name, filters)
+        extension, mimetype = EXPORT_FORMATS[file_format]
+        filename = report['filename'](filters, extension)
+
+        if file_format in ('csv', 'csv.gz'):
+            body = TabularExportService.iter_csv(
+                data, report['columns'], compress=file_format == 'csv.gz'
+            )
+            return Response(
+                stream_with_context(body),
+                mimetype=mimetype,
+                headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+            )
+
         return send_file(
-            excel_buffer,
-            mimetype='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            write_report(name, data, file_format),
+            mimetype=mimetype,
             as_attachment=True,
             download_name=filename
         )
-        
+
     except Exception as e:
         return jsonify({
             'success': False,
-            'message': f'Error al exportar a Excel: {str(e)}'
+            'message': f'Error al exportar a {file_format}: {str(e)}'
         }), 500
 
+
+@exports_bp.route('/collections/<file_format>', methods=['GET'])
+def export_collections_file(file_format):
+    """
+    Exporta reporte de cobranzas en otro formato.
+
+    Path:
+        - file_format: xlsx, csv, csv.gz, parquet o arrow
+
+    Query Parameters:
+        - Los mismos de /collections/excel
+    """
+    return _export_file('collections', file_format)
+
+
+@exports_bp.route('/treasury/<file_format>', methods=['GET'])
+def export_treasury_file(file_format):
+    """
+    Exporta reporte de tesorería en otro formato.
+
+    Path:
+        - file_format: xlsx, csv, csv.gz, parquet o arrow
+
+    Query Parameters:
+        - Los mismos de /treasury/excel
+    """
+    return _export_file('treasury', file_format)
+
+
+@exports_bp.route('/jobs', methods=['POST'])
+def create_export_job():
+    """
+    Crea un trabajo asíncrono de exportación (Celery).
+
+    Body (JSON):
+        - report: 'collections' o 'treasury'
+        - format: 'xlsx' (por defecto), 'csv', 'csv.gz', 'parquet' o 'arrow'
+        - filters: mismos parámetros que el endpoint síncrono del reporte
+
+    Si ya hay un trabajo vigente con los mismos filtros se devuelve ese.
+
+    Response (202):
+        Trabajo con su estado y progreso
+    """
+    from app.tasks import task_run_export
+
+    try:
+        payload = request.get_json(silent=True) or {}
+        name = payload.get('report')
+        if name not in REPORTS:
+            return jsonify({
+                'success': False,
+                'message': f"Reporte no válido. Opciones: {', '.join(REPORTS)}"
+            }), 400
+        file_format = payload.get('format', 'xlsx')
+        if not is_format_available(file_format):
+            return jsonify({
+                'success': False,
+                'message': f"Formato no soportado: {file_format}"
+            }), 400
+
+        filters = REPORTS[name]['filters'](payload.get('filters') or {})
+        store = ExportJobStore()
+        job, created = store.create(name, filters, file_format)
+        if created:
+            task_run_export.delay(job['id'])
+
+        return jsonify({
+            'success': True,
+            'created': created,
+            'data': ExportJobStore.public(job)
+        }), 202
+
+    except Exception as e:
+        return jsonify({
+            'success': False,
+            'message': f'Error al crear la exportación: {str(e)}'
+        }), 500
+
+
+@exports_bp.route('/jobs/<job_id>', methods=['GET'])
+def get_export_job(job_id):
+    """
+    Estado de un trabajo de exportación.
+
+    Response:
+        status (queued, fetching, writing, done, failed), rows_fetched,
+        rows_written, error, file_name, size_bytes y expires_at
+    """
+    job = ExportJobStore().get(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Trabajo de exportación no encontrado o expirado'
+        }), 404
+    return jsonify({'success': True, 'data': ExportJobStore.public(job)})
+
+
+@exports_bp.route('/jobs/<job_id>/download', methods=['GET'])
+def download_export_job(job_id):
+    """
+    Descarga el archivo de un trabajo terminado.
+
+    Response:
+        Archivo descargable; 409 si el trabajo aún no termina
+    """
+    store = ExportJobStore()
+    job = store.get(job_id)
+    if not job:
+        return jsonify({
+            'success': False,
+            'message': 'Trabajo de exportación no encontrado o expirado'
+        }), 404
+    if job['status'] != 'done':
+        return jsonify({
+            'success': False,
+            'message': f"La exportación aún no está lista (estado: {job['status']})",
+            'data': ExportJobStore.public(job)
+        }), 409
+
+    path = store.file_path(job)
+    if not path.exists():
+        return jsonify({
+            'success': False,
+            'message': 'El archivo de la exportación ya no existe'
+        }), 404
+    return send_file(
+        str(path),
+        mimetype=EXPORT_FORMATS[job['format']][1],
+        as_attachment=True,
+        download_name=job['file_name']
+    )
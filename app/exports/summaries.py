@@ -0,0 +1,109 @@
+# -*- coding: utf-8 -*-
+"""
+Hojas resumen de las exportaciones.
+
+Cada hoja resumen es un acumulador incremental: recibe cada fila ya convertida
+por el plan de exportación mientras se escribe la hoja de detalle y actualiza
+sus totales por grupo. Así el libro con resúmenes (por cuenta, antigüedad,
+cliente) se arma en una sola pasada sobre las filas, sin volver a recorrerlas
+ni hacer tablas dinámicas a mano.
+"""
+
+# Actualización de cada medida: (acumulado, valor, ¿vencido?) -> acumulado
+_OPERATIONS = {
+    'count': lambda acc, value, overdue: acc + 1,
+    'sum': lambda acc, value, overdue: acc + value,
+    'sum_overdue': lambda acc, value, overdue: acc + value if overdue else acc,
+    'sum_current': lambda acc, value, overdue: acc if overdue else acc + value,
+    'max': lambda acc, value, overdue: value if acc is None or value > acc else acc,
+}
+
+# Tipo de columna (export_plan.COLUMN_KINDS) del resultado de cada operación
+_RESULT_KINDS = {'count': 'days', 'max': 'days'}
+
+
+class SummarySheet:
+    """
+    Hoja resumen acumulada fila a fila.
+
+    Args:
+        title (str): Nombre de la hoja
+        group_by (list): Columnas de agrupación (campo, encabezado, ancho)
+        measures (list): Medidas (encabezado, campo, operación, ancho); operaciones:
+            count, sum, sum_overdue, sum_current (según días vencidos > 0), max
+        sort_by (str): Encabezado de la medida para ordenar (por defecto el grupo)
+        descending (bool): Orden descendente
+    """
+
+    def __init__(self, title, group_by, measures, overdue_key='dias_vencido',
+                 sort_by=None, descending=False):
+        self.title = title
+        self.group_by = group_by
+        self.measures = measures
+        self.overdue_key = overdue_key
+        self.sort_by = sort_by
+        self.descending = descending
+        self._groups = {}
+
+    def columns(self):
+        """Columnas de la hoja (campo, encabezado, tipo, ancho), para ExportPlan."""
+        columns = [(str(i), header, 'text', width) for i, (_, header, width) in enumerate(self.group_by)]
+        offset = len(columns)
+        for i, (header, key, operation, width) in enumerate(self.measures, offset):
+            columns.append((str(i), header, _RESULT_KINDS.get(operation, 'money'), width))
+        return columns
+
+    def bind(self, plan):
+        """
+        Resuelve las posiciones de los campos en la fila convertida del plan.
+
+        Returns:
+            callable: Función que acumula una fila (lista de valores)
+        """
+        group_indices = [plan.keys.index(key) for key, _, _ in self.group_by]
+        overdue_index = plan.keys.index(self.overdue_key)
+        updates = [
+            (plan.keys.index(key) if key else overdue_index, _OPERATIONS[operation])
+            for _, key, operation, _ in self.measures
+        ]
+        initial = [None if operation == 'max' else 0 for _, _, operation, _ in self.measures]
+        groups = self._groups
+
+        # Vacíos de Odoo (None, False, '') en un solo grupo
+        def group_of(values):
+            return tuple('' if values[i] is None or values[i] is False else values[i]
+                         for i in group_indices)
+
+        def add(values):
+            group = group_of(values)
+            totals = groups.get(group)
+            if totals is None:
+                totals = groups[group] = list(initial)
+            overdue = values[overdue_index] > 0
+            for position, (index, update) in enumerate(updates):
+                totals[position] = update(totals[position], values[index], overdue)
+
+        return add
+
+    def rows(self):
+        """Filas del resumen (ordenadas) y fila de totales al final."""
+        width = len(self.group_by)
+        rounded = [operation.startswith('sum') for _, _, operation, _ in self.measures]
+        result = []
+        for group, totals in self._groups.items():
+            result.append(list(group) + [round(value, 2) if is_sum else value
+                                         for value, is_sum in zip(totals, rounded)])
+        if self.sort_by:
+            position = width + [m[0] for m in self.measures].index(self.sort_by)
+            result.sort(key=lambda row: (row[position] is None, row[position]), reverse=self.descending)
+        else:
+            result.sort(key=lambda row: [str(v) for v in row[:width]])
+
+        total = ['TOTAL'] + [''] * (width - 1)
+        for position, (_, _, operation, _) in enumerate(self.measures, width):
+            values = [row[position] for row in result if row[position] is not None]
+            if operation == 'max':
+                total.append(max(values) if values else None)
+            else:
+                total.append(round(sum(values), 2))
+        return result, total
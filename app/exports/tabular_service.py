@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Servicio de Exportación a formatos tabulares (CSV, Parquet, Arrow IPC).
+
+Para cargar los reportes en pandas o herramientas BI, xlsx es el formato más
+lento de escribir y de leer. Estos formatos usan las mismas columnas que
+ExcelExportService y el mismo plan compilado (export_plan.py), con tipos reales
+por columna: montos como float, días como entero y textos como string (nulo si
+está vacío).
+
+- CSV se genera en streaming por bloques (opcionalmente con gzip).
+- Parquet y Arrow IPC se arman por columnas con pyarrow (compresión zstd).
+  Requieren `pyarrow`; si no está instalado esos formatos quedan deshabilitados.
+"""
+
+import csv
+import io
+import zlib
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dependencia opcional
+    pa = None
+    pq = None
+
+from app.exports.export_plan import ExportPlan
+
+
+class TabularExportService:
+    """
+    Servicio para exportar reportes a CSV, Parquet y Arrow IPC.
+    """
+
+    # Formatos: (extensión, mimetype, ¿requiere pyarrow?)
+    FORMATS = {
+        'csv': ('csv', 'text/csv; charset=utf-8', False),
+        'csv.gz': ('csv.gz', 'application/gzip', False),
+        'parquet': ('parquet', 'application/vnd.apache.parquet', True),
+        'arrow': ('arrow', 'application/vnd.apache.arrow.file', True),
+    }
+
+    # Filas por bloque de CSV y por record batch de Arrow/Parquet
+    CHUNK_ROWS = 5000
+
+    @classmethod
+    def is_available(cls, file_format):
+        """Indica si el formato es válido y sus dependencias están instaladas."""
+        spec = cls.FORMATS.get(file_format)
+        return bool(spec) and (not spec[2] or pa is not None)
+
+    @classmethod
+    def iter_csv(cls, rows, columns, compress=False):
+        """
+        Genera el CSV por bloques (para una respuesta en streaming).
+
+        Args:
+            rows (iterable): Registros (dicts)
+            columns (list): Columnas (campo, encabezado, tipo, ancho)
+            compress (bool): Comprimir con gzip
+
+        Yields:
+            bytes: Bloques del archivo
+        """
+        plan = ExportPlan.compile(columns)
+        typed_values = plan.typed_values
+        gz = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+
+        def flush():
+            data = buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            return gz.compress(data) if gz else data
+
+        writer.writerow(plan.titles)
+        pending = 0
+        for record in rows:
+            writer.writerow(typed_values(record))
+            pending += 1
+            if pending >= cls.CHUNK_ROWS:
+                pending = 0
+                chunk = flush()
+                if chunk:
+                    yield chunk
+        chunk = flush()
+        if gz:
+            chunk += gz.flush()
+        if chunk:
+            yield chunk
+
+    @classmethod
+    def _schema(cls, plan):
+        return pa.schema([
+            (title, getattr(pa, kind.arrow_type)()) for title, kind in zip(plan.titles, plan.kinds)
+        ])
+
+    @classmethod
+    def _batches(cls, rows, plan, schema):
+        """Record batches tipados de CHUNK_ROWS filas (conversión por columna)."""
+        def batch(chunk):
+            return pa.record_batch(
+                [pa.array(plan.column(chunk, index), type=field.type)
+                 for index, field in enumerate(schema)],
+                schema=schema
+            )
+
+        chunk = []
+        for record in rows:
+            chunk.append(record)
+            if len(chunk) >= cls.CHUNK_ROWS:
+                yield batch(chunk)
+                chunk = []
+        if chunk:
+            yield batch(chunk)
+
+    @classmethod
+    def write(cls, rows, columns, file_format, output):
+        """
+        Escribe el reporte en un archivo binario.
+
+        Args:
+            rows (iterable): Registros (dicts); puede ser un generador
+            columns (list): Columnas (campo, encabezado, tipo, ancho)
+            file_format (str): 'csv', 'csv.gz', 'parquet' o 'arrow'
+            output (file): Archivo binario destino
+
+        Returns:
+            file: El mismo archivo, posicionado al inicio
+        """
+        if not cls.is_available(file_format):
+            raise ValueError(f"Formato no disponible: {file_format}")
+
+        if file_format in ('csv', 'csv.gz'):
+            for chunk in cls.iter_csv(rows, columns, compress=file_format == 'csv.gz'):
+                output.write(chunk)
+        else:
+            plan = ExportPlan.compile(columns)
+            schema = cls._schema(plan)
+            if file_format == 'parquet':
+                writer = pq.ParquetWriter(output, schema, compression='zstd')
+            else:
+                options = pa.ipc.IpcWriteOptions(compression='zstd')
+                writer = pa.ipc.new_file(output, schema, options=options)
+            try:
+                for batch in cls._batches(rows, plan, schema):
+                    writer.write_batch(batch)
+            finally:
+                writer.close()
+        output.seek(0)
+        return output
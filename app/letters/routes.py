@@ -9,6 +9,8 @@ from flask import request, jsonify, current_app
 from app.letters import letters_bp
 from app.letters.letters_service import LettersService
 from app.emails.email_service import EmailService
+from app.emails.email_logger import EmailLogger
+from app.emails.batches import enqueue_email_batch
 from app.core.odoo import OdooRepository
 from app.auth.security import require_login, get_authenticated_user_email
 
@@ -140,6 +142,9 @@ def send_acceptance_emails():
     Envía correos de recordatorio de firma para letras en estado 'to_accept'.
     
     Body: { "letter_ids": ["id1", "id2"] }
+
+    El envío se encola (Celery): responde 202 con batch_id; el progreso por
+    destinatario se consulta en /email-batches/<batch_id>.
     """
     try:
         data = request.get_json()
@@ -195,23 +200,20 @@ def send_acceptance_emails():
                 'skipped': skipped_letters
             }), 400
         
-        # 3. Enviar correos usando el método de aceptación
-        email_service = get_email_service()
+        # 3. Encolar correos de aceptación (el worker los envía)
         recipients_data = list(grouped_by_email.values())
         sender_email = get_authenticated_user_email()
-        result = email_service.send_acceptance_reminders(
-            recipients_data,
-            sender_email=sender_email
-        )
+        batch = enqueue_email_batch('acceptance', recipients_data, sender_email=sender_email)
         
         return jsonify({
             'success': True,
-            'message': 'Proceso de envío completado',
-            'details': result,
+            'message': 'Envío encolado',
+            'batch_id': batch['batch_id'],
+            'details': batch,
             'skipped': skipped_letters,
             'dev_mode': dev_mode,
             'dev_recipient': dev_recipient if dev_mode else None
-        })
+        }), 202
         
     except Exception as e:
         print(f"Error en send_acceptance_emails: {str(e)}")
@@ -230,6 +232,9 @@ def send_recover_emails():
     Envía correos de recordatorio de firma.
     
     Body: { "letter_ids": ["id1", "id2"] }
+
+    El envío se encola (Celery): responde 202 con batch_id; el progreso por
+    destinatario se consulta en /email-batches/<batch_id>.
     """
     try:
         data = request.get_json()
@@ -264,20 +269,17 @@ def send_recover_emails():
                 }
             grouped_by_customer[customer_name]['letters'].append(letter)
         
-        # 3. Enviar correos
-        email_service = get_email_service()
+        # 3. Encolar correos
         recipients_data = list(grouped_by_customer.values())
         sender_email = get_authenticated_user_email()
-        result = email_service.send_letters_to_recover(
-            recipients_data,
-            sender_email=sender_email
-        )
+        batch = enqueue_email_batch('recover', recipients_data, sender_email=sender_email)
         
         return jsonify({
             'success': True,
-            'message': 'Proceso de envío completado',
-            'details': result
-        })
+            'message': 'Envío encolado',
+            'batch_id': batch['batch_id'],
+            'details': batch
+        }), 202
         
     except Exception as e:
         print(f"Error en send_recover_emails: {str(e)}")
@@ -294,6 +296,9 @@ def send_bank_emails():
     Envía avisos de letras en banco (Número de pago).
     
     Body: { "letter_ids": ["id1", "id2"] }
+
+    El envío se encola (Celery): responde 202 con batch_id; el progreso por
+    destinatario se consulta en /email-batches/<batch_id>.
     """
     try:
         data = request.get_json()
@@ -326,20 +331,17 @@ def send_bank_emails():
                 }
             grouped_by_customer[customer_name]['letters'].append(letter)
             
-        # 3. Enviar correos
-        email_service = get_email_service()
+        # 3. Encolar correos
         recipients_data = list(grouped_by_customer.values())
         sender_email = get_authenticated_user_email()
-        result = email_service.send_letters_in_bank(
-            recipients_data,
-            sender_email=sender_email
-        )
+        batch = enqueue_email_batch('bank', recipients_data, sender_email=sender_email)
         
         return jsonify({
             'success': True,
-            'message': 'Proceso de envío completado',
-            'details': result
-        })
+            'message': 'Envío encolado',
+            'batch_id': batch['batch_id'],
+            'details': batch
+        }), 202
 
     except Exception as e:
         print(f"Error en send_bank_emails: {str(e)}")
@@ -349,6 +351,26 @@ def send_bank_emails():
         }), 500
 
 
+@letters_bp.route('/email-batches/<batch_id>', methods=['GET'])
+@require_login
+def get_email_batch(batch_id):
+    """
+    Progreso de un lote de correos encolado.
+
+    Response:
+        status (queued, sending, done), total, conteo por estado y
+        destinatarios (queued, sending, retrying, sent, failed) con intentos,
+        último error y próximo reintento
+    """
+    batch = EmailLogger().get_batch(batch_id)
+    if not batch:
+        return jsonify({
+            'success': False,
+            'message': 'Lote de correos no encontrado'
+        }), 404
+    return jsonify({'success': True, 'data': batch})
+
+
 @letters_bp.route('/generate-schedule', methods=['POST'])
 @require_login
 def generate_bank_schedule():
@@ -395,6 +417,7 @@ def status():
             '/in-bank',
             '/send-acceptance',
             '/send-recover',
-            '/send-bank'
+            '/send-bank',
+            '/email-batches/<batch_id>'
         ]
     }), 200
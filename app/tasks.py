@@ -1,22 +1,90 @@
 # app/tasks.py
-from celery import shared_task
-from scripts.etl.etl_sync_threading import run_etl
+from celery import shared_task, chord, group
+from scripts.etl.mappings import run_job
+from scripts.etl import backfill
 import logging
 
 logger = logging.getLogger(__name__)
 
 @shared_task(name="run_etl_sync")
-def task_run_etl_sync():
+def task_run_etl_sync(job='sync', days_back=30):
     """
     Tarea de Celery que ejecuta la sincronización Odoo -> Supabase.
     Esta tarea es ejecutada por el contenedor 'worker'.
+
+    Args:
+        job (str): Trabajo ETL definido en scripts/etl/mappings.py ('sync', 'netted', 'full')
+        days_back (int): Ventana de la primera carga (sin checkpoint)
     """
-    logger.info("Iniciando tarea ETL Sync desde Celery...")
+    logger.info(f"Iniciando tarea ETL '{job}' desde Celery...")
     try:
-        # Ejecuta el script que ya tienes
-        run_etl()
-        return "Sincronización ETL Completada"
+        metrics = run_job(job, days_back=days_back)
+        return {
+            'status': 'Sincronización ETL Completada',
+            'job': job,
+            'rows': {name: t['rows'] for name, t in metrics['tables'].items()},
+            'wall_seconds': round(metrics['wall_seconds'], 1),
+        }
     except Exception as e:
         logger.error(f"Error crítico en ETL: {e}")
         raise e
 
+
+@shared_task(name="etl_backfill")
+def task_etl_backfill(job='netted', mapping='lines', shards=None):
+    """
+    Backfill histórico paralelo: planifica shards por rango de ID y los reparte
+    entre los workers (chord); al terminar todos se ejecuta la reconciliación.
+    """
+    plan = backfill.plan(job, mapping, shards)
+    todo = [s['shard'] for s in plan if s['status'] not in ('done', 'reconciled')]
+    logger.info(f"Backfill {job}.{mapping}: {len(todo)} shards a ejecutar")
+    if not todo:
+        return task_etl_backfill_reconcile.delay([], job, mapping).id
+    result = chord(
+        group(task_etl_backfill_shard.s(job, mapping, n) for n in todo)
+    )(task_etl_backfill_reconcile.s(job, mapping))
+    return result.id
+
+
+# ignore_result=False: el chord necesita los resultados de cada shard
+@shared_task(name="etl_backfill_shard", ignore_result=False)
+def task_etl_backfill_shard(job, mapping, shard):
+    """Carga un shard del backfill (reanuda desde su último lote confirmado)."""
+    return backfill.run_shard(job, mapping, shard)
+
+
+@shared_task(name="etl_backfill_reconcile", ignore_result=False)
+def task_etl_backfill_reconcile(shard_results, job, mapping):
+    """Reconciliación final del backfill (conteos, faltantes y checkpoint incremental)."""
+    rows = sum(r.get('rows', 0) for r in shard_results or [])
+    logger.info(f"Backfill {job}.{mapping}: {len(shard_results or [])} shards, {rows} registros; reconciliando")
+    return backfill.reconcile(job, mapping)
+
+
+@shared_task(name="run_export")
+def task_run_export(job_id):
+    """
+    Genera el archivo de un trabajo de exportación asíncrono (app/exports/jobs.py).
+    El progreso y el resultado quedan en el manifest del trabajo, no en Celery.
+    """
+    from app.exports.jobs import run_export_job
+    job = run_export_job(job_id)
+    return job['status'] if job else None
+
+
+@shared_task(name="send_email_batch")
+def task_send_email_batch(batch_id, kind, recipients_data, sender_email=None, attempt=1):
+    """
+    Envía un lote de correos de letras (app/emails/batches.py).
+    Los destinatarios con error temporal se reencolan con espera exponencial;
+    el progreso queda en la auditoría de correos, no en Celery.
+    """
+    from app.emails.batches import run_email_batch, retry_delay
+    pending = run_email_batch(batch_id, kind, recipients_data, sender_email, attempt)
+    if pending:
+        task_send_email_batch.apply_async(
+            args=(batch_id, kind, pending, sender_email, attempt + 1),
+            countdown=retry_delay(attempt)
+        )
+    return len(pending)
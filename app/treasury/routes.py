@@ -9,6 +9,7 @@ from flask import request, jsonify, current_app
 from app.treasury import treasury_bp
 from app.treasury.services import TreasuryService
 from app.core.odoo import OdooRepository
+from app.core.currency import CurrencyRateTable
 
 
 def _get_odoo_repository():
@@ -87,6 +88,10 @@ def report_account42():
             include_reconciled=include_reconciled
         )
         
+        # Tasas de cambio del día (en caché por proceso, sin RPC por request)
+        rate_table = CurrencyRateTable.for_repository(odoo_repo)
+        company_currency = rate_table.company_currency if rate_table else 'PEN'
+        
         def _summarize(rows):
             overall = {
                 'debit': 0.0,
@@ -97,6 +102,7 @@ def report_account42():
                 'count': 0
             }
             accounts = {}
+            currencies = {}
             
             for row in rows:
                 acc = row.get('account_code') or 'N/A'
@@ -128,6 +134,14 @@ def report_account42():
                 accounts[acc]['pending_cutoff'] += pending
                 accounts[acc]['paid_after_cutoff'] += paid_after
                 accounts[acc]['count'] += 1
+                
+                # Desglose por moneda del documento. Los residuales de línea
+                # (amount_residual) ya están en moneda de la compañía.
+                currency = row.get('currency_id') or company_currency
+                if currency not in currencies:
+                    currencies[currency] = {'currency': currency, 'count': 0, 'pending_cutoff_company': 0.0}
+                currencies[currency]['count'] += 1
+                currencies[currency]['pending_cutoff_company'] += pending
             
             # Calcular saldo (Debe - Haber) por cuenta y global
             # En Odoo el "Saldo" de análisis/mayor corresponde al balance = debit - credit.
@@ -150,7 +164,9 @@ def report_account42():
             
             return {
                 'overall': overall,
-                'by_account': by_account
+                'by_account': by_account,
+                'by_currency': sorted(currencies.values(), key=lambda x: x['currency']),
+                'company_currency': company_currency
             }
         
         summary = _summarize(data)
@@ -198,7 +214,7 @@ def report_account42():
 @treasury_bp.route('/report/account42-netted', methods=['GET'])
 def report_account42_netted():
     """
-    Endpoint para reporte de cuentas por pagar neteado (desde Supabase).
+    Endpoint para reporte de cuentas por pagar neteado (desde el warehouse: Supabase o local).
     
     Query Parameters:
         - supplier (str, optional): Nombre del proveedor a filtrar
@@ -231,7 +247,7 @@ def report_account42_netted():
             'data': data,
             'count': len(data),
             'summary': summary,
-            'message': f'Reporte neteado generado con {len(data)} registros desde Supabase'
+            'message': f'Reporte neteado generado con {len(data)} registros desde el warehouse'
         }), 200
         
     except Exception as e:
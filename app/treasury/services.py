@@ -6,9 +6,32 @@ Lógica de negocio para reportes de cuentas por pagar (CxP).
 Implementa reportes para cuentas contables 42 y 43.
 """
 
+import time
 from datetime import datetime
 from app.core.calculators import calcular_dias_vencido, clasificar_antiguedad
 from app.core.supabase import SupabaseClient
+from app.core.accounts import AccountCodeResolver
+from app.core.partners import PartnerSearchIndex
+from app.core.report_cache import ReportDatasetCache
+from app.core.snapshots import ReportSnapshotStore
+from scripts.etl.warehouse import LocalWarehouse
+
+
+# Mapas de traducción de estados de Odoo
+PAYMENT_STATE_MAP = {
+    'not_paid': 'No Pagado',
+    'in_payment': 'En Proceso',
+    'paid': 'Pagado',
+    'partial': 'Parcial',
+    'reversed': 'Revertido',
+    'invoicing_legacy': 'Histórico'
+}
+
+STATE_MAP = {
+    'draft': 'Borrador',
+    'posted': 'Publicado',
+    'cancel': 'Cancelado'
+}
 
 
 class TreasuryService:
@@ -21,6 +44,14 @@ class TreasuryService:
     - Clasificar antigüedad de deudas por pagar
     - Filtrar por proveedor, fecha, estado de pago
     """
+
+    # Columnas de un corte que siguen cambiando después del cierre (pagos
+    # posteriores, estado y residual actual): no se congelan en el snapshot
+    SNAPSHOT_LIVE_FIELDS = (
+        'payment_state', 'amount_residual', 'amount_residual_historical',
+        'amount_residual_with_retention', 'amount_residual_currency', 'paid_after_cutoff',
+        'reconciled', 'full_reconcile_id', 'reconciliation_date',
+    )
     
     def __init__(self, odoo_repository):
         """
@@ -78,6 +109,7 @@ class TreasuryService:
             page (int): Número de página (1-indexed)
             per_page (int): Registros por página
             **kwargs: Filtros (start_date, end_date, supplier, account_codes, doc_type_id, payment_state, cutoff_date)
+                y opcionalmente line_ids: lista que recibe el ID de línea de cada fila (snapshots)
         
         Returns:
             dict: Datos paginados con metadatos
@@ -138,26 +170,8 @@ class TreasuryService:
                 if end_date:
                     line_domain.append(('date', '<=', end_date))
             
-            # Construir OR para códigos de cuenta
-            if len(codes) > 1:
-                or_operators = ['|'] * (len(codes) - 1)
-                code_conditions = []
-                for code in codes:
-                    # Si el usuario pasa un código "completo" (ej: 4230002), hacemos match exacto.
-                    # Si pasa un prefijo (ej: 42, 423), usamos prefijo.
-                    is_exact = code.isdigit() and len(code) >= 6
-                    if is_exact:
-                        code_conditions.append(('account_id.code', '=', code))
-                    else:
-                        code_conditions.append(('account_id.code', '=like', f'{code}%'))
-                line_domain = or_operators + code_conditions + line_domain
-            else:
-                code0 = codes[0]
-                is_exact = code0.isdigit() and len(code0) >= 6
-                if is_exact:
-                    line_domain.insert(0, ('account_id.code', '=', code0))
-                else:
-                    line_domain.insert(0, ('account_id.code', '=like', f'{code0}%'))
+            # Cuentas resueltas a IDs (account_id in [...]) en lugar de OR por código
+            line_domain = AccountCodeResolver(self.repository).build_domain(codes) + line_domain
             
             # Filtros adicionales
             if not cutoff_date: # Solo aplicar filtro de fecha normal si no es reporte historico
@@ -167,7 +181,8 @@ class TreasuryService:
                     line_domain.append(('date', '<=', end_date))
             
             if supplier:
-                line_domain.append(('partner_id.name', 'ilike', supplier))
+                # Resuelve el texto a partner_id in [...] con el índice local de socios
+                line_domain += PartnerSearchIndex.for_repository(self.repository).build_domain(supplier)
             if payment_state and not cutoff_date: # Estado de pago actual solo sirve en reporte actual
                 line_domain.append(('move_id.payment_state', '=', payment_state))
             if doc_type_id:
@@ -243,7 +258,8 @@ class TreasuryService:
                 account_map,
                 cutoff_date,
                 reconciliation_map,
-                include_reconciled
+                include_reconciled,
+                line_ids=kwargs.get('line_ids')
             )
             
             # 5. Metadatos
@@ -267,6 +283,17 @@ class TreasuryService:
             traceback.print_exc()
             raise
 
+    @staticmethod
+    def get_cached_accounts_payable_report(limit=0, **filters):
+        """
+        Filas de get_accounts_payable_report en caché para los mismos argumentos, sin consultar Odoo.
+
+        Returns:
+            list: Líneas de reporte CxP o None si no están en caché
+        """
+        filters['limit'] = limit if limit and limit > 0 else 10000
+        return ReportDatasetCache.get('cxp', filters)
+
     def get_accounts_payable_report(self, start_date=None, end_date=None, cutoff_date=None,
                                     supplier=None, limit=0, account_codes=None,
                                     payment_state=None, doc_type_id=None, reference=None,
@@ -293,6 +320,41 @@ class TreasuryService:
         """
         # Redirigir a la versión paginada solicitando "todas" (o muchas) líneas si limit=0
         limit_val = limit if limit and limit > 0 else 10000
+        
+        # Mismo reporte recién calculado (p.ej. la vista antes de exportar)
+        dataset_filters = {
+            'start_date': start_date, 'end_date': end_date, 'cutoff_date': cutoff_date,
+            'supplier': supplier, 'limit': limit_val,
+            'account_codes': account_codes, 'payment_state': payment_state,
+            'doc_type_id': doc_type_id, 'reference': reference,
+            'has_retention': has_retention, 'has_origin': has_origin,
+            'only_vouchers': only_vouchers, 'include_reconciled': include_reconciled,
+        }
+        cached_rows = ReportDatasetCache.get('cxp', dataset_filters)
+        if cached_rows is not None:
+            return cached_rows
+        
+        # Cortes de períodos cerrados: servir desde snapshot congelado
+        snapshot_store = None
+        snapshot_filters = None
+        lock_date = None
+        if cutoff_date and self.repository:
+            store = ReportSnapshotStore()
+            lock_date = store.closed_lock_date(self.repository, cutoff_date)
+            if lock_date:
+                snapshot_store = store
+                snapshot_filters = {
+                    'supplier': supplier, 'limit': limit_val,
+                    'account_codes': account_codes, 'payment_state': payment_state,
+                    'doc_type_id': doc_type_id, 'reference': reference,
+                    'has_retention': has_retention, 'has_origin': has_origin,
+                    'only_vouchers': only_vouchers, 'include_reconciled': include_reconciled,
+                }
+                cached_rows = snapshot_store.load('cxp', cutoff_date, snapshot_filters, lock_date)
+                if cached_rows is not None:
+                    return self._join_live_columns(cached_rows, cutoff_date, include_reconciled)
+        
+        row_line_ids = []
         result = self.get_report_lines_paginated(
             page=1, per_page=limit_val,
             start_date=start_date, end_date=end_date,
@@ -302,9 +364,22 @@ class TreasuryService:
             reference=reference,
             has_retention=has_retention, has_origin=has_origin,
             only_vouchers=only_vouchers,
-            include_reconciled=include_reconciled
+            # El snapshot guarda también las conciliadas al corte: si luego se
+            # rompe la conciliación, la línea vuelve a salir al servirlo
+            include_reconciled=include_reconciled or bool(snapshot_store),
+            line_ids=row_line_ids
         )
-        return result['data']
+        rows = result['data']
+        
+        if snapshot_store:
+            snapshot_store.save('cxp', cutoff_date, snapshot_filters, rows,
+                                row_line_ids, lock_date, self.SNAPSHOT_LIVE_FIELDS)
+            rows = self._join_live_columns(
+                [{**row, ReportSnapshotStore.LINE_ID_KEY: line_id} for row, line_id in zip(rows, row_line_ids)],
+                cutoff_date, include_reconciled
+            )
+        ReportDatasetCache.set('cxp', dataset_filters, rows)
+        return rows
     
     def get_supplier_bank_accounts(self, supplier_name=None):
         """
@@ -505,134 +580,154 @@ class TreasuryService:
         
         return line_map
 
-    def _process_payable_lines(self, lines, move_map, partner_map, account_map, cutoff_date=None, reconciliation_map=None, include_reconciled=False):
+    def _process_payable_lines(self, lines, move_map, partner_map, account_map, cutoff_date=None, reconciliation_map=None, include_reconciled=False, line_ids=None):
         """
         Procesa las líneas de CxP y combina con datos relacionados.
         Si cutoff_date está presente, recalcula estado histórico.
+        Si se pasa line_ids (lista), recibe el ID de línea de cada fila.
+        
+        Procesamiento por lotes: las columnas que dependen de la factura, el
+        proveedor o la cuenta se calculan una sola vez por registro (no por
+        línea) y los días de vencimiento una sola vez por fecha distinta.
         """
-        rows = []
         # Si es histórico, el día de referencia es el corte. Si no, es hoy.
         today = datetime.strptime(cutoff_date, '%Y-%m-%d').date() if cutoff_date else datetime.today().date()
+        reconciliation_map = reconciliation_map or {}
+        extract = self._extract_m2o_name
+        no_reconcile = {}
         
-        # Mapas de traducción
-        PAYMENT_STATE_MAP = {
-            'not_paid': 'No Pagado',
-            'in_payment': 'En Proceso',
-            'paid': 'Pagado',
-            'partial': 'Parcial',
-            'reversed': 'Revertido',
-            'invoicing_legacy': 'Histórico'
-        }
+        # 1. Filtrado histórico (post-fetch): conciliadas al corte o sin fecha de conciliación
+        if cutoff_date and not include_reconciled:
+            lines = [
+                line for line in lines
+                if not line.get('reconciled', False)
+                or (reconciliation_map.get(line['id'], no_reconcile).get('max_date') or '') > cutoff_date
+            ]
+        if line_ids is not None:
+            line_ids.extend(line['id'] for line in lines)
         
-        STATE_MAP = {
-            'draft': 'Borrador',
-            'posted': 'Publicado',
-            'cancel': 'Cancelado'
-        }
+        # 2. Bloques de columnas por factura, proveedor y cuenta
+        move_blocks = {}
+        partner_blocks = {}
+        account_blocks = {}
+        for line in lines:
+            move_id = line['move_id'][0] if line.get('move_id') else None
+            if move_id not in move_blocks:
+                move = move_map.get(move_id, {})
+                payment_state_raw = move.get('payment_state', '')
+                state_raw = move.get('state', '')
+                head = {
+                    # Datos de la factura
+                    'move_name': move.get('name', ''),
+                    'ref': move.get('ref', ''),
+                    'payment_state': PAYMENT_STATE_MAP.get(payment_state_raw, payment_state_raw),
+                    'move_type': move.get('move_type', ''),
+                    'state': STATE_MAP.get(state_raw, state_raw),
+                    'invoice_date': move.get('invoice_date', ''),
+                    'invoice_date_due': move.get('invoice_date_due', ''),
+                    'invoice_origin': move.get('invoice_origin', ''),
+                    'invoice_payment_term_id': extract(move.get('invoice_payment_term_id')),
+                    # Se mantiene en backend aunque no se muestra en el reporte HTML
+                    'invoice_user_id': extract(move.get('invoice_user_id')),
+                    'l10n_latam_document_type_id': extract(move.get('l10n_latam_document_type_id')),
+                    'l10n_latam_boe_number': move.get('l10n_latam_boe_number', ''),  # Número de letra de cambio
+                    'narration': move.get('narration', ''),
+                    'fiscal_position_id': extract(move.get('fiscal_position_id')),
+                    'invoice_incoterm_id': extract(move.get('invoice_incoterm_id')),
+                    'company_id': extract(move.get('company_id')),
+                }
+                move_blocks[move_id] = (
+                    head,
+                    extract(move.get('currency_id')),
+                    move.get('amount_total_in_currency_signed', 0.0),
+                    move.get('amount_residual_with_retention', 0.0),
+                    move.get('amount_total_signed', 0.0),
+                    move.get('l10n_pe_retention_check', False),
+                )
+            
+            partner_id = line['partner_id'][0] if line.get('partner_id') else None
+            if partner_id not in partner_blocks:
+                partner = partner_map.get(partner_id, {})
+                partner_blocks[partner_id] = {
+                    # Datos del proveedor
+                    'supplier_vat': partner.get('vat', ''),
+                    'supplier_name': partner.get('name', ''),
+                    'supplier_country': extract(partner.get('country_id')),
+                    'supplier_state': extract(partner.get('state_id')),
+                    'supplier_city': partner.get('city', ''),
+                    'supplier_email': partner.get('email', ''),
+                    'supplier_rank': partner.get('supplier_rank', 0),
+                }
+            
+            account_id = line['account_id'][0] if line.get('account_id') else None
+            if account_id not in account_blocks:
+                account = account_map.get(account_id, {})
+                account_blocks[account_id] = {
+                    # Datos de la cuenta contable
+                    'account_code': account.get('code', ''),
+                    'account_name': account.get('name', ''),
+                }
         
+        # 3. Antigüedad por fecha de vencimiento distinta
+        aging_cache = {}
+        
+        def aging_for(date_due):
+            aging = aging_cache.get(date_due)
+            if aging is None:
+                dias_vencido = calcular_dias_vencido(date_due, today) if date_due else 0
+                aging = (
+                    dias_vencido,
+                    'VENCIDO' if dias_vencido > 0 else 'VIGENTE',
+                    clasificar_antiguedad(max(0, dias_vencido)),
+                )
+                aging_cache[date_due] = aging
+            return aging
+        
+        # 4. Ensamblado de filas
+        rows = []
         for line in lines:
-            rec_info = reconciliation_map.get(line['id'], {}) if reconciliation_map else {}
-            reconcile_date = rec_info.get('max_date')
-            paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
-            paid_before_cutoff = float(rec_info.get('paid_before', 0.0) or 0.0)
-
-            # Lógica de Filtrado Histórico (Post-Fetch)
-            if cutoff_date:
-                is_reconciled_now = line.get('reconciled', False)
-                
-                if is_reconciled_now and reconcile_date:
-                    # Si se pagó antes o en el corte y no pedimos conciliados, omitir
-                    if reconcile_date <= cutoff_date and not include_reconciled:
-                        continue
-                elif is_reconciled_now and not reconcile_date:
-                    # Conciliado pero sin fecha: si no incluimos conciliados, omitir
-                    if not include_reconciled:
-                        continue
-
             move_id = line['move_id'][0] if line.get('move_id') else None
             partner_id = line['partner_id'][0] if line.get('partner_id') else None
             account_id = line['account_id'][0] if line.get('account_id') else None
+            head, move_currency, total_in_currency, residual_with_retention, total_signed, retention_check = move_blocks[move_id]
             
-            move = move_map.get(move_id, {})
-            partner = partner_map.get(partner_id, {})
-            account = account_map.get(account_id, {})
-            
-            # Calcular días de vencimiento
-            invoice_date_due = move.get('invoice_date_due', '')
-            date_due = line.get('date_maturity') or invoice_date_due
-            dias_vencido = calcular_dias_vencido(date_due, today) if date_due else 0
-            
-            antiguedad = clasificar_antiguedad(max(0, dias_vencido))
-            estado_deuda = 'VENCIDO' if dias_vencido > 0 else 'VIGENTE'
+            date_due = line.get('date_maturity') or head['invoice_date_due']
+            dias_vencido, estado_deuda, antiguedad = aging_for(date_due)
             
             debit = line.get('debit', 0.0) or 0.0
             credit = line.get('credit', 0.0) or 0.0
-            amount_total_line = abs(debit - credit)
-            current_residual = abs(line.get('amount_residual', 0.0) or 0.0)
-            amount_residual_line = current_residual
-            amount_residual_historical = amount_residual_line
-
-            paid_after_cutoff = paid_after_cutoff if cutoff_date else 0.0
-
-            # Ajuste de montos para histórico con pagos después del corte
+            residual_raw = line.get('amount_residual', 0.0)
+            current_residual = abs(residual_raw or 0.0)
+            
+            rec_info = reconciliation_map.get(line['id'], no_reconcile)
+            reconcile_date = rec_info.get('max_date')
             if cutoff_date:
                 # El pendiente histórico es el residual actual + lo pagado después del corte
+                paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
                 amount_residual_historical = current_residual + paid_after_cutoff
                 if reconcile_date and reconcile_date <= cutoff_date and include_reconciled:
                     amount_residual_historical = 0.0
+            else:
+                paid_after_cutoff = 0.0
+                amount_residual_historical = current_residual
             
-            payment_state_raw = move.get('payment_state', '')
-            # Ajuste estado de pago visual
-            payment_state_display = PAYMENT_STATE_MAP.get(payment_state_raw, payment_state_raw)
-            if cutoff_date and amount_residual_historical > 0:
-                payment_state_display = "No Pagado (al corte)"
-
-            state_raw = move.get('state', '')
+            line_currency = line.get('currency_id')
             
             row = {
-                # Datos de la factura
-                'move_name': move.get('name', ''),
-                'ref': move.get('ref', ''),
-                'payment_state': payment_state_display,
-                'move_type': move.get('move_type', ''),
-                'state': STATE_MAP.get(state_raw, state_raw),
-                'invoice_date': move.get('invoice_date', ''),
-                'invoice_date_due': invoice_date_due,
-                'invoice_origin': move.get('invoice_origin', ''),
-                'invoice_payment_term_id': self._extract_m2o_name(move.get('invoice_payment_term_id')),
-                # 'invoice_user_id': self._extract_m2o_name(move.get('invoice_user_id')), # REMOVED per user request (aunque sigo extrayendo, no lo mostraré en front, pero si no cuesta dejarlo...)
-                # El usuario pidió sacarlo del REPORTE (HTML), no necesariamente del backend. Lo dejo por si acaso lo piden luego.
-                'invoice_user_id': self._extract_m2o_name(move.get('invoice_user_id')),
-                'l10n_latam_document_type_id': self._extract_m2o_name(move.get('l10n_latam_document_type_id')),
-                'l10n_latam_boe_number': move.get('l10n_latam_boe_number', ''),  # Número de letra de cambio
-                'narration': move.get('narration', ''),
-                'fiscal_position_id': self._extract_m2o_name(move.get('fiscal_position_id')),
-                'invoice_incoterm_id': self._extract_m2o_name(move.get('invoice_incoterm_id')),
-                'company_id': self._extract_m2o_name(move.get('company_id')),
-                
-                # Datos del proveedor
-                'supplier_vat': partner.get('vat', ''),
-                'supplier_name': partner.get('name', ''),
-                'supplier_country': self._extract_m2o_name(partner.get('country_id')),
-                'supplier_state': self._extract_m2o_name(partner.get('state_id')),
-                'supplier_city': partner.get('city', ''),
-                'supplier_email': partner.get('email', ''),
-                'supplier_rank': partner.get('supplier_rank', 0),
-                
-                # Datos de la cuenta contable
-                'account_code': account.get('code', ''),
-                'account_name': account.get('name', ''),
+                **head,
+                **partner_blocks[partner_id],
+                **account_blocks[account_id],
                 
                 # Montos
-                'currency_id': self._extract_m2o_name(line.get('currency_id') or move.get('currency_id')),
-                'amount_total': amount_total_line,
-                'amount_residual': amount_residual_line,
+                'currency_id': extract(line_currency) if line_currency else move_currency,
+                'amount_total': abs(debit - credit),
+                'amount_residual': current_residual,
                 'amount_residual_historical': amount_residual_historical,
-                'amount_total_in_currency_signed': move.get('amount_total_in_currency_signed', 0.0),
-                'amount_residual_with_retention': move.get('amount_residual_with_retention', 0.0),
-                'amount_total_signed': move.get('amount_total_signed', 0.0),
+                'amount_total_in_currency_signed': total_in_currency,
+                'amount_residual_with_retention': residual_with_retention,
+                'amount_total_signed': total_signed,
                 'amount_currency': line.get('amount_currency', 0.0),
-                'amount_residual_currency': line.get('amount_residual', 0.0),
+                'amount_residual_currency': residual_raw,
                 'paid_after_cutoff': paid_after_cutoff,
                 'debit': debit,
                 'credit': credit,
@@ -643,20 +738,94 @@ class TreasuryService:
                 'name': line.get('name', ''),
                 'reconciled': line.get('reconciled', False),
                 'blocked': line.get('blocked', False),
-                'full_reconcile_id': self._extract_m2o_name(line.get('full_reconcile_id')),
+                'full_reconcile_id': extract(line.get('full_reconcile_id')),
                 'reconciliation_date': reconcile_date if cutoff_date else '',
                 
                 # Campos calculados
                 'dias_vencido': dias_vencido,
                 'estado_deuda': estado_deuda,
                 'antiguedad': antiguedad,
-                'l10n_pe_retention_check': move.get('l10n_pe_retention_check', False),
+                'l10n_pe_retention_check': retention_check,
             }
             
+            # Ajuste estado de pago visual
+            if cutoff_date and amount_residual_historical > 0:
+                row['payment_state'] = "No Pagado (al corte)"
+            
             rows.append(row)
         
         return rows
     
+    def _join_live_columns(self, rows, cutoff_date, include_reconciled=False):
+        """
+        Completa filas de un snapshot con las columnas vivas (SNAPSHOT_LIVE_FIELDS).
+
+        Lee de Odoo por ID las líneas, sus conciliaciones y facturas, y aplica
+        el mismo cálculo que _process_payable_lines; descarta las filas que hoy
+        ya no saldrían en el corte (conciliadas al corte sin include_reconciled).
+
+        Args:
+            rows (list): Filas leídas de un snapshot (con ID de línea)
+            cutoff_date (str): Fecha de corte
+            include_reconciled (bool): Incluir conciliados al corte
+
+        Returns:
+            list: Filas completas
+        """
+        extract = self._extract_m2o_name
+        line_ids = [row.pop(ReportSnapshotStore.LINE_ID_KEY, None) for row in rows]
+        ids = [line_id for line_id in line_ids if line_id]
+        lines = self.repository.read(
+            'account.move.line', ids,
+            ['id', 'move_id', 'amount_residual', 'reconciled', 'full_reconcile_id',
+             'matched_debit_ids', 'matched_credit_ids']
+        ) if ids else []
+        line_map = {l['id']: l for l in lines}
+
+        move_ids = list(set([l['move_id'][0] for l in lines if l.get('move_id')]))
+        moves = self.repository.read(
+            'account.move', move_ids, ['id', 'payment_state', 'amount_residual_with_retention']
+        ) if move_ids else []
+        move_map = {m['id']: m for m in moves}
+        reconciliation_map = self._get_reconciliation_amounts(lines, cutoff_date)
+
+        joined = []
+        for row, line_id in zip(rows, line_ids):
+            line = line_map.get(line_id)
+            if line is None:
+                continue
+            rec_info = reconciliation_map.get(line['id'], {})
+            reconcile_date = rec_info.get('max_date')
+            if not include_reconciled and line.get('reconciled', False) and (reconcile_date or '') <= cutoff_date:
+                continue
+            move = move_map.get(line['move_id'][0] if line.get('move_id') else None, {})
+
+            residual_raw = line.get('amount_residual', 0.0)
+            current_residual = abs(residual_raw or 0.0)
+            paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
+            amount_residual_historical = current_residual + paid_after_cutoff
+            if reconcile_date and reconcile_date <= cutoff_date and include_reconciled:
+                amount_residual_historical = 0.0
+
+            payment_state_raw = move.get('payment_state', '')
+            payment_state = PAYMENT_STATE_MAP.get(payment_state_raw, payment_state_raw)
+            if amount_residual_historical > 0:
+                payment_state = "No Pagado (al corte)"
+
+            row.update({
+                'payment_state': payment_state,
+                'amount_residual': current_residual,
+                'amount_residual_historical': amount_residual_historical,
+                'amount_residual_with_retention': move.get('amount_residual_with_retention', 0.0),
+                'amount_residual_currency': residual_raw,
+                'paid_after_cutoff': paid_after_cutoff,
+                'reconciled': line.get('reconciled', False),
+                'full_reconcile_id': extract(line.get('full_reconcile_id')),
+                'reconciliation_date': reconcile_date,
+            })
+            joined.append(row)
+        return joined
+
     @staticmethod
     def _extract_m2o_name(value):
         """
@@ -666,18 +835,20 @@ class TreasuryService:
             return value[1]
         return ''
 
-    def get_netted_report_from_supabase(self, supplier=None):
+    def get_netted_report_from_supabase(self, supplier=None, warehouse=None):
         """
-        Consulta la vista de reporte neteado en Supabase.
+        Consulta la vista de reporte neteado en el warehouse.
         
         Args:
             supplier (str, optional): Filtro por nombre de proveedor
+            warehouse (optional): Cliente del warehouse (Supabase o LocalWarehouse).
+                Por defecto el de SupabaseClient (según WAREHOUSE_BACKEND).
             
         Returns:
             list: Datos del reporte neteado
         """
         try:
-            supabase = SupabaseClient.get_client()
+            supabase = warehouse or SupabaseClient.get_client()
             if not supabase:
                 print("[ERROR] No se pudo obtener el cliente de Supabase")
                 return []
@@ -692,7 +863,11 @@ class TreasuryService:
             # Ordenar por fecha de emisión descendente
             query = query.order('date_emitted', desc=True)
             
+            start = time.perf_counter()
             response = query.execute()
+            backend = 'local' if isinstance(supabase, LocalWarehouse) else 'supabase'
+            print(f"[INFO] Reporte neteado: {len(response.data)} filas en "
+                  f"{(time.perf_counter() - start) * 1000:.1f} ms ({backend})")
             
             # Formatear los datos para que coincidan con lo que el frontend espera
             # (opcional, pero útil para mantener compatibilidad)
@@ -11,6 +11,7 @@ from app.web import web_bp
 from app.core.supabase import SupabaseClient
 from app.core.odoo import OdooRepository
 from flask import current_app
+from scripts.etl.telemetry import recent_runs, warehouse_freshness
 
 
 # =============================================================================
@@ -37,7 +38,16 @@ def health_check():
             odoo_status = "error"
         
         # Verificar Supabase
-        supabase_status = "connected" if SupabaseClient.get_client() else "disconnected"
+        supabase = SupabaseClient.get_client()
+        supabase_status = "connected" if supabase else "disconnected"
+        
+        # Frescura del warehouse (última sincronización ETL exitosa)
+        warehouse = {"status": "unknown"}
+        if supabase:
+            try:
+                warehouse = warehouse_freshness(supabase)
+            except Exception as e:
+                warehouse = {"status": "unknown", "error": str(e)}
         
         return jsonify({
             "status": "healthy",
@@ -45,7 +55,8 @@ def health_check():
             "services": {
                 "odoo": odoo_status,
                 "supabase": supabase_status
-            }
+            },
+            "warehouse": warehouse
         })
     except Exception as e:
         return jsonify({
@@ -54,6 +65,30 @@ def health_check():
         }), 500
 
 
+@web_bp.route('/api/etl/runs', methods=['GET'])
+def etl_runs():
+    """
+    Telemetría de las últimas ejecuciones ETL (tabla etl_runs).
+
+    Query params:
+        job (str, optional): Filtrar por trabajo ('sync', 'netted', 'full')
+        limit (int, optional): Cantidad de ejecuciones (default 20, máx 200)
+    """
+    supabase = SupabaseClient.get_client()
+    if not supabase:
+        return jsonify({"success": False, "error": "Supabase no disponible"}), 503
+    try:
+        limit = min(max(request.args.get('limit', 20, type=int), 1), 200)
+        runs = recent_runs(supabase, job=request.args.get('job'), limit=limit)
+        return jsonify({
+            "success": True,
+            "data": runs,
+            "freshness": warehouse_freshness(supabase)
+        })
+    except Exception as e:
+        return jsonify({"success": False, "error": str(e)}), 500
+
+
 # =============================================================================
 # AUTENTICACIÓN
 # =============================================================================
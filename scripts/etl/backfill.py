@@ -0,0 +1,242 @@
+# -*- coding: utf-8 -*-
+"""
+Backfill histórico paralelo por rangos de ID (shards).
+
+Una carga completa de un mapeo (ej: todas las líneas 12/42/43/67/77 del
+trabajo 'netted') se divide en N rangos de ID. Cada shard:
+    - se ejecuta en su propio proceso (pool local) o worker de Celery (chord)
+    - carga sus IDs por lotes en orden y guarda `last_id` en
+      `etl_backfill_shards` después de cada lote, así se reanuda solo
+      desde el último lote confirmado
+Al terminar todos los shards, la reconciliación compara conteos Odoo vs
+warehouse por rango, carga los faltantes y deja el checkpoint incremental del
+mapeo en el inicio del backfill (los cambios ocurridos durante la carga los
+trae la siguiente sincronización incremental).
+
+Uso local:
+    python scripts/etl/backfill.py            # netted.lines, ETL_BACKFILL_SHARDS procesos
+"""
+
+import math
+import sys
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+try:
+    from scripts.etl import settings
+    from scripts.etl.engine import ETLEngine
+    from scripts.etl.mappings import JOBS
+    from scripts.etl.sync_state import ODOO_DATETIME_FORMAT
+except ImportError:  # Ejecución directa desde scripts/etl
+    import settings
+    from engine import ETLEngine
+    from mappings import JOBS
+    from sync_state import ODOO_DATETIME_FORMAT
+
+BACKFILL_TABLE = 'etl_backfill_shards'
+# IDs por página al listar los IDs del warehouse en la reconciliación
+WAREHOUSE_PAGE_SIZE = 1000
+
+
+class BackfillCoordinator:
+    """Planificación, ejecución por shard y reconciliación de un backfill."""
+
+    def __init__(self, engine, job, mapping_name):
+        """
+        Args:
+            engine (ETLEngine): Motor con conexión a Odoo y al warehouse
+            job (str): Trabajo de mappings.JOBS (ej: 'netted')
+            mapping_name (str): Mapeo a cargar (ej: 'lines')
+        """
+        if job not in JOBS:
+            raise ValueError(f"Trabajo ETL desconocido: {job}")
+        self.engine = engine
+        self.job = job
+        self.mappings = JOBS[job]()
+        self.mapping = next((m for m in self.mappings if m.name == mapping_name), None)
+        if self.mapping is None or self.mapping.source != 'search':
+            raise ValueError(f"El mapeo '{mapping_name}' no existe o no es de búsqueda en '{job}'")
+        self.key = f'{job}.{mapping_name}'
+        engine.prepare(job, self.mappings)
+
+    # -- Estado de shards -------------------------------------------------------
+
+    def _shards(self):
+        result = self.engine.supabase.table(BACKFILL_TABLE).select('*').eq('backfill_key', self.key).execute()
+        return sorted(result.data or [], key=lambda s: s['shard'])
+
+    def _save(self, shard, **values):
+        values.update({'backfill_key': self.key, 'shard': shard['shard'], 'updated_at': datetime.now().isoformat()})
+        self.engine.supabase.table(BACKFILL_TABLE).upsert(values).execute()
+
+    def _range_domain(self, id_from, id_to):
+        return list(self.mapping.domain) + [('id', '>=', id_from), ('id', '<', id_to)]
+
+    # -- Plan ---------------------------------------------------------------------
+
+    def plan(self, shard_count=None):
+        """
+        Divide el rango de IDs en shards (o reanuda un plan sin reconciliar).
+
+        Returns:
+            list: Shards pendientes de reconciliación
+        """
+        existing = [s for s in self._shards() if s['status'] != 'reconciled']
+        if existing:
+            print(f"[BACKFILL] {self.key}: reanudando plan de {len(existing)} shards")
+            return existing
+
+        shard_count = max(1, shard_count or settings.ETL_BACKFILL_SHARDS)
+        model = self.mapping.model
+        first = self.engine.execute(model, 'search', [self.mapping.domain], {'limit': 1, 'order': 'id asc'})
+        last = self.engine.execute(model, 'search', [self.mapping.domain], {'limit': 1, 'order': 'id desc'})
+        if not first:
+            print(f"[BACKFILL] {self.key}: sin registros")
+            return []
+
+        planned_at = datetime.utcnow().strftime(ODOO_DATETIME_FORMAT)
+        width = math.ceil((last[0] - first[0] + 1) / shard_count)
+        shards = []
+        for i in range(shard_count):
+            id_from = first[0] + i * width
+            if id_from > last[0]:
+                break
+            shards.append({
+                'backfill_key': self.key,
+                'shard': i,
+                'id_from': id_from,
+                'id_to': min(id_from + width, last[0] + 1),
+                'last_id': None,
+                'rows_loaded': 0,
+                'status': 'pending',
+                'planned_write_date': planned_at,
+                'updated_at': datetime.now().isoformat(),
+            })
+        # Un plan nuevo reemplaza al anterior ya reconciliado
+        self.engine.supabase.table(BACKFILL_TABLE).delete().eq('backfill_key', self.key).execute()
+        self.engine.supabase.table(BACKFILL_TABLE).upsert(shards).execute()
+        print(f"[BACKFILL] {self.key}: {len(shards)} shards de ~{width} IDs ({first[0]}..{last[0]})")
+        return shards
+
+    # -- Shard ----------------------------------------------------------------------
+
+    def run_shard(self, shard_number):
+        """
+        Carga un shard desde su último lote confirmado.
+
+        Returns:
+            dict: {'shard', 'rows', 'status'}
+        """
+        shard = next((s for s in self._shards() if s['shard'] == shard_number), None)
+        if shard is None:
+            raise ValueError(f"Shard {shard_number} no planificado para {self.key}")
+        if shard['status'] in ('done', 'reconciled'):
+            return {'shard': shard_number, 'rows': 0, 'status': shard['status']}
+
+        start_id = max(shard['id_from'], (shard.get('last_id') or 0) + 1)
+        ids = self.engine.execute(
+            self.mapping.model, 'search', [self._range_domain(start_id, shard['id_to'])], {'order': 'id asc'}
+        ) or []
+        print(f"[BACKFILL] {self.key}#{shard_number}: {len(ids)} registros desde id {start_id}")
+        self._save(shard, status='running')
+
+        progress = {'rows': shard.get('rows_loaded') or 0, 'run_rows': 0}
+
+        def on_batch(last_id, rows):
+            progress['rows'] += rows
+            progress['run_rows'] += rows
+            self._save(shard, last_id=last_id, rows_loaded=progress['rows'])
+
+        self.engine.load_ids(self.mapping.name, ids, on_batch=on_batch)
+        self._save(shard, status='done')
+        print(f"[BACKFILL] {self.key}#{shard_number}: ✓ {progress['run_rows']} registros")
+        return {'shard': shard_number, 'rows': progress['run_rows'], 'status': 'done'}
+
+    # -- Reconciliación -------------------------------------------------------------
+
+    def _warehouse_ids(self, id_from, id_to):
+        table = self.engine.supabase.table(self.mapping.table)
+        ids, offset = [], 0
+        while True:
+            page = (table.select('id').gte('id', id_from).lt('id', id_to).order('id')
+                    .range(offset, offset + WAREHOUSE_PAGE_SIZE - 1).execute().data or [])
+            ids.extend(r['id'] for r in page)
+            if len(page) < WAREHOUSE_PAGE_SIZE:
+                return ids
+            offset += WAREHOUSE_PAGE_SIZE
+
+    def reconcile(self):
+        """
+        Verifica los shards terminados y cierra el backfill.
+
+        Returns:
+            dict: {'shards', 'rows', 'missing_loaded'} o {'pending': [...]} si
+                  aún hay shards sin terminar
+        """
+        shards = [s for s in self._shards() if s['status'] != 'reconciled']
+        pending = [s['shard'] for s in shards if s['status'] != 'done']
+        if pending:
+            print(f"[BACKFILL] {self.key}: shards sin terminar {pending}; no se reconcilia")
+            return {'pending': pending}
+
+        missing_total = 0
+        for shard in shards:
+            odoo_ids = self.engine.execute(
+                self.mapping.model, 'search', [self._range_domain(shard['id_from'], shard['id_to'])], {'order': 'id asc'}
+            ) or []
+            missing = sorted(set(odoo_ids) - set(self._warehouse_ids(shard['id_from'], shard['id_to'])))
+            if missing:
+                print(f"[BACKFILL] {self.key}#{shard['shard']}: cargando {len(missing)} faltantes")
+                # El cache local de hashes podría darlas por escritas
+                self.engine.loader.forget(self.mapping.table, missing)
+                self.engine.load_ids(self.mapping.name, missing)
+                missing_total += len(missing)
+
+        # La sincronización incremental continúa desde el inicio del backfill
+        planned_at = min((s['planned_write_date'] for s in shards if s.get('planned_write_date')), default=None)
+        if planned_at and self.mapping.incremental:
+            sync_key = self.mapping.sync_key or self.key
+            self.engine.state.advance(sync_key, self.mapping.model, [{'id': 0, 'write_date': str(planned_at).replace('T', ' ')[:19]}])
+
+        for shard in shards:
+            self._save(shard, status='reconciled')
+        rows = sum(s.get('rows_loaded') or 0 for s in shards) + missing_total
+        print(f"[BACKFILL] {self.key}: ✓ reconciliado ({rows} registros, {missing_total} faltantes recuperados)")
+        return {'shards': len(shards), 'rows': rows, 'missing_loaded': missing_total}
+
+
+def run_shard(job, mapping_name, shard_number):
+    """Ejecuta un shard con credenciales del entorno (proceso del pool o worker de Celery)."""
+    engine = ETLEngine.from_env()
+    return BackfillCoordinator(engine, job, mapping_name).run_shard(shard_number)
+
+
+def reconcile(job, mapping_name):
+    engine = ETLEngine.from_env()
+    return BackfillCoordinator(engine, job, mapping_name).reconcile()
+
+
+def plan(job, mapping_name, shard_count=None):
+    engine = ETLEngine.from_env()
+    return BackfillCoordinator(engine, job, mapping_name).plan(shard_count)
+
+
+def run_backfill(job='netted', mapping_name='lines', shard_count=None, processes=None):
+    """
+    Backfill completo con un pool local de procesos (un shard por tarea).
+
+    Returns:
+        dict: Resultado de la reconciliación
+    """
+    shards = plan(job, mapping_name, shard_count)
+    todo = [s['shard'] for s in shards if s['status'] not in ('done', 'reconciled')]
+    if todo:
+        with ProcessPoolExecutor(max_workers=processes or len(todo)) as pool:
+            futures = [pool.submit(run_shard, job, mapping_name, n) for n in todo]
+            for future in as_completed(futures):
+                future.result()
+    return reconcile(job, mapping_name)
+
+
+if __name__ == '__main__':
+    run_backfill(*sys.argv[1:3])
@@ -0,0 +1,294 @@
+# -*- coding: utf-8 -*-
+"""
+Carga masiva al warehouse (Supabase/PostgreSQL).
+
+Camino rápido: conexión directa con psycopg2 (SUPABASE_DB_URI). Cada lote se
+envía con `COPY ... FROM STDIN` a una tabla de staging temporal de la sesión
+(no registrada en WAL, privada de la conexión) y luego se fusiona en la tabla
+destino con `INSERT ... ON CONFLICT DO UPDATE`. Evita serializar JSON y el
+límite de tamaño de request de PostgREST.
+
+Respaldo: si no hay URI, psycopg2 no está disponible o la conexión se cae, se
+usa `supabase.table(...).upsert(...)` por PostgREST en bloques de 500 filas.
+Con el warehouse local (warehouse.py, WAREHOUSE_BACKEND=sqlite) siempre se usa
+este camino: el cliente local escribe directo en SQLite.
+
+En ambos caminos se omiten las filas cuyo `row_hash` coincide con el que ya
+tiene el warehouse (ver row_hashes.py): solo se escribe lo que cambió.
+"""
+
+import io
+import json
+import os
+import threading
+
+try:
+    import psycopg2
+    from psycopg2 import sql
+except ImportError:  # pragma: no cover - dependencia opcional
+    psycopg2 = None
+    sql = None
+
+try:
+    from scripts.etl.row_hashes import RowHashCache, HASHED_TABLES, row_hash
+    from scripts.etl.warehouse import LocalWarehouse
+except ImportError:  # Ejecución directa desde scripts/etl
+    from row_hashes import RowHashCache, HASHED_TABLES, row_hash
+    from warehouse import LocalWarehouse
+
+# Claves de conflicto por tabla (para ON CONFLICT)
+TABLE_KEYS = {
+    'dim_partners': ('id',),
+    'fact_moves': ('id',),
+    'fact_move_lines': ('id',),
+    'fact_partial_reconciles': ('id',),
+    'fact_letters': ('id',),
+    'fact_bill_forms': ('id',),
+    'rel_letter_moves': ('letter_id', 'move_id'),
+    'rel_bill_form_invoices': ('bill_form_id', 'move_id'),
+}
+
+POSTGREST_CHUNK_SIZE = 500
+# IDs por consulta de hashes vía PostgREST (los filtros viajan en la URL)
+POSTGREST_LOOKUP_SIZE = 200
+
+
+def _copy_value(value, is_boolean):
+    """Serializa un valor al formato texto de COPY (NULL = \\N)."""
+    if value is None or (value is False and not is_boolean):
+        # Odoo devuelve False para campos vacíos
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    text = str(value)
+    return text.replace('\\', '\\\\').replace('\t', '\\t').replace('\n', '\\n').replace('\r', '\\r')
+
+
+class WarehouseLoader:
+    """
+    Upsert por lotes con COPY + merge y respaldo PostgREST.
+
+    Es seguro usarlo desde varios hilos: cada hilo abre su propia conexión.
+    """
+
+    def __init__(self, supabase, db_uri=None, hash_cache=None, skip_unchanged=None):
+        """
+        Args:
+            supabase: Cliente de Supabase (respaldo PostgREST)
+            db_uri (str, optional): URI de PostgreSQL. Por defecto SUPABASE_DB_URI.
+            hash_cache (RowHashCache, optional): Cache local de hashes
+            skip_unchanged (bool, optional): Omitir filas sin cambios. Por
+                defecto ETL_SKIP_UNCHANGED (activo salvo que valga '0').
+        """
+        self.supabase = supabase
+        self.local = isinstance(supabase, LocalWarehouse)
+        if self.local:
+            db_uri = None  # La URI de Supabase apuntaría a otro warehouse
+        elif db_uri is None:
+            db_uri = os.getenv('SUPABASE_DB_URI', '')
+        self.db_uri = db_uri.replace('"', '').replace("'", "") if db_uri else None
+        self.copy_enabled = bool(self.db_uri and psycopg2 is not None)
+        # Identifica el warehouse destino (caches por destino, ej: hashes de dimensiones)
+        self.target = self.db_uri or getattr(supabase, 'supabase_url', None) or f'client-{id(supabase)}'
+        self._local = threading.local()
+        self._columns = {}
+        self._lock = threading.Lock()
+        if skip_unchanged is None:
+            skip_unchanged = os.getenv('ETL_SKIP_UNCHANGED', '1') != '0'
+        self.skip_unchanged = skip_unchanged
+        self.hash_cache = hash_cache or (RowHashCache() if skip_unchanged else None)
+        self._unhashed = set()  # Tablas del warehouse aún sin columna row_hash
+        self.bytes_sent = {}  # {tabla: bytes enviados} (telemetría)
+        if self.local:
+            print(f"[LOADER] Warehouse local: {supabase.path}")
+        elif not self.copy_enabled:
+            print("[LOADER] Sin conexión directa a PostgreSQL: se usará PostgREST")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = psycopg2.connect(self.db_uri)
+            self._local.conn = conn
+        return conn
+
+    def _table_columns(self, conn, table):
+        """Columnas reales de la tabla destino: {nombre: es_booleana}."""
+        with self._lock:
+            columns = self._columns.get(table)
+        if columns is None:
+            with conn.cursor() as cur:
+                cur.execute(
+                    "SELECT column_name, data_type FROM information_schema.columns "
+                    "WHERE table_schema = 'public' AND table_name = %s",
+                    (table,)
+                )
+                columns = {name: data_type == 'boolean' for name, data_type in cur.fetchall()}
+            conn.commit()
+            with self._lock:
+                self._columns[table] = columns
+        return columns
+
+    def _copy_merge(self, table, rows, keys):
+        conn = self._connection()
+        target_columns = self._table_columns(conn, table)
+        if not target_columns:
+            raise ValueError(f"La tabla {table} no existe en el warehouse")
+
+        columns = [c for c in rows[0] if c in target_columns]
+        updates = [c for c in columns if c not in keys]
+        is_boolean = [target_columns[c] for c in columns]
+
+        buffer = io.StringIO()
+        for row in rows:
+            buffer.write('\t'.join(
+                _copy_value(row.get(c), b) for c, b in zip(columns, is_boolean)
+            ))
+            buffer.write('\n')
+        size = buffer.tell()
+        buffer.seek(0)
+
+        stage = sql.Identifier(f'etl_stage_{table}')
+        column_list = sql.SQL(', ').join(map(sql.Identifier, columns))
+        key_list = sql.SQL(', ').join(map(sql.Identifier, keys))
+        if updates:
+            on_conflict = sql.SQL('DO UPDATE SET {}').format(sql.SQL(', ').join(
+                sql.SQL('{0} = EXCLUDED.{0}').format(sql.Identifier(c)) for c in updates
+            ))
+        else:
+            on_conflict = sql.SQL('DO NOTHING')
+
+        try:
+            with conn.cursor() as cur:
+                cur.execute(sql.SQL(
+                    'CREATE TEMP TABLE IF NOT EXISTS {} (LIKE {} INCLUDING DEFAULTS) ON COMMIT DELETE ROWS'
+                ).format(stage, sql.Identifier(table)))
+                cur.copy_expert(
+                    sql.SQL('COPY {} ({}) FROM STDIN').format(stage, column_list).as_string(conn),
+                    buffer
+                )
+                # DISTINCT ON: ON CONFLICT no admite la misma clave dos veces en un lote
+                cur.execute(sql.SQL(
+                    'INSERT INTO {table} ({columns}) '
+                    'SELECT DISTINCT ON ({keys}) {columns} FROM {stage} '
+                    'ORDER BY {keys} ON CONFLICT ({keys}) {on_conflict}'
+                ).format(
+                    table=sql.Identifier(table), columns=column_list,
+                    keys=key_list, stage=stage, on_conflict=on_conflict
+                ))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        self._count_bytes(table, size)
+
+    def _count_bytes(self, table, size):
+        with self._lock:
+            self.bytes_sent[table] = self.bytes_sent.get(table, 0) + size
+
+    def _warehouse_hashes(self, table, ids):
+        """Lee {id: row_hash} del warehouse para los IDs indicados."""
+        if self.copy_enabled:
+            conn = self._connection()
+            try:
+                with conn.cursor() as cur:
+                    cur.execute(
+                        sql.SQL('SELECT id, row_hash FROM {} WHERE id = ANY(%s)').format(sql.Identifier(table)),
+                        (list(ids),)
+                    )
+                    found = dict(cur.fetchall())
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            return found
+        found = {}
+        ids = list(ids)
+        for i in range(0, len(ids), POSTGREST_LOOKUP_SIZE):
+            result = self.supabase.table(table).select('id,row_hash').in_('id', ids[i:i + POSTGREST_LOOKUP_SIZE]).execute()
+            found.update((r['id'], r.get('row_hash')) for r in result.data or [])
+        return found
+
+    def _changed_rows(self, table, rows):
+        """
+        Filtra las filas cuyo contenido no cambió respecto al warehouse.
+
+        Returns:
+            tuple: (filas a escribir con row_hash, {id: hash} a recordar) o
+                   (filas sin tocar, None) si la tabla no usa hashes
+        """
+        if not self.skip_unchanged or table not in HASHED_TABLES or table in self._unhashed:
+            return rows, None
+
+        digests = {}
+        for row in rows:
+            digests[row['id']] = row_hash(row)
+        known = self.hash_cache.get_many(self.target, table, digests)
+        missing = [i for i in digests if i not in known]
+        if missing:
+            try:
+                found = self._warehouse_hashes(table, missing)
+            except Exception as e:
+                if psycopg2 is not None and isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError)):
+                    raise
+                print(f"[LOADER] {table}: sin columna row_hash ({e}); se escriben todas las filas")
+                with self._lock:
+                    self._unhashed.add(table)
+                return rows, None
+            known.update({i: h for i, h in found.items() if h})
+
+        changed = [dict(row, row_hash=digests[row['id']]) for row in rows if known.get(row['id']) != digests[row['id']]]
+        # Las filas sin cambios confirmadas por el warehouse renuevan su vigencia en el cache
+        confirmed = {i: h for i, h in known.items() if i in missing and digests[i] == h}
+        self.hash_cache.put_many(self.target, table, confirmed)
+        return changed, {row['id']: row['row_hash'] for row in changed}
+
+    def _postgrest_upsert(self, table, rows):
+        for i in range(0, len(rows), POSTGREST_CHUNK_SIZE):
+            chunk = rows[i:i + POSTGREST_CHUNK_SIZE]
+            self.supabase.table(table).upsert(chunk).execute()
+            self._count_bytes(table, len(json.dumps(chunk, default=str)))
+
+    def upsert(self, table, rows, keys=None):
+        """
+        Inserta o actualiza filas en una tabla del warehouse.
+
+        Args:
+            table (str): Tabla destino
+            rows (list): Filas (dicts con las mismas claves)
+            keys (tuple, optional): Clave de conflicto. Por defecto TABLE_KEYS.
+
+        Returns:
+            int: Filas enviadas (las que no cambiaron se omiten)
+        """
+        if not rows:
+            return 0
+        if self.copy_enabled:
+            try:
+                rows, hashes = self._changed_rows(table, rows)
+                if rows:
+                    self._copy_merge(table, rows, tuple(keys or TABLE_KEYS.get(table, ('id',))))
+                self._remember(table, hashes)
+                return len(rows)
+            except (psycopg2.OperationalError, psycopg2.InterfaceError) as e:
+                # Conexión no disponible: pasar a PostgREST para el resto de la ejecución
+                print(f"[LOADER] COPY no disponible ({e}); usando PostgREST")
+                self.copy_enabled = False
+        rows, hashes = self._changed_rows(table, rows)
+        self._postgrest_upsert(table, rows)
+        self._remember(table, hashes)
+        return len(rows)
+
+    def forget(self, table, ids):
+        """Descarta hashes conocidos para forzar la escritura de esas filas."""
+        if self.hash_cache is not None:
+            self.hash_cache.delete_many(self.target, table, ids)
+
+    def _remember(self, table, hashes):
+        if hashes:
+            self.hash_cache.put_many(self.target, table, hashes)
+
+    def close(self):
+        """Cierra la conexión del hilo actual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and not conn.closed:
+            conn.close()
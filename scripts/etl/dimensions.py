@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+"""
+Registro de dimensiones del ETL (ej: dim_partners).
+
+Varias tablas de hechos referencian los mismos socios y se cargan en paralelo.
+El registro garantiza que cada clave de una dimensión se lea de Odoo y se
+escriba en el warehouse como máximo una vez por ejecución: `claim` reserva las
+claves pendientes para el hilo que las pide y los demás hilos esperan a que esa
+carga termine en lugar de repetirla. Que la fila se escriba solo si cambió lo
+resuelve el cargador con el hash de contenido (row_hashes.py).
+"""
+
+import threading
+
+
+class DimensionRegistry:
+    """Claves de dimensiones cargadas (o en carga) en la ejecución actual."""
+
+    def __init__(self):
+        self._claims = {}  # {tabla: {clave: threading.Event}}
+        self._lock = threading.Lock()
+
+    def claim(self, table, keys):
+        """
+        Reserva las claves que nadie cargó aún en esta ejecución.
+
+        Returns:
+            tuple: (claves reservadas por este hilo, eventos de claves que
+                    está cargando otro hilo y que hay que esperar)
+        """
+        mine, pending = [], []
+        with self._lock:
+            claims = self._claims.setdefault(table, {})
+            for key in keys:
+                event = claims.get(key)
+                if event is None:
+                    claims[key] = threading.Event()
+                    mine.append(key)
+                elif not event.is_set():
+                    pending.append(event)
+        return mine, pending
+
+    def unloaded(self, table, keys):
+        """Claves que todavía no terminaron de cargarse (propias o de otro hilo)."""
+        with self._lock:
+            claims = self._claims.get(table, {})
+            return [key for key in keys if key not in claims or not claims[key].is_set()]
+
+    def mark_loaded(self, table, keys):
+        """Marca claves como cargadas (por ejemplo, por el pipeline de la propia tabla)."""
+        with self._lock:
+            claims = self._claims.setdefault(table, {})
+            for key in keys:
+                event = claims.get(key)
+                if event is None:
+                    event = claims[key] = threading.Event()
+                event.set()
+
+    def release(self, table, keys):
+        """Libera claves reservadas con `claim` (se llama aunque la carga falle)."""
+        with self._lock:
+            claims = self._claims.get(table, {})
+            for key in keys:
+                event = claims.get(key)
+                if event is not None:
+                    event.set()
@@ -0,0 +1,600 @@
+# -*- coding: utf-8 -*-
+"""
+Motor ETL declarativo Odoo -> warehouse.
+
+Cada tabla del warehouse se describe con un `TableMapping` (modelo de Odoo,
+campos y transformaciones, claves, dependencias y referencias). El motor se
+encarga de lo común a todas: checkpoints incrementales, lectura por bloques,
+pipeline extract/load concurrente, integridad referencial, carga masiva,
+reanudación por lote tras una caída (`progress.py`) y métricas. Las definiciones de cada trabajo viven en `mappings.py`.
+"""
+
+import threading
+import time
+import xmlrpc.client
+from datetime import datetime, timedelta
+
+try:
+    from scripts.etl import settings
+    from scripts.etl.pipeline import StagedPipeline
+    from scripts.etl.sync_state import SyncStateStore
+    from scripts.etl.bulk_loader import WarehouseLoader
+    from scripts.etl.dimensions import DimensionRegistry
+    from scripts.etl.telemetry import RunRecorder, lag_seconds
+    from scripts.etl.progress import BatchProgressStore
+    from scripts.etl.warehouse import create_warehouse_client
+except ImportError:  # Ejecución directa desde scripts/etl
+    import settings
+    from pipeline import StagedPipeline
+    from sync_state import SyncStateStore
+    from bulk_loader import WarehouseLoader
+    from dimensions import DimensionRegistry
+    from telemetry import RunRecorder, lag_seconds
+    from progress import BatchProgressStore
+    from warehouse import create_warehouse_client
+
+
+# ---------------------------------------------------------------------------
+# Transformaciones de campos
+# ---------------------------------------------------------------------------
+
+def m2o_id(value):
+    """Many2One [id, 'name'] -> id"""
+    return value[0] if isinstance(value, list) and value else None
+
+
+def m2o_name(value):
+    """Many2One [id, 'name'] -> 'name'"""
+    return value[1] if isinstance(value, list) and len(value) > 1 else None
+
+
+def clean(value):
+    """Valores vacíos de Odoo (False) -> None"""
+    return None if value is False else value
+
+
+def text(value):
+    """Texto no nulo (False/None -> '')"""
+    return str(value or '')
+
+
+def ids_of(value):
+    """Normaliza un campo Many2One/x2many a lista de IDs."""
+    if isinstance(value, list):
+        if len(value) == 2 and isinstance(value[0], int) and isinstance(value[1], str):
+            return [value[0]]  # Many2One
+        return [v for v in value if isinstance(v, int)]
+    if isinstance(value, int) and not isinstance(value, bool):
+        return [value]
+    return []
+
+
+def now_iso(record=None):
+    return datetime.now().isoformat()
+
+
+# ---------------------------------------------------------------------------
+# Especificaciones
+# ---------------------------------------------------------------------------
+
+class Relation:
+    """Tabla puente generada a partir de un campo x2many del registro."""
+
+    def __init__(self, table, keys, source_field, build):
+        """
+        Args:
+            table (str): Tabla destino (ej: 'rel_letter_moves')
+            keys (tuple): Columnas de la clave primaria
+            source_field (str): Campo x2many de Odoo que se debe leer
+            build (callable): (registro, id_relacionado) -> fila
+        """
+        self.table = table
+        self.keys = tuple(keys)
+        self.source_field = source_field
+        self.build = build
+
+    def rows(self, record):
+        return [self.build(record, related_id) for related_id in ids_of(record.get(self.source_field))]
+
+
+class TableMapping:
+    """
+    Mapeo declarativo de un modelo de Odoo a una tabla del warehouse.
+
+    Orígenes de IDs:
+        - 'search': domain sobre el modelo (incremental por write_date si
+          `incremental`; `initial_domain` acota la primera carga)
+        - 'collect': IDs reunidos de campos de otro mapeo (`collect_from`)
+        - 'reference': solo se carga bajo demanda cuando otra tabla lo referencia
+          (dimensiones, ej: socios)
+    """
+
+    def __init__(self, name, model, table, fields, keys=('id',), source='search',
+                 domain=None, initial_domain=None, limit=None, order='id asc',
+                 incremental=True, sync_key=None,
+                 depends_on=(), references=None, relations=(), collect_from=None,
+                 extra_read_fields=(), chunk_size=None):
+        """
+        Args:
+            name (str): Nombre del mapeo dentro del trabajo
+            model (str): Modelo de Odoo
+            table (str): Tabla destino
+            fields (dict): {columna: spec} donde spec es 'campo_odoo',
+                ('campo_odoo', transformación) o callable(registro)
+            keys (tuple): Clave de conflicto
+            source (str): 'search', 'collect' o 'reference'
+            domain (list): Domain base (source='search')
+            initial_domain (callable): limit_date -> domain extra sin checkpoint
+            limit (int): Máximo de registros por búsqueda (solo cargas completas)
+            order (str): Orden de la búsqueda
+            incremental (bool): Usar checkpoints por write_date
+            sync_key (str): Clave del checkpoint (default: '<trabajo>.<name>')
+            depends_on (tuple): Mapeos que deben terminar de cargar antes
+            references (dict): {campo_odoo: mapeo} a asegurar antes de cargar
+            relations (tuple): Tablas puente (Relation)
+            collect_from (tuple): (mapeo_padre, [campos con IDs]) para source='collect'
+            extra_read_fields (tuple): Campos adicionales a leer de Odoo
+            chunk_size (int): Registros por lote (default: ETL_BATCH_SIZE)
+        """
+        self.name = name
+        self.model = model
+        self.table = table
+        self.fields = fields
+        self.keys = tuple(keys)
+        self.source = source
+        self.domain = list(domain or [])
+        self.initial_domain = initial_domain
+        self.limit = limit
+        self.order = order
+        self.incremental = incremental and source == 'search'
+        self.sync_key = sync_key
+        self.depends_on = tuple(depends_on)
+        self.references = dict(references or {})
+        self.relations = tuple(relations)
+        self.collect_from = collect_from
+        self.chunk_size = chunk_size
+
+        read_fields = {'id', 'write_date'}
+        for spec in fields.values():
+            if isinstance(spec, str):
+                read_fields.add(spec)
+            elif isinstance(spec, tuple):
+                read_fields.add(spec[0])
+        read_fields.update(self.references)
+        read_fields.update(r.source_field for r in self.relations)
+        read_fields.update(extra_read_fields)
+        self.read_fields = sorted(read_fields)
+
+    def transform(self, record):
+        """Convierte un registro de Odoo en una fila del warehouse."""
+        row = {}
+        for column, spec in self.fields.items():
+            if isinstance(spec, str):
+                row[column] = record.get(spec)
+            elif isinstance(spec, tuple):
+                row[column] = spec[1](record.get(spec[0]))
+            else:
+                row[column] = spec(record)
+        return row
+
+
+# ---------------------------------------------------------------------------
+# Motor
+# ---------------------------------------------------------------------------
+
+class ETLEngine:
+    """
+    Ejecuta un trabajo (lista de TableMapping) contra Odoo y el warehouse.
+    """
+
+    def __init__(self, execute_kw, supabase, loader=None, state=None, batch_size=None,
+                 extract_workers=None, load_workers=None, queue_size=None, recorder=None,
+                 rpc_retries=None, progress=None):
+        """
+        Args:
+            execute_kw (callable): (model, method, args, kwargs) -> resultado.
+                Debe ser seguro entre hilos.
+            supabase: Cliente de Supabase (checkpoints y respaldo PostgREST)
+            loader (WarehouseLoader, optional): Cargador del warehouse
+            state (SyncStateStore, optional): Almacén de checkpoints
+            recorder (RunRecorder, optional): Registro de ejecuciones (etl_runs)
+            rpc_retries (int, optional): Reintentos por RPC ante errores de red
+            progress (BatchProgressStore, optional): Avance por lote (reanudación)
+        """
+        self._execute_kw = execute_kw
+        self.supabase = supabase
+        self.loader = loader or WarehouseLoader(supabase, settings.SUPABASE_DB_URI)
+        self.state = state or SyncStateStore(supabase)
+        self.recorder = recorder or RunRecorder(supabase)
+        self.progress = progress or BatchProgressStore(supabase)
+        self.rpc_retries = settings.ETL_RPC_RETRIES if rpc_retries is None else rpc_retries
+        self.batch_size = batch_size or settings.ETL_BATCH_SIZE
+        self.stage_options = {
+            'extract_workers': extract_workers or settings.ETL_EXTRACT_WORKERS,
+            'load_workers': load_workers or settings.ETL_LOAD_WORKERS,
+            'queue_size': queue_size or settings.ETL_QUEUE_SIZE,
+        }
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, **kwargs):
+        """Crea el motor con las credenciales de las variables de entorno."""
+        common = xmlrpc.client.ServerProxy(f'{settings.ODOO_URL}/xmlrpc/2/common')
+        uid = common.authenticate(settings.ODOO_DB, settings.ODOO_USER, settings.ODOO_PASSWORD, {})
+        if not uid:
+            raise RuntimeError("No se pudo autenticar en Odoo")
+        print(f"[INIT] Conectado a Odoo UID: {uid}")
+
+        # ServerProxy no es thread-safe: un proxy por hilo
+        local = threading.local()
+
+        def execute_kw(model, method, args, kw=None):
+            models = getattr(local, 'models', None)
+            if models is None:
+                models = xmlrpc.client.ServerProxy(f'{settings.ODOO_URL}/xmlrpc/2/object')
+                local.models = models
+            return models.execute_kw(settings.ODOO_DB, uid, settings.ODOO_PASSWORD, model, method, args, kw or {})
+
+        # Supabase o warehouse local según WAREHOUSE_BACKEND
+        supabase = create_warehouse_client(
+            settings.WAREHOUSE_BACKEND, settings.SUPABASE_URL, settings.SUPABASE_KEY,
+            settings.WAREHOUSE_SQLITE_PATH
+        )
+        return cls(execute_kw, supabase, **kwargs)
+
+    # -- Helpers de ejecución -------------------------------------------------
+
+    def execute(self, model, method, args, kwargs=None):
+        """
+        Llama a Odoo registrando métricas de RPC.
+
+        Los errores de red (conexión, timeout, HTTP) se reintentan con backoff
+        exponencial; los errores de Odoo (xmlrpc Fault) se propagan.
+        """
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                return self._execute_kw(model, method, args, kwargs or {})
+            except (OSError, xmlrpc.client.ProtocolError) as e:
+                if attempt >= self.rpc_retries:
+                    raise
+                attempt += 1
+                with self._lock:
+                    self._metrics['rpc_retries'] += 1
+                print(f"[ETL] RPC {model}.{method} falló ({e}); reintento {attempt}/{self.rpc_retries}")
+                time.sleep(min(2 ** (attempt - 1), 30))
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self._metrics['rpc_calls'] += 1
+                    self._metrics['rpc_seconds'] += elapsed
+                    self._metrics['rpc_latencies'].append(elapsed)
+
+    def _chunks(self, mapping, ids):
+        size = mapping.chunk_size or self.batch_size
+        return [ids[i:i + size] for i in range(0, len(ids), size)]
+
+    def _read(self, mapping, ids):
+        start = time.perf_counter()
+        records = self.execute(mapping.model, 'read', [ids], {'fields': mapping.read_fields}) or []
+        with self._lock:
+            self._metrics['tables'][mapping.name]['extract_seconds'] += time.perf_counter() - start
+        return records
+
+    def _sync_key(self, mapping):
+        return mapping.sync_key or f'{self._job}.{mapping.name}'
+
+    # -- Carga ------------------------------------------------------------------
+
+    def _ensure(self, mapping, ids, pending='wait'):
+        """
+        Carga los registros referenciados que aún no se cargaron en esta ejecución.
+
+        Args:
+            mapping (TableMapping): Mapeo de los registros
+            ids (iterable): IDs a asegurar
+            pending (str): Qué hacer con los IDs que está cargando otro hilo:
+                'wait' esperar a que termine (referencias de un grafo sin ciclos,
+                ej: cabeceras -> socios); 'skip' no esperar (tablas reunidas: el
+                otro hilo ya las carga); 'load' cargarlos también (referencias
+                dentro de un ciclo, ej: conciliación -> línea -> conciliación,
+                donde esperar podría bloquear a dos hilos entre sí)
+        """
+        mine, events = self._registry.claim(mapping.name, ids)
+        try:
+            for chunk in self._chunks(mapping, sorted(mine)):
+                self._load_batch(mapping, self._read(mapping, chunk))
+        finally:
+            self._registry.release(mapping.name, mine)
+        if pending == 'wait':
+            for event in events:
+                event.wait()
+        elif pending == 'load' and events:
+            others = self._registry.unloaded(mapping.name, ids)
+            for chunk in self._chunks(mapping, sorted(others)):
+                self._load_batch(mapping, self._read(mapping, chunk))
+
+    def _load_batch(self, mapping, records, checkpoint=False):
+        """
+        Transforma y carga un lote completo, en orden de dependencias:
+        referencias (ej: socios -> cabeceras), la tabla y sus tablas puente, y
+        luego las tablas reunidas de este mismo lote (ej: conciliaciones de
+        las líneas). Al volver, el lote está entero en el warehouse.
+        """
+        if not records:
+            return
+        start = time.perf_counter()
+
+        for field, target in mapping.references.items():
+            ids = set()
+            for record in records:
+                ids.update(ids_of(record.get(field)))
+            if ids:
+                cyclic = any(child == mapping.name for child, _ in self._collectors.get(target, []))
+                self._ensure(self._mappings[target], ids, pending='load' if cyclic else 'wait')
+
+        # El cargador omite las filas cuyo hash de contenido no cambió
+        written = self.loader.upsert(mapping.table, [mapping.transform(r) for r in records], mapping.keys)
+        skipped = len(records) - (written if written is not None else len(records))
+        for relation in mapping.relations:
+            rows = [row for record in records for row in relation.rows(record)]
+            if rows:
+                self.loader.upsert(relation.table, rows, relation.keys)
+
+        self._registry.mark_loaded(mapping.name, [r['id'] for r in records])
+        with self._lock:
+            self._loaded[mapping.name].update(r['id'] for r in records)
+            if checkpoint:
+                self._checkpoints[mapping.name].extend(
+                    {'id': r['id'], 'write_date': r.get('write_date')} for r in records
+                )
+            stats = self._metrics['tables'][mapping.name]
+            stats['rows'] += len(records)
+            stats['unchanged'] += skipped
+            stats['batches'] += 1
+            stats['load_seconds'] += time.perf_counter() - start
+
+        for child_name, fields in self._collectors.get(mapping.name, []):
+            ids = set()
+            for record in records:
+                for field in fields:
+                    ids.update(ids_of(record.get(field)))
+            if ids:
+                self._ensure(self._mappings[child_name], ids, pending='skip')
+
+    # -- Ejecución --------------------------------------------------------------
+
+    def _order(self, mappings):
+        """Orden topológico por depends_on / collect_from."""
+        by_name = {m.name: m for m in mappings}
+        ordered, visiting, done = [], set(), set()
+
+        def visit(mapping):
+            if mapping.name in done:
+                return
+            if mapping.name in visiting:
+                raise ValueError(f"Dependencia circular en el mapeo '{mapping.name}'")
+            visiting.add(mapping.name)
+            parents = list(mapping.depends_on)
+            if mapping.collect_from:
+                parents.append(mapping.collect_from[0])
+            for parent in parents:
+                visit(by_name[parent])
+            visiting.discard(mapping.name)
+            done.add(mapping.name)
+            ordered.append(mapping)
+
+        for mapping in mappings:
+            visit(mapping)
+        return ordered
+
+    def _search_ids(self, mapping, limit_date):
+        domain = list(mapping.domain)
+        initial = mapping.initial_domain(limit_date) if mapping.initial_domain else []
+        if mapping.incremental:
+            domain = self.state.changed_domain(self._sync_key(mapping), domain, initial)
+        else:
+            domain += initial
+        kwargs = {'order': mapping.order}
+        if mapping.limit:
+            kwargs['limit'] = mapping.limit
+        return self.execute(mapping.model, 'search', [domain], kwargs) or []
+
+    def _unchanged_since(self, mapping, ids, done):
+        """
+        IDs confirmados por la ejecución reanudada que no cambiaron desde entonces.
+
+        Un registro modificado en Odoo después de confirmarse se vuelve a
+        cargar: si se omitiera, el checkpoint avanzaría dejando atrás el cambio.
+        """
+        candidates = [i for i in ids if i in done['ids']]
+        unchanged = set()
+        for chunk in self._chunks(mapping, candidates):
+            records = self.execute(mapping.model, 'read', [chunk], {'fields': ['id', 'write_date']}) or []
+            for record in records:
+                committed_at = done['write_dates'].get(record['id'])
+                if committed_at and (record.get('write_date') or '') <= committed_at:
+                    unchanged.add(record['id'])
+        changed = len(candidates) - len(unchanged)
+        if changed:
+            print(f"[ETL] {mapping.name}: {changed} registros ya cargados cambiaron en Odoo; se vuelven a cargar")
+        return unchanged
+
+    def _start_pipeline(self, mapping, ids):
+        ready = [self._done[name] for name in mapping.depends_on]
+
+        def extract(chunk):
+            # Omitir los que ya cargó otro lote como referencia (ej: contrapartidas
+            # de conciliaciones cargadas antes de llegar a su propio lote)
+            with self._lock:
+                chunk = [i for i in chunk if i not in self._loaded[mapping.name]]
+            return self._read(mapping, chunk) if chunk else []
+
+        def load(records):
+            for event in ready:
+                event.wait()
+            if self._failed.is_set():
+                return
+            self._load_batch(mapping, records, checkpoint=mapping.incremental)
+            self.progress.commit(self._run_id, self._job, mapping.name, records)
+
+        pipeline = StagedPipeline(mapping.name, extract, load, **self.stage_options)
+        return pipeline.start(self._chunks(mapping, ids))
+
+    def prepare(self, job, mappings):
+        """Inicializa el estado de una ejecución (registro de cargados, métricas)."""
+        self._job = job
+        self._run_id = None
+        self._mappings = {m.name: m for m in mappings}
+        self._registry = DimensionRegistry()
+        self._loaded = {m.name: set() for m in mappings}
+        self._checkpoints = {m.name: [] for m in mappings}
+        self._done = {m.name: threading.Event() for m in mappings}
+        self._failed = threading.Event()
+        self._collectors = {}
+        for m in mappings:
+            if m.source == 'collect':
+                self._collectors.setdefault(m.collect_from[0], []).append((m.name, m.collect_from[1]))
+        self._metrics = {
+            'job': job,
+            'started_at': datetime.now().astimezone().isoformat(),
+            'status': 'running',
+            'rpc_calls': 0,
+            'rpc_seconds': 0.0,
+            'rpc_latencies': [],
+            'rpc_retries': 0,
+            'tables': {
+                m.name: {
+                    'table': m.table, 'rows': 0, 'unchanged': 0, 'resumed': 0, 'batches': 0, 'bytes': 0,
+                    'extract_seconds': 0.0, 'load_seconds': 0.0, 'wall_seconds': 0.0,
+                    'watermark_lag_seconds': None,
+                }
+                for m in mappings
+            },
+        }
+        self._bytes_baseline = dict(getattr(self.loader, 'bytes_sent', {}))
+        return self
+
+    def _collect_bytes(self):
+        """Bytes enviados al warehouse por tabla (incluye sus tablas puente)."""
+        sent = getattr(self.loader, 'bytes_sent', {})
+        for mapping in self._mappings.values():
+            tables = [mapping.table] + [r.table for r in mapping.relations]
+            self._metrics['tables'][mapping.name]['bytes'] = sum(
+                sent.get(t, 0) - self._bytes_baseline.get(t, 0) for t in tables
+            )
+
+    def load_ids(self, mapping_name, ids, on_batch=None):
+        """
+        Carga IDs de un mapeo por lotes, en orden y de forma secuencial.
+
+        Cada lote se carga completo (referencias, tabla, relaciones y tablas
+        reunidas de él, ej: conciliaciones de las líneas) antes de avisar a
+        `on_batch(último_id, filas)`, así el llamador puede guardar su avance.
+        Requiere `prepare`.
+        """
+        mapping = self._mappings[mapping_name]
+        for chunk in self._chunks(mapping, sorted(ids)):
+            records = self._read(mapping, chunk)
+            self._load_batch(mapping, records)
+            if on_batch:
+                on_batch(chunk[-1], len(records))
+        return self._metrics
+
+    def run(self, job, mappings, days_back=30):
+        """
+        Ejecuta un trabajo ETL.
+
+        Args:
+            job (str): Nombre del trabajo (prefijo de checkpoints y logs)
+            mappings (list): TableMapping del trabajo
+            days_back (int): Ventana de la primera carga (sin checkpoint)
+
+        Returns:
+            dict: Métricas de la ejecución
+        """
+        started = time.perf_counter()
+        self.prepare(job, mappings)
+        # Lotes ya confirmados por una ejecución anterior que no terminó
+        self._run_id, committed = self.progress.resume(job)
+
+        print("=" * 50)
+        print(f"[ETL] Trabajo '{job}' ({len(mappings)} mapeos)")
+        print("=" * 50)
+
+        ordered = self._order(mappings)
+        limit_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
+
+        # Los mapeos por búsqueda arrancan todos a la vez: la extracción se
+        # solapa con la carga de sus dependencias (que esperan en `load`).
+        pipelines = {}
+        try:
+            for mapping in ordered:
+                if mapping.source == 'search':
+                    ids = self._search_ids(mapping, limit_date)
+                    done = committed.get(mapping.name)
+                    if done:
+                        before = len(ids)
+                        skipped = self._unchanged_since(mapping, ids, done)
+                        ids = [i for i in ids if i not in skipped]
+                        self._checkpoints[mapping.name].extend(done['checkpoints'])
+                        self._registry.mark_loaded(mapping.name, skipped)
+                        self._loaded[mapping.name].update(skipped)
+                        self._metrics['tables'][mapping.name]['resumed'] = before - len(ids)
+                    print(f"[ETL] {mapping.name}: {len(ids)} registros a sincronizar")
+                    pipelines[mapping.name] = self._start_pipeline(mapping, ids)
+
+            for mapping in ordered:
+                table_start = time.perf_counter()
+                # Las tablas reunidas se cargan junto con cada lote de su origen
+                if mapping.source == 'search':
+                    pipelines.pop(mapping.name).join()
+                self._done[mapping.name].set()
+                self._metrics['tables'][mapping.name]['wall_seconds'] = time.perf_counter() - table_start
+                if mapping.source != 'reference' or self._loaded[mapping.name]:
+                    stats = self._metrics['tables'][mapping.name]
+                    unchanged = f" ({stats['unchanged']} sin cambios)" if stats['unchanged'] else ''
+                    resumed = f" ({stats['resumed']} ya cargados antes)" if stats['resumed'] else ''
+                    print(f"[{mapping.name.upper()}] ✓ {stats['rows']} registros -> {mapping.table}{unchanged}{resumed}")
+        except Exception as e:
+            # Detener el resto de etapas; las que esperan dependencias se liberan sin cargar
+            self._failed.set()
+            for pipeline in pipelines.values():
+                pipeline.abort(e)
+            for event in self._done.values():
+                event.set()
+            self._finish(started, status='failed', error=str(e))
+            raise
+
+        # Los checkpoints avanzan cuando todo el trabajo quedó cargado: si una
+        # tabla dependiente falla (ej: conciliaciones reunidas de las líneas),
+        # la próxima ejecución vuelve a traer los mismos registros.
+        for mapping in ordered:
+            if mapping.incremental:
+                sync_key = self._sync_key(mapping)
+                self.state.advance(sync_key, mapping.model, self._checkpoints[mapping.name])
+                checkpoint = self.state.get(sync_key)
+                self._metrics['tables'][mapping.name]['watermark_lag_seconds'] = lag_seconds(
+                    checkpoint.get('last_write_date') if checkpoint else None
+                )
+        self.progress.finish(self._run_id)
+
+        self._finish(started, status='success')
+        print(f"[ETL] '{job}' completado en {self._metrics['wall_seconds']:.1f}s "
+              f"({self._metrics['rpc_calls']} RPCs a Odoo, {self._metrics['rpc_seconds']:.1f}s, "
+              f"{self._metrics['rpc_retries']} reintentos)")
+        return self._metrics
+
+    def _finish(self, started, status, error=None):
+        """Cierra las métricas de la ejecución y las registra en etl_runs."""
+        self._metrics['wall_seconds'] = time.perf_counter() - started
+        self._metrics['status'] = status
+        self._metrics['error'] = error
+        self._collect_bytes()
+        for mapping in self._mappings.values():
+            if mapping.source == 'reference':
+                # Las dimensiones se cargan dentro de otras etapas: su tiempo es el de sus lotes
+                stats = self._metrics['tables'][mapping.name]
+                stats['wall_seconds'] = stats['extract_seconds'] + stats['load_seconds']
+        self.recorder.record(self._metrics)
@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+"""
+Definiciones declarativas de los trabajos ETL (Odoo -> warehouse).
+
+Cada trabajo es una lista de TableMapping que ejecuta `ETLEngine`:
+    - 'sync':    Facturas/NC y Letras con su relación (supabase_schema.sql)
+    - 'netted':  Cabeceras, líneas 12/42/43/67/77 y conciliaciones parciales
+                 para reportes neteados (supabase_schema_netted.sql)
+    - 'full':    Facturas, Planillas y sus Letras (supabase_schema_full.sql)
+"""
+
+try:
+    from scripts.etl.engine import ETLEngine, TableMapping, Relation, m2o_id, m2o_name, clean, text, now_iso
+except ImportError:  # Ejecución directa desde scripts/etl
+    from engine import ETLEngine, TableMapping, Relation, m2o_id, m2o_name, clean, text, now_iso
+
+
+INVOICE_TYPES = ['out_invoice', 'out_refund', 'in_invoice', 'in_refund']
+NETTED_MOVE_TYPES = INVOICE_TYPES + ['entry']
+
+
+def partners_mapping():
+    """Dimensión de socios: se carga bajo demanda cuando otra tabla la referencia."""
+    return TableMapping(
+        'partners', 'res.partner', 'dim_partners',
+        source='reference',
+        chunk_size=100,
+        fields={
+            'id': 'id',
+            'name': 'name',
+            'vat': ('vat', clean),
+            'state_name': ('state_id', m2o_name),
+            'is_company': 'is_company',
+            'email': ('email', text),
+            'phone': ('phone', text),
+            'supplier_rank': 'supplier_rank',
+            'customer_rank': 'customer_rank',
+            'last_updated_at': now_iso,
+        },
+    )
+
+
+def _move_fields(**extra):
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'ref': ('ref', clean),
+        'date': ('date', clean),
+        'invoice_date': ('invoice_date', clean),
+        'invoice_date_due': ('invoice_date_due', clean),
+        'state': 'state',
+        'move_type': 'move_type',
+        'payment_state': ('payment_state', clean),
+        'currency_id': ('currency_id', m2o_id),
+        'amount_total': 'amount_total',
+        'amount_residual': 'amount_residual',
+        'partner_id': ('partner_id', m2o_id),
+    }
+    fields.update(extra)
+    fields['last_updated_at'] = now_iso
+    return fields
+
+
+def _letter_fields(**extra):
+    fields = {
+        'id': 'id',
+        'name': 'name',
+        'boe_number': ('l10n_latam_boe_number', clean),
+        'state': 'state',
+        'date': ('date', clean),
+        'due_date': ('invoice_date_due', clean),
+        'amount_total': 'amount_total',
+        'partner_id': ('partner_id', m2o_id),
+        'move_type': 'move_type',
+    }
+    fields.update(extra)
+    fields['last_updated_at'] = now_iso
+    return fields
+
+
+def sync_job():
+    """Facturas, Notas de Crédito y Letras (ex etl_sync_threading)."""
+    return [
+        partners_mapping(),
+        TableMapping(
+            'moves', 'account.move', 'fact_moves',
+            sync_key='threading.account.move',
+            domain=[
+                ('state', 'in', ['posted', 'draft']),
+                ('move_type', 'in', INVOICE_TYPES)
+            ],
+            references={'partner_id': 'partners'},
+            fields=_move_fields(
+                amount_untaxed='amount_untaxed',
+                reversed_entry_id=('reversed_entry_id', m2o_id),
+            ),
+        ),
+        TableMapping(
+            'letters', 'account.move', 'fact_letters',
+            sync_key='threading.letters',
+            domain=[('l10n_latam_boe_number', '!=', False)],
+            depends_on=('moves',),
+            references={'partner_id': 'partners', 'bill_form_invoices': 'moves'},
+            relations=(
+                Relation('rel_letter_moves', ('letter_id', 'move_id'), 'bill_form_invoices',
+                         lambda letter, move_id: {'letter_id': letter['id'], 'move_id': move_id}),
+            ),
+            fields=_letter_fields(),
+        ),
+    ]
+
+
+def netted_job():
+    """Cabeceras, líneas y conciliaciones para reportes neteados (ex etl_netted_sync)."""
+    return [
+        partners_mapping(),
+        TableMapping(
+            'moves', 'account.move', 'fact_moves',
+            sync_key='netted.account.move',
+            domain=[('move_type', 'in', NETTED_MOVE_TYPES)],
+            initial_domain=lambda limit_date: [('date', '>=', limit_date)],
+            references={'partner_id': 'partners'},
+            fields=_move_fields(),
+        ),
+        TableMapping(
+            'lines', 'account.move.line', 'fact_move_lines',
+            sync_key='netted.account.move.line',
+            domain=[
+                ('move_id.move_type', 'in', NETTED_MOVE_TYPES),
+                '|', '|', '|', '|',
+                ('account_id.code', '=like', '12%'),
+                ('account_id.code', '=like', '42%'),
+                ('account_id.code', '=like', '43%'),
+                ('account_id.code', '=like', '67%'),
+                ('account_id.code', '=like', '77%')
+            ],
+            initial_domain=lambda limit_date: [('date', '>=', limit_date)],
+            depends_on=('moves',),
+            references={'move_id': 'moves', 'partner_id': 'partners'},
+            extra_read_fields=('matched_debit_ids', 'matched_credit_ids'),
+            fields={
+                'id': 'id',
+                'move_id': ('move_id', m2o_id),
+                'partner_id': ('partner_id', m2o_id),
+                'account_id': ('account_id', m2o_id),
+                'account_code': lambda l: l['account_id'][1].split(' ')[0] if isinstance(l.get('account_id'), list) else None,
+                'name': ('name', clean),
+                'date': ('date', clean),
+                'date_maturity': ('date_maturity', clean),
+                'debit': 'debit',
+                'credit': 'credit',
+                'balance': 'balance',
+                'amount_residual': 'amount_residual',
+                'amount_currency': 'amount_currency',
+                'currency_id': ('currency_id', m2o_id),
+                'reconciled': 'reconciled',
+                'full_reconcile_id': ('full_reconcile_id', m2o_id),
+                'last_updated_at': now_iso,
+            },
+        ),
+        # Una conciliación nueva modifica sus líneas: se reúnen desde las líneas cargadas
+        TableMapping(
+            'partials', 'account.partial.reconcile', 'fact_partial_reconciles',
+            source='collect',
+            collect_from=('lines', ['matched_debit_ids', 'matched_credit_ids']),
+            # La contrapartida puede estar fuera de la ventana de líneas
+            references={'debit_move_id': 'lines', 'credit_move_id': 'lines'},
+            fields={
+                'id': 'id',
+                'debit_move_line_id': ('debit_move_id', m2o_id),
+                'credit_move_line_id': ('credit_move_id', m2o_id),
+                'amount': 'amount',
+                'amount_currency': 'amount_currency',
+                'currency_id': ('currency_id', m2o_id),
+                'max_date': ('max_date', clean),
+                'last_updated_at': now_iso,
+            },
+        ),
+    ]
+
+
+def full_job():
+    """Facturas -> Planillas -> Letras (ex etl_full_sync)."""
+    return [
+        partners_mapping(),
+        TableMapping(
+            'moves', 'account.move', 'fact_moves',
+            domain=[('move_type', 'in', INVOICE_TYPES)],
+            # El esquema completo no tiene etl_sync_state: ventana de los más recientes
+            incremental=False, limit=2000, order='invoice_date desc',
+            references={'partner_id': 'partners'},
+            fields=_move_fields(invoice_origin=('invoice_origin', clean)),
+        ),
+        TableMapping(
+            'bill_forms', 'account.bill.form', 'fact_bill_forms',
+            incremental=False, limit=500, order='id desc',
+            depends_on=('moves',),
+            references={'partner_id': 'partners', 'invoice_ids': 'moves'},
+            relations=(
+                Relation('rel_bill_form_invoices', ('bill_form_id', 'move_id'), 'invoice_ids',
+                         lambda bf, move_id: {'bill_form_id': bf['id'], 'move_id': move_id}),
+            ),
+            extra_read_fields=('move_ids',),
+            fields={
+                'id': 'id',
+                'name': 'name',
+                'state': 'state',
+                'amount_total': 'amount_total',
+                'partner_id': ('partner_id', m2o_id),
+                'last_updated_at': now_iso,
+            },
+        ),
+        # Letras generadas por las planillas cargadas
+        TableMapping(
+            'letters', 'account.move', 'fact_letters',
+            source='collect',
+            collect_from=('bill_forms', ['move_ids']),
+            references={'partner_id': 'partners', 'bill_form_id': 'bill_forms'},
+            fields=_letter_fields(bill_form_id=('bill_form_id', m2o_id)),
+        ),
+    ]
+
+
+JOBS = {
+    'sync': sync_job,
+    'netted': netted_job,
+    'full': full_job,
+}
+
+
+def run_job(job, days_back=30, **engine_options):
+    """
+    Ejecuta un trabajo ETL con las credenciales del entorno.
+
+    Args:
+        job (str): 'sync', 'netted' o 'full'
+        days_back (int): Ventana de la primera carga (sin checkpoint)
+        **engine_options: batch_size, extract_workers, load_workers, queue_size
+
+    Returns:
+        dict: Métricas de la ejecución
+    """
+    if job not in JOBS:
+        raise ValueError(f"Trabajo ETL desconocido: {job}")
+    return ETLEngine.from_env(**engine_options).run(job, JOBS[job](), days_back=days_back)
@@ -0,0 +1,156 @@
+# -*- coding: utf-8 -*-
+"""
+Pipeline por etapas para el ETL (extract -> transform/load).
+
+Cada etapa tiene su propio pool de hilos. Los extractores leen bloques de
+Odoo y los dejan en una cola acotada; los cargadores los transforman y los
+suben a Supabase mientras los extractores ya piden el siguiente bloque. Si la
+carga es más lenta, la cola se llena y los extractores se bloquean
+(backpressure), así la memoria queda acotada a `queue_size` bloques.
+"""
+
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class StagedPipeline:
+    """
+    Pipeline de dos etapas con colas acotadas.
+
+    Uso:
+        pipeline = StagedPipeline('lines', extract=leer_bloque, load=subir_bloque)
+        pipeline.start(bloques_de_ids)
+        ...
+        stats = pipeline.join()
+    """
+
+    def __init__(self, name, extract, load, extract_workers=2, load_workers=2, queue_size=4):
+        """
+        Args:
+            name (str): Nombre para logs
+            extract (callable): Recibe una tarea y retorna un lote (o None para omitir)
+            load (callable): Recibe un lote y lo transforma/carga
+            extract_workers (int): Hilos de extracción concurrentes
+            load_workers (int): Hilos de carga concurrentes
+            queue_size (int): Lotes en espera entre etapas (backpressure)
+        """
+        self.name = name
+        self.extract = extract
+        self.load = load
+        self.extract_workers = max(1, extract_workers)
+        self.load_workers = max(1, load_workers)
+        self.tasks = queue.Queue()
+        self.batches = queue.Queue(maxsize=max(1, queue_size))
+        self.error = None
+        self.stats = {'batches': 0, 'extract_seconds': 0.0, 'load_seconds': 0.0}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._extractors = []
+        self._loaders = []
+        self._started_at = None
+
+    def _fail(self, exc):
+        with self._lock:
+            if self.error is None:
+                self.error = exc
+                print(f"[PIPELINE] {self.name}: error, deteniendo etapas: {exc}")
+        self._stop.set()
+
+    def abort(self, exc):
+        """Detiene el pipeline desde afuera (ej: falló una etapa de la que depende)."""
+        self._fail(exc)
+
+    def _put(self, batch):
+        """Encola un lote respetando la cola acotada sin bloquear si hay error."""
+        while not self._stop.is_set():
+            try:
+                self.batches.put(batch, timeout=0.5)
+                return
+            except queue.Full:
+                continue
+
+    def _extract_worker(self):
+        while not self._stop.is_set():
+            try:
+                task = self.tasks.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                start = time.perf_counter()
+                batch = self.extract(task)
+                with self._lock:
+                    self.stats['extract_seconds'] += time.perf_counter() - start
+                if batch:
+                    self._put(batch)
+            except Exception as e:
+                self._fail(e)
+                return
+
+    def _load_worker(self):
+        while True:
+            try:
+                batch = self.batches.get(timeout=0.5)
+            except queue.Empty:
+                if self._stop.is_set():
+                    return
+                continue
+            if batch is _DONE:
+                return
+            if self._stop.is_set():
+                continue  # Drenar la cola para liberar a los extractores
+            try:
+                start = time.perf_counter()
+                self.load(batch)
+                with self._lock:
+                    self.stats['load_seconds'] += time.perf_counter() - start
+                    self.stats['batches'] += 1
+            except Exception as e:
+                self._fail(e)
+
+    def start(self, tasks):
+        """Encola las tareas y arranca los hilos de ambas etapas."""
+        self._started_at = time.perf_counter()
+        for task in tasks:
+            self.tasks.put(task)
+        self._extractors = [
+            threading.Thread(target=self._extract_worker, name=f'{self.name}-extract-{i}', daemon=True)
+            for i in range(self.extract_workers)
+        ]
+        self._loaders = [
+            threading.Thread(target=self._load_worker, name=f'{self.name}-load-{i}', daemon=True)
+            for i in range(self.load_workers)
+        ]
+        for thread in self._extractors + self._loaders:
+            thread.start()
+        return self
+
+    def join(self):
+        """
+        Espera el fin del pipeline.
+
+        Returns:
+            dict: Estadísticas (lotes, segundos de extracción/carga acumulados, total)
+
+        Raises:
+            Exception: El primer error ocurrido en cualquier etapa
+        """
+        for thread in self._extractors:
+            thread.join()
+        for _ in self._loaders:
+            self._put(_DONE)
+        for thread in self._loaders:
+            thread.join()
+
+        self.stats['wall_seconds'] = time.perf_counter() - (self._started_at or time.perf_counter())
+        if self.error is not None:
+            raise self.error
+        print(f"[PIPELINE] {self.name}: {self.stats['batches']} lotes en {self.stats['wall_seconds']:.1f}s "
+              f"(extract {self.stats['extract_seconds']:.1f}s, load {self.stats['load_seconds']:.1f}s)")
+        return self.stats
+
+    def run(self, tasks):
+        """Ejecuta el pipeline completo de forma bloqueante."""
+        return self.start(tasks).join()
@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+"""
+Avance por lote de una ejecución ETL (reanudación tras una caída).
+
+Cada lote confirmado en el warehouse (con sus referencias y tablas reunidas)
+se registra en `etl_batch_progress` junto con sus IDs, el `write_date` cargado
+de cada uno y su mayor (`write_date`, `id`). Si la ejecución muere, la
+siguiente del mismo trabajo reutiliza ese registro: vuelve a buscar con el
+mismo checkpoint (que no avanzó) y omite los IDs ya confirmados cuyo
+write_date en Odoo no cambió desde entonces (los modificados se vuelven a
+cargar), y suma sus write_date al checkpoint final. El costo de recuperación
+es el del lote que falló, no el de toda la ventana.
+
+Solo se reanuda la ejecución inconclusa más reciente; el avance de ejecuciones
+anteriores abandonadas se descarta. Al terminar con éxito, el avance de la
+ejecución se borra.
+"""
+
+import uuid
+from datetime import datetime
+
+PROGRESS_TABLE = 'etl_batch_progress'
+
+
+def _normalize(write_date):
+    """write_date del warehouse ('2026-01-05T10:00:00') al formato de Odoo."""
+    return str(write_date).replace('T', ' ')[:19] if write_date else None
+
+
+class BatchProgressStore:
+    """Lectura y escritura del avance por lote en el warehouse."""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+        self.enabled = True
+
+    def _disable(self, action, e):
+        print(f"[PROGRESS] No se pudo {action} (¿falta la tabla {PROGRESS_TABLE}?): {e}; sin reanudación")
+        self.enabled = False
+
+    def resume(self, job):
+        """
+        Busca la última ejecución inconclusa del trabajo.
+
+        Returns:
+            tuple: (run_id, {mapeo: {'ids': set, 'write_dates': {id: write_date},
+                   'checkpoints': [{'id', 'write_date'}]}})
+                   con un run_id nuevo y dict vacío si no hay nada que reanudar
+        """
+        committed = {}
+        if not self.enabled:
+            return uuid.uuid4().hex, committed
+        try:
+            rows = (self.supabase.table(PROGRESS_TABLE)
+                    .select('run_id,mapping,ids,write_dates,max_write_date,max_write_id,committed_at')
+                    .eq('job', job).execute().data or [])
+        except Exception as e:
+            self._disable('leer el avance', e)
+            return uuid.uuid4().hex, committed
+        if not rows:
+            return uuid.uuid4().hex, committed
+
+        # Varias ejecuciones inconclusas: reanudar la del último lote confirmado
+        runs = {}
+        for row in rows:
+            runs.setdefault(row['run_id'], []).append(row)
+        run_id = max(runs, key=lambda r: max(str(row.get('committed_at') or '') for row in runs[r]))
+        stale = [r for r in runs if r != run_id]
+        if stale:
+            print(f"[PROGRESS] '{job}': descartando {len(stale)} ejecuciones inconclusas anteriores")
+            for old_run in stale:
+                self.finish(old_run)
+        rows = runs[run_id]
+
+        for row in rows:
+            entry = committed.setdefault(row['mapping'], {'ids': set(), 'write_dates': {}, 'checkpoints': []})
+            entry['ids'].update(row.get('ids') or [])
+            for record_id, write_date in (row.get('write_dates') or {}).items():
+                entry['write_dates'][int(record_id)] = _normalize(write_date)
+            if row.get('max_write_date'):
+                entry['checkpoints'].append({
+                    'id': row.get('max_write_id') or 0,
+                    'write_date': _normalize(row['max_write_date']),
+                })
+        total = sum(len(e['ids']) for e in committed.values())
+        print(f"[PROGRESS] '{job}': reanudando ejecución {run_id} ({len(rows)} lotes, {total} registros ya cargados)")
+        return run_id, committed
+
+    def commit(self, run_id, job, mapping_name, records):
+        """Registra un lote ya cargado en el warehouse."""
+        if not self.enabled or not records:
+            return
+        ids = sorted(r['id'] for r in records)
+        latest = max(
+            ((r['write_date'], r['id']) for r in records if r.get('write_date')),
+            default=(None, None)
+        )
+        try:
+            self.supabase.table(PROGRESS_TABLE).upsert({
+                'run_id': run_id,
+                'job': job,
+                'mapping': mapping_name,
+                'batch_key': f'{ids[0]}-{ids[-1]}',
+                'ids': ids,
+                'write_dates': {str(r['id']): r['write_date'] for r in records if r.get('write_date')},
+                'max_write_date': latest[0],
+                'max_write_id': latest[1],
+                'committed_at': datetime.now().astimezone().isoformat(),
+            }).execute()
+        except Exception as e:
+            self._disable('guardar el avance', e)
+
+    def finish(self, run_id):
+        """Borra el avance de una ejecución terminada con éxito."""
+        if not self.enabled:
+            return
+        try:
+            self.supabase.table(PROGRESS_TABLE).delete().eq('run_id', run_id).execute()
+        except Exception as e:
+            self._disable('limpiar el avance', e)
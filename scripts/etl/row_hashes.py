@@ -0,0 +1,132 @@
+# -*- coding: utf-8 -*-
+"""
+Detección de cambios por hash de contenido para el ETL.
+
+Cada fila que se escribe en el warehouse lleva en `row_hash` el hash de sus
+columnas de negocio (sin `last_updated_at`). Antes de un upsert, el cargador
+compara el hash de cada fila con el último conocido y solo envía las que
+cambiaron: así el volumen de escritura (WAL, bloat, invalidación de vistas)
+depende de los cambios reales y no del tamaño de la ventana sincronizada.
+
+Los hashes conocidos se guardan en un cache local SQLite (stdlib). Las claves
+que no están en el cache, o cuya entrada venció (ETL_HASH_CACHE_TTL_HOURS), se
+consultan al warehouse en una sola lectura por lote antes de decidir.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+# Columnas que cambian en cada carga sin que cambie el dato de negocio
+VOLATILE_COLUMNS = ('last_updated_at', 'row_hash')
+
+# Tablas con columna row_hash (ver supabase_schema*.sql)
+HASHED_TABLES = {
+    'dim_partners',
+    'fact_moves',
+    'fact_move_lines',
+    'fact_partial_reconciles',
+    'fact_letters',
+    'fact_bill_forms',
+}
+
+DEFAULT_CACHE_PATH = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), '..', '..', 'data', 'etl', 'row_hashes.sqlite')
+)
+
+
+def row_hash(row, exclude=VOLATILE_COLUMNS):
+    """Hash estable del contenido de negocio de una fila."""
+    payload = {k: v for k, v in row.items() if k not in exclude}
+    encoded = json.dumps(payload, sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.md5(encoded.encode('utf-8')).hexdigest()
+
+
+class RowHashCache:
+    """
+    Cache local de hashes por (warehouse, tabla, id).
+
+    Una sola conexión SQLite compartida entre hilos y protegida por un lock;
+    las operaciones son lecturas/escrituras cortas por lote.
+    """
+
+    def __init__(self, path=None, ttl_hours=None):
+        """
+        Args:
+            path (str, optional): Archivo SQLite. Por defecto ETL_HASH_CACHE o
+                data/etl/row_hashes.sqlite. ':memory:' para un cache de proceso.
+            ttl_hours (float, optional): Vigencia de una entrada antes de volver
+                a verificarla contra el warehouse. Por defecto ETL_HASH_CACHE_TTL_HOURS o 24.
+        """
+        path = path or os.getenv('ETL_HASH_CACHE') or DEFAULT_CACHE_PATH
+        if ttl_hours is None:
+            ttl_hours = float(os.getenv('ETL_HASH_CACHE_TTL_HOURS', '24'))
+        self.ttl_seconds = ttl_hours * 3600
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS row_hashes ("
+                " target TEXT NOT NULL, tbl TEXT NOT NULL, key INTEGER NOT NULL,"
+                " hash TEXT NOT NULL, seen_at REAL NOT NULL,"
+                " PRIMARY KEY (target, tbl, key)) WITHOUT ROWID"
+            )
+            self._conn.commit()
+
+    def get_many(self, target, table, keys):
+        """
+        Returns:
+            dict: {id: hash} de las entradas vigentes
+        """
+        if not keys:
+            return {}
+        min_seen = time.time() - self.ttl_seconds
+        result = {}
+        keys = list(keys)
+        with self._lock:
+            for i in range(0, len(keys), 500):  # Límite de parámetros de SQLite
+                chunk = keys[i:i + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = self._conn.execute(
+                    f"SELECT key, hash FROM row_hashes WHERE target = ? AND tbl = ? "
+                    f"AND seen_at >= ? AND key IN ({placeholders})",
+                    [target, table, min_seen] + chunk
+                ).fetchall()
+                result.update(rows)
+        return result
+
+    def put_many(self, target, table, hashes):
+        """Guarda {id: hash} como vistos ahora."""
+        if not hashes:
+            return
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO row_hashes (target, tbl, key, hash, seen_at) VALUES (?, ?, ?, ?, ?)",
+                [(target, table, key, digest, now) for key, digest in hashes.items()]
+            )
+            self._conn.commit()
+
+    def delete_many(self, target, table, keys):
+        """Olvida claves puntuales (ej: filas que faltan en el warehouse)."""
+        keys = list(keys)
+        with self._lock:
+            self._conn.executemany(
+                "DELETE FROM row_hashes WHERE target = ? AND tbl = ? AND key = ?",
+                [(target, table, key) for key in keys]
+            )
+            self._conn.commit()
+
+    def clear(self, target=None):
+        """Olvida los hashes (de un warehouse o de todos)."""
+        with self._lock:
+            if target is None:
+                self._conn.execute("DELETE FROM row_hashes")
+            else:
+                self._conn.execute("DELETE FROM row_hashes WHERE target = ?", (target,))
+            self._conn.commit()
@@ -0,0 +1,68 @@
+# -*- coding: utf-8 -*-
+"""
+Configuración compartida del ETL (variables de entorno y parámetros).
+
+Centraliza la carga de archivos .env que antes duplicaba cada script.
+Producción tiene prioridad sobre desarrollo: un valor ya cargado no se pisa.
+"""
+
+import os
+from dotenv import load_dotenv
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+
+def load_env():
+    possible_paths = [
+        # Archivos separados por servicio
+        os.path.join(os.getcwd(), '.env.supabase.produccion'),
+        os.path.join(os.getcwd(), '.env.produccion'),
+        os.path.join(ROOT_DIR, '.env.supabase.produccion'),
+        os.path.join(ROOT_DIR, '.env.produccion'),
+        # Desarrollo
+        os.path.join(os.getcwd(), '.env.supabase.desarrollo'),
+        os.path.join(os.getcwd(), '.env.desarrollo'),
+        os.path.join(ROOT_DIR, '.env.supabase.desarrollo'),
+        os.path.join(ROOT_DIR, '.env.desarrollo'),
+    ]
+    loaded = set()
+    for path in possible_paths:
+        if path not in loaded and os.path.exists(path):
+            load_dotenv(path, override=False)
+            loaded.add(path)
+            print(f"[ENV] Cargado: {path}")
+    return bool(loaded)
+
+
+def get_env_clean(key, default=''):
+    """Lee una variable de entorno quitando comillas."""
+    value = os.getenv(key, default)
+    return value.replace('"', '').replace("'", "") if value else value
+
+
+load_env()
+
+ODOO_URL = get_env_clean('ODOO_URL')
+ODOO_DB = get_env_clean('ODOO_DB')
+ODOO_USER = get_env_clean('ODOO_USER')
+ODOO_PASSWORD = get_env_clean('ODOO_PASSWORD')
+
+SUPABASE_URL = get_env_clean('SUPABASE_URL')
+SUPABASE_KEY = get_env_clean('SUPABASE_KEY')
+SUPABASE_DB_URI = get_env_clean('SUPABASE_DB_URI')
+
+# Destino del warehouse: 'supabase' o 'sqlite' (archivo local, ver warehouse.py)
+WAREHOUSE_BACKEND = get_env_clean('WAREHOUSE_BACKEND', 'supabase')
+WAREHOUSE_SQLITE_PATH = get_env_clean('WAREHOUSE_SQLITE_PATH')
+
+# Pipeline extract -> load
+ETL_BATCH_SIZE = int(os.getenv('ETL_BATCH_SIZE', '500'))
+ETL_EXTRACT_WORKERS = int(os.getenv('ETL_EXTRACT_WORKERS', '3'))
+ETL_LOAD_WORKERS = int(os.getenv('ETL_LOAD_WORKERS', '2'))
+ETL_QUEUE_SIZE = int(os.getenv('ETL_QUEUE_SIZE', '4'))
+
+# Reintentos de RPC a Odoo ante errores de red (backoff exponencial)
+ETL_RPC_RETRIES = int(os.getenv('ETL_RPC_RETRIES', '3'))
+
+# Backfill histórico por shards (rangos de ID)
+ETL_BACKFILL_SHARDS = int(os.getenv('ETL_BACKFILL_SHARDS', str(os.cpu_count() or 4)))
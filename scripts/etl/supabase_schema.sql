@@ -15,6 +15,7 @@ CREATE TABLE IF NOT EXISTS dim_partners (
     phone TEXT,
     supplier_rank INTEGER DEFAULT 0,
     customer_rank INTEGER DEFAULT 0,
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -42,6 +43,7 @@ CREATE TABLE IF NOT EXISTS fact_moves (
     reversed_entry_id INTEGER, -- ID de la factura original (si es Nota de Crédito)
     
     -- Metadatos
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -56,6 +58,7 @@ CREATE TABLE IF NOT EXISTS fact_letters (
     amount_total NUMERIC(15,2),
     partner_id BIGINT REFERENCES dim_partners(id),
     move_type TEXT, -- in_bill (generalmente para letras)
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -67,6 +70,79 @@ CREATE TABLE IF NOT EXISTS rel_letter_moves (
     PRIMARY KEY (letter_id, move_id)
 );
 
+-- 5. TABLA DE CONTROL ETL (Checkpoints de sincronización incremental)
+-- Guarda el mayor (write_date, id) cargado por modelo; write_date en UTC (Odoo)
+CREATE TABLE IF NOT EXISTS etl_sync_state (
+    sync_key TEXT PRIMARY KEY, -- Ej: netted.account.move, threading.letters
+    model TEXT,
+    last_write_date TIMESTAMP WITHOUT TIME ZONE,
+    last_id BIGINT,
+    rows_synced INTEGER DEFAULT 0,
+    last_run_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 6. SHARDS DE BACKFILL (Carga histórica paralela por rangos de ID)
+-- Cada shard guarda su propio avance (last_id) para reanudarse de forma independiente
+CREATE TABLE IF NOT EXISTS etl_backfill_shards (
+    backfill_key TEXT, -- Ej: netted.lines
+    shard INTEGER,
+    id_from BIGINT, -- Inclusivo
+    id_to BIGINT, -- Exclusivo
+    last_id BIGINT, -- Último ID cargado (checkpoint del shard)
+    rows_loaded INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'pending', -- pending, running, done, reconciled
+    planned_write_date TIMESTAMP WITHOUT TIME ZONE, -- Inicio del backfill (UTC, watermark incremental)
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (backfill_key, shard)
+);
+
+-- 7. TELEMETRÍA ETL (Una fila por ejecución; detalle por etapa en `stages`)
+CREATE TABLE IF NOT EXISTS etl_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job TEXT, -- sync, netted, full
+    status TEXT, -- success, failed
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    wall_seconds NUMERIC(12,3),
+    rows_loaded INTEGER,
+    rows_written INTEGER, -- Filas con cambios realmente escritas
+    rows_per_second NUMERIC(12,2),
+    bytes_loaded BIGINT,
+    rpc_calls INTEGER,
+    rpc_seconds NUMERIC(12,3),
+    rpc_p95_ms NUMERIC(12,1),
+    rpc_retries INTEGER,
+    watermark_lag_seconds INTEGER, -- Mayor lag entre los checkpoints del trabajo
+    error TEXT,
+    stages JSONB -- {tabla: filas, filas/s, bytes, extract/load s, cuello de botella, lag}
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_runs_job_started ON etl_runs (job, started_at DESC);
+
+-- 8. AVANCE POR LOTE (Reanudación de una ejecución que falló a mitad de camino)
+-- Un registro por lote confirmado; se borra cuando la ejecución termina con éxito
+CREATE TABLE IF NOT EXISTS etl_batch_progress (
+    run_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    mapping TEXT NOT NULL, -- partners, moves, lines, ...
+    batch_key TEXT NOT NULL, -- 'primer_id-último_id' del lote
+    ids BIGINT[],
+    write_dates JSONB, -- {id: write_date} de cada registro cargado (UTC, Odoo)
+    max_write_date TIMESTAMP WITHOUT TIME ZONE, -- Mayor write_date del lote (UTC, Odoo)
+    max_write_id BIGINT,
+    committed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (run_id, mapping, batch_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_batch_progress_job ON etl_batch_progress (job);
+ALTER TABLE etl_batch_progress ADD COLUMN IF NOT EXISTS write_dates JSONB;
+
+-- Migración de tablas existentes: columna de hash para detectar cambios
+ALTER TABLE dim_partners ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_moves ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_letters ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+
 -- ============================================================================
 -- VISTAS ANALÍTICAS (Para usar desde Flask/Pandas)
 -- ============================================================================
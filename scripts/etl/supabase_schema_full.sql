@@ -15,6 +15,7 @@ CREATE TABLE IF NOT EXISTS dim_partners (
     phone TEXT,
     supplier_rank INTEGER DEFAULT 0,
     customer_rank INTEGER DEFAULT 0,
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -41,6 +42,7 @@ CREATE TABLE IF NOT EXISTS fact_moves (
     partner_id BIGINT REFERENCES dim_partners(id),
     reversed_entry_id INTEGER, -- ID de la factura original (si es Nota de Crédito)
     
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -51,6 +53,7 @@ CREATE TABLE IF NOT EXISTS fact_bill_forms (
     state TEXT,
     amount_total NUMERIC(15,2),
     partner_id BIGINT REFERENCES dim_partners(id),
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -66,6 +69,7 @@ CREATE TABLE IF NOT EXISTS fact_letters (
     partner_id BIGINT REFERENCES dim_partners(id),
     move_type TEXT, -- in_bill (generalmente para letras)
     bill_form_id BIGINT REFERENCES fact_bill_forms(id), -- Enlace a la planilla
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -77,6 +81,13 @@ CREATE TABLE IF NOT EXISTS rel_bill_form_invoices (
     PRIMARY KEY (bill_form_id, move_id)
 );
 
+-- Migración de tablas existentes: columna de hash para detectar cambios
+ALTER TABLE dim_partners ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_moves ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_bill_forms ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_letters ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+
 -- ============================================================================
 -- VISTAS ANALÍTICAS
 -- ============================================================================
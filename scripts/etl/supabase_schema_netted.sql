@@ -14,6 +14,7 @@ CREATE TABLE IF NOT EXISTS dim_partners (
     phone TEXT,
     supplier_rank INTEGER DEFAULT 0,
     customer_rank INTEGER DEFAULT 0,
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -32,6 +33,7 @@ CREATE TABLE IF NOT EXISTS fact_moves (
     amount_total NUMERIC(15,2),
     amount_residual NUMERIC(15,2),
     partner_id BIGINT REFERENCES dim_partners(id),
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -53,6 +55,7 @@ CREATE TABLE IF NOT EXISTS fact_move_lines (
     currency_id INTEGER,
     reconciled BOOLEAN DEFAULT FALSE,
     full_reconcile_id INTEGER,
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
@@ -65,9 +68,89 @@ CREATE TABLE IF NOT EXISTS fact_partial_reconciles (
     amount_currency NUMERIC(15,2),
     currency_id INTEGER,
     max_date DATE,
+    row_hash TEXT, -- Hash del contenido de negocio (el ETL omite filas sin cambios)
     last_updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
 );
 
+-- Índices de los joins de view_aml_master_mapping (árbol de conciliaciones)
+CREATE INDEX IF NOT EXISTS idx_fact_move_lines_move ON fact_move_lines (move_id);
+CREATE INDEX IF NOT EXISTS idx_partials_debit_line ON fact_partial_reconciles (debit_move_line_id);
+CREATE INDEX IF NOT EXISTS idx_partials_credit_line ON fact_partial_reconciles (credit_move_line_id);
+
+-- 5. TABLA DE CONTROL ETL (Checkpoints de sincronización incremental)
+-- Guarda el mayor (write_date, id) cargado por modelo; write_date en UTC (Odoo)
+CREATE TABLE IF NOT EXISTS etl_sync_state (
+    sync_key TEXT PRIMARY KEY, -- Ej: netted.account.move, threading.letters
+    model TEXT,
+    last_write_date TIMESTAMP WITHOUT TIME ZONE,
+    last_id BIGINT,
+    rows_synced INTEGER DEFAULT 0,
+    last_run_at TIMESTAMP WITH TIME ZONE DEFAULT NOW()
+);
+
+-- 6. SHARDS DE BACKFILL (Carga histórica paralela por rangos de ID)
+-- Cada shard guarda su propio avance (last_id) para reanudarse de forma independiente
+CREATE TABLE IF NOT EXISTS etl_backfill_shards (
+    backfill_key TEXT, -- Ej: netted.lines
+    shard INTEGER,
+    id_from BIGINT, -- Inclusivo
+    id_to BIGINT, -- Exclusivo
+    last_id BIGINT, -- Último ID cargado (checkpoint del shard)
+    rows_loaded INTEGER DEFAULT 0,
+    status TEXT DEFAULT 'pending', -- pending, running, done, reconciled
+    planned_write_date TIMESTAMP WITHOUT TIME ZONE, -- Inicio del backfill (UTC, watermark incremental)
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (backfill_key, shard)
+);
+
+-- 7. TELEMETRÍA ETL (Una fila por ejecución; detalle por etapa en `stages`)
+CREATE TABLE IF NOT EXISTS etl_runs (
+    id BIGSERIAL PRIMARY KEY,
+    job TEXT, -- sync, netted, full
+    status TEXT, -- success, failed
+    started_at TIMESTAMP WITH TIME ZONE,
+    finished_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    wall_seconds NUMERIC(12,3),
+    rows_loaded INTEGER,
+    rows_written INTEGER, -- Filas con cambios realmente escritas
+    rows_per_second NUMERIC(12,2),
+    bytes_loaded BIGINT,
+    rpc_calls INTEGER,
+    rpc_seconds NUMERIC(12,3),
+    rpc_p95_ms NUMERIC(12,1),
+    rpc_retries INTEGER,
+    watermark_lag_seconds INTEGER, -- Mayor lag entre los checkpoints del trabajo
+    error TEXT,
+    stages JSONB -- {tabla: filas, filas/s, bytes, extract/load s, cuello de botella, lag}
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_runs_job_started ON etl_runs (job, started_at DESC);
+
+-- 8. AVANCE POR LOTE (Reanudación de una ejecución que falló a mitad de camino)
+-- Un registro por lote confirmado; se borra cuando la ejecución termina con éxito
+CREATE TABLE IF NOT EXISTS etl_batch_progress (
+    run_id TEXT NOT NULL,
+    job TEXT NOT NULL,
+    mapping TEXT NOT NULL, -- partners, moves, lines, ...
+    batch_key TEXT NOT NULL, -- 'primer_id-último_id' del lote
+    ids BIGINT[],
+    write_dates JSONB, -- {id: write_date} de cada registro cargado (UTC, Odoo)
+    max_write_date TIMESTAMP WITHOUT TIME ZONE, -- Mayor write_date del lote (UTC, Odoo)
+    max_write_id BIGINT,
+    committed_at TIMESTAMP WITH TIME ZONE DEFAULT NOW(),
+    PRIMARY KEY (run_id, mapping, batch_key)
+);
+
+CREATE INDEX IF NOT EXISTS idx_etl_batch_progress_job ON etl_batch_progress (job);
+ALTER TABLE etl_batch_progress ADD COLUMN IF NOT EXISTS write_dates JSONB;
+
+-- Migración de tablas existentes: columna de hash para detectar cambios
+ALTER TABLE dim_partners ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_moves ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_move_lines ADD COLUMN IF NOT EXISTS row_hash TEXT;
+ALTER TABLE fact_partial_reconciles ADD COLUMN IF NOT EXISTS row_hash TEXT;
+
+
 -- ============================================================================
 -- VISTAS PARA REPORTES NETEADOS
 -- ============================================================================
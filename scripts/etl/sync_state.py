@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+Checkpoints de sincronización incremental (watermarks) para el ETL.
+
+Cada sincronización guarda en la tabla `etl_sync_state` el mayor
+(`write_date`, `id`) cargado con éxito por modelo. La siguiente ejecución solo
+pide a Odoo los registros con `write_date` posterior al checkpoint, menos un
+margen de solapamiento (SYNC_OVERLAP_MINUTES) para no perder transacciones que
+se confirmaron tarde con un `write_date` anterior.
+
+El checkpoint solo avanza después de cargar el lote en Supabase; si la carga
+falla, la próxima ejecución vuelve a traer los mismos registros (los upserts
+son idempotentes).
+"""
+
+import os
+from datetime import datetime, timedelta
+
+SYNC_STATE_TABLE = 'etl_sync_state'
+ODOO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+class SyncStateStore:
+    """Lectura y escritura de checkpoints por clave de sincronización."""
+
+    def __init__(self, supabase, overlap_minutes=None):
+        """
+        Args:
+            supabase: Cliente de Supabase
+            overlap_minutes (int, optional): Margen de solapamiento. Por defecto
+                la variable de entorno SYNC_OVERLAP_MINUTES o 10 minutos.
+        """
+        self.supabase = supabase
+        if overlap_minutes is None:
+            overlap_minutes = int(os.getenv('SYNC_OVERLAP_MINUTES', '10'))
+        self.overlap = timedelta(minutes=overlap_minutes)
+
+    def get(self, sync_key):
+        """
+        Obtiene el checkpoint de una sincronización.
+
+        Returns:
+            dict: {'last_write_date', 'last_id', ...} o None si no existe
+                  (o si la tabla de estado no está disponible)
+        """
+        try:
+            result = self.supabase.table(SYNC_STATE_TABLE).select('*').eq('sync_key', sync_key).execute()
+        except Exception as e:
+            print(f"[STATE] No se pudo leer el checkpoint '{sync_key}' (¿falta la tabla {SYNC_STATE_TABLE}?): {e}")
+            return None
+        return result.data[0] if result.data else None
+
+    def changed_domain(self, sync_key, base_domain, initial_domain=None):
+        """
+        Construye el domain de Odoo para traer solo registros modificados.
+
+        Args:
+            sync_key (str): Clave de la sincronización (ej: 'netted.account.move')
+            base_domain (list): Filtros propios del modelo
+            initial_domain (list, optional): Filtros de la primera carga
+                (sin checkpoint), por ejemplo una ventana de fechas
+
+        Returns:
+            list: Domain de Odoo
+        """
+        state = self.get(sync_key)
+        last_write_date = state.get('last_write_date') if state else None
+        if not last_write_date:
+            print(f"[STATE] '{sync_key}' sin checkpoint: carga inicial")
+            return list(base_domain) + list(initial_domain or [])
+
+        watermark = datetime.fromisoformat(str(last_write_date).replace('Z', '+00:00')).replace(tzinfo=None)
+        since = (watermark - self.overlap).strftime(ODOO_DATETIME_FORMAT)
+        print(f"[STATE] '{sync_key}' incremental desde {since} (checkpoint {watermark}, id {state.get('last_id')})")
+        return list(base_domain) + [('write_date', '>=', since)]
+
+    def advance(self, sync_key, model, records):
+        """
+        Avanza el checkpoint con los registros ya cargados.
+
+        Args:
+            sync_key (str): Clave de la sincronización
+            model (str): Modelo de Odoo
+            records (list): Registros leídos de Odoo (con 'id' y 'write_date')
+        """
+        latest = max(
+            ((r['write_date'], r['id']) for r in records if r.get('write_date')),
+            default=None
+        )
+        if latest is None:
+            return
+
+        state = self.get(sync_key)
+        if state and state.get('last_write_date'):
+            current = datetime.fromisoformat(str(state['last_write_date']).replace('Z', '+00:00')).replace(tzinfo=None)
+            current_key = (current.strftime(ODOO_DATETIME_FORMAT), state.get('last_id') or 0)
+            if latest <= current_key:
+                return
+
+        try:
+            self.supabase.table(SYNC_STATE_TABLE).upsert({
+                'sync_key': sync_key,
+                'model': model,
+                'last_write_date': latest[0],
+                'last_id': latest[1],
+                'rows_synced': len(records),
+                'last_run_at': datetime.now().isoformat()
+            }).execute()
+            print(f"[STATE] Checkpoint '{sync_key}' -> {latest[0]} (id {latest[1]})")
+        except Exception as e:
+            print(f"[STATE] No se pudo guardar el checkpoint '{sync_key}': {e}")
+
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+Telemetría de ejecuciones ETL.
+
+Cada ejecución de `ETLEngine.run` deja una fila en `etl_runs` con métricas
+globales (filas/s, bytes, latencia RPC, reintentos, lag del watermark) y el
+detalle por etapa (tabla) en `stages`, para distinguir si el cuello de botella
+es la extracción de Odoo o la carga al warehouse y qué tan desactualizado está.
+
+Este módulo no carga variables de entorno: también lo usa la app Flask
+(`/api/etl/runs` y `/api/health`).
+"""
+
+import os
+from datetime import datetime, timezone
+
+RUNS_TABLE = 'etl_runs'
+SYNC_STATE_TABLE = 'etl_sync_state'
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def _parse_timestamp(value):
+    """Timestamp del warehouse (ISO, con o sin zona) -> datetime UTC."""
+    if not value:
+        return None
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00').replace(' ', 'T'))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)  # write_date de Odoo está en UTC
+    return parsed.astimezone(timezone.utc)
+
+
+def lag_seconds(write_date, now=None):
+    """Segundos entre un write_date de Odoo (UTC) y ahora."""
+    parsed = _parse_timestamp(write_date)
+    if parsed is None:
+        return None
+    return int(((now or datetime.now(timezone.utc)) - parsed).total_seconds())
+
+
+def summarize(metrics):
+    """
+    Construye la fila de `etl_runs` a partir de las métricas del motor.
+
+    Args:
+        metrics (dict): Métricas de ETLEngine (ver ETLEngine.prepare)
+
+    Returns:
+        dict: Fila lista para insertar
+    """
+    stages = {}
+    for name, stats in metrics.get('tables', {}).items():
+        wall = stats.get('wall_seconds') or 0.0
+        busy = (stats.get('extract_seconds') or 0.0) + (stats.get('load_seconds') or 0.0)
+        stages[name] = {
+            'table': stats.get('table'),
+            'rows': stats.get('rows', 0),
+            'written': stats.get('rows', 0) - stats.get('unchanged', 0),
+            'unchanged': stats.get('unchanged', 0),
+            'batches': stats.get('batches', 0),
+            'bytes': stats.get('bytes', 0),
+            'extract_seconds': round(stats.get('extract_seconds') or 0.0, 3),
+            'load_seconds': round(stats.get('load_seconds') or 0.0, 3),
+            'wall_seconds': round(wall, 3),
+            'rows_per_second': round(stats.get('rows', 0) / wall, 2) if wall else None,
+            # Etapa dominante: dónde se fue el tiempo de los lotes de esta tabla
+            'bottleneck': (
+                None if not busy else
+                'extract' if (stats.get('extract_seconds') or 0.0) >= (stats.get('load_seconds') or 0.0) else 'load'
+            ),
+            'watermark_lag_seconds': stats.get('watermark_lag_seconds'),
+        }
+
+    latencies = metrics.get('rpc_latencies') or []
+    rows = sum(s['rows'] for s in stages.values())
+    wall = metrics.get('wall_seconds') or 0.0
+    lags = [s['watermark_lag_seconds'] for s in stages.values() if s['watermark_lag_seconds'] is not None]
+    return {
+        'job': metrics.get('job'),
+        'status': metrics.get('status', 'success'),
+        'started_at': metrics.get('started_at'),
+        'finished_at': datetime.now().astimezone().isoformat(),
+        'wall_seconds': round(wall, 3),
+        'rows_loaded': rows,
+        'rows_written': sum(s['written'] for s in stages.values()),
+        'rows_per_second': round(rows / wall, 2) if wall else None,
+        'bytes_loaded': sum(s['bytes'] for s in stages.values()),
+        'rpc_calls': metrics.get('rpc_calls', 0),
+        'rpc_seconds': round(metrics.get('rpc_seconds', 0.0), 3),
+        'rpc_p95_ms': round(_percentile(latencies, 0.95) * 1000, 1) if latencies else None,
+        'rpc_retries': metrics.get('rpc_retries', 0),
+        'watermark_lag_seconds': max(lags) if lags else None,
+        'error': metrics.get('error'),
+        'stages': stages,
+    }
+
+
+class RunRecorder:
+    """Guarda el resumen de cada ejecución en `etl_runs`."""
+
+    def __init__(self, supabase):
+        self.supabase = supabase
+
+    def record(self, metrics):
+        """
+        Inserta la ejecución. Un fallo al registrar no debe tumbar el ETL.
+
+        Returns:
+            dict: Fila registrada (o None si no se pudo guardar)
+        """
+        row = summarize(metrics)
+        try:
+            self.supabase.table(RUNS_TABLE).insert(row).execute()
+        except Exception as e:
+            print(f"[TELEMETRY] No se pudo registrar la ejecución (¿falta la tabla {RUNS_TABLE}?): {e}")
+            return None
+        lag = row['watermark_lag_seconds']
+        print(f"[TELEMETRY] {row['job']}: {row['rows_loaded']} filas, {row['rows_per_second']} filas/s, "
+              f"RPC p95 {row['rpc_p95_ms']} ms, {row['rpc_retries']} reintentos, "
+              f"lag {'-' if lag is None else f'{lag}s'}")
+        return row
+
+
+def recent_runs(supabase, job=None, limit=20):
+    """Últimas ejecuciones registradas (más recientes primero)."""
+    query = supabase.table(RUNS_TABLE).select('*')
+    if job:
+        query = query.eq('job', job)
+    return query.order('started_at', desc=True).limit(limit).execute().data or []
+
+
+def warehouse_freshness(supabase, max_age_minutes=None):
+    """
+    Estado de frescura del warehouse.
+
+    - `age_seconds`: tiempo desde la última ejecución exitosa de cualquier trabajo
+    - `watermarks`: lag de cada checkpoint incremental (write_date más reciente cargado)
+    - `status`: 'fresh' / 'stale' según ETL_FRESHNESS_MAX_MINUTES (default 120),
+      'unknown' si no hay ejecuciones registradas
+
+    Returns:
+        dict
+    """
+    if max_age_minutes is None:
+        max_age_minutes = int(os.getenv('ETL_FRESHNESS_MAX_MINUTES', '120'))
+    now = datetime.now(timezone.utc)
+
+    runs = (supabase.table(RUNS_TABLE).select('job,status,finished_at')
+            .eq('status', 'success').order('finished_at', desc=True).limit(1).execute().data or [])
+    states = supabase.table(SYNC_STATE_TABLE).select('sync_key,last_write_date').execute().data or []
+
+    last_success = _parse_timestamp(runs[0]['finished_at']) if runs else None
+    age = int((now - last_success).total_seconds()) if last_success else None
+    if age is None:
+        status = 'unknown'
+    else:
+        status = 'fresh' if age <= max_age_minutes * 60 else 'stale'
+
+    return {
+        'status': status,
+        'last_success_at': last_success.isoformat() if last_success else None,
+        'last_success_job': runs[0]['job'] if runs else None,
+        'age_seconds': age,
+        'max_age_seconds': max_age_minutes * 60,
+        'watermarks': {
+            s['sync_key']: lag_seconds(s.get('last_write_date'), now) for s in states
+        },
+    }
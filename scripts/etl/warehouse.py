@@ -0,0 +1,460 @@
+# -*- coding: utf-8 -*-
+"""
+Backends del warehouse analítico.
+
+Todo el código que lee o escribe el warehouse (motor ETL, cargador, estado de
+sincronización, telemetría, reporte neteado de Tesorería) usa la interfaz del
+cliente de Supabase/PostgREST: `client.table(nombre).select(...).eq(...)
+.order(...).execute().data`. Este módulo elige qué hay detrás de esa interfaz:
+
+    - 'supabase' (por defecto): cliente oficial de Supabase (consulta por red)
+    - 'sqlite': `LocalWarehouse`, un archivo SQLite local (stdlib) con las
+      mismas tablas y vistas de `supabase_schema*.sql`, sin salto de red
+
+WAREHOUSE_BACKEND elige el backend y WAREHOUSE_SQLITE_PATH el archivo local
+(por defecto data/warehouse/warehouse.sqlite).
+
+El esquema local se genera desde los mismos .sql con una traducción mínima de
+PostgreSQL a SQLite, así no hay una segunda definición que mantener. Los tres
+esquemas se aplican sobre la misma base: si una tabla se repite con columnas
+distintas (ej: fact_moves), se suman las que falten.
+
+Este módulo no carga variables de entorno: también lo usa la app Flask.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import threading
+from datetime import date, datetime
+
+ETL_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_FILES = (
+    'supabase_schema.sql',
+    'supabase_schema_netted.sql',
+    'supabase_schema_full.sql',
+)
+DEFAULT_SQLITE_PATH = os.path.abspath(
+    os.path.join(ETL_DIR, '..', '..', 'data', 'warehouse', 'warehouse.sqlite')
+)
+BACKENDS = ('supabase', 'sqlite')
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def create_warehouse_client(backend=None, url=None, key=None, sqlite_path=None):
+    """
+    Crea el cliente del warehouse según el backend.
+
+    Args:
+        backend (str, optional): 'supabase' o 'sqlite'. Por defecto WAREHOUSE_BACKEND.
+        url (str, optional): SUPABASE_URL (backend 'supabase')
+        key (str, optional): SUPABASE_KEY (backend 'supabase')
+        sqlite_path (str, optional): Archivo local. Por defecto
+            WAREHOUSE_SQLITE_PATH o data/warehouse/warehouse.sqlite.
+
+    Returns:
+        Cliente con la interfaz de Supabase (`table(...)`)
+    """
+    backend = (backend or os.getenv('WAREHOUSE_BACKEND') or 'supabase').strip().lower()
+    if backend == 'sqlite':
+        return LocalWarehouse(sqlite_path or os.getenv('WAREHOUSE_SQLITE_PATH') or DEFAULT_SQLITE_PATH)
+    if backend != 'supabase':
+        raise ValueError(f"WAREHOUSE_BACKEND desconocido: {backend} (opciones: {', '.join(BACKENDS)})")
+    from supabase import create_client
+    return create_client(url, key)
+
+
+# ---------------------------------------------------------------------------
+# Traducción de esquemas PostgreSQL -> SQLite
+# ---------------------------------------------------------------------------
+
+_TYPE_REPLACEMENTS = (
+    (re.compile(r'\bBIGSERIAL\s+PRIMARY\s+KEY\b', re.I), 'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bTIMESTAMP\s+WITH(?:OUT)?\s+TIME\s+ZONE\b', re.I), 'TIMESTAMP'),
+    # Arreglos y JSONB se guardan como texto JSON (ver LocalWarehouse._decode)
+    (re.compile(r'\b\w+\[\]', re.I), 'JSON'),
+    (re.compile(r'\bJSONB\b', re.I), 'JSON'),
+    (re.compile(r'\bNOW\(\)', re.I), 'CURRENT_TIMESTAMP'),
+)
+_CREATE_TABLE = re.compile(r'^CREATE\s+TABLE\s+IF\s+NOT\s+EXISTS\s+(\w+)\s*\((.*)\)$', re.I | re.S)
+_ADD_COLUMN = re.compile(r'^ALTER\s+TABLE\s+(\w+)\s+ADD\s+COLUMN\s+IF\s+NOT\s+EXISTS\s+(\w+)\s+(.*)$', re.I | re.S)
+_CREATE_VIEW = re.compile(r'^CREATE\s+OR\s+REPLACE\s+VIEW\s+(\w+)\s+AS\s+(.*)$', re.I | re.S)
+_TABLE_CONSTRAINT = re.compile(r'^(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CONSTRAINT|CHECK)\b', re.I)
+
+
+def _split_top_level(text, separator=','):
+    """Divide por `separator` fuera de paréntesis (ej: NUMERIC(15,2), PRIMARY KEY (a, b))."""
+    parts, depth, current = [], 0, []
+    for char in text:
+        if char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+        if char == separator and depth == 0:
+            parts.append(''.join(current).strip())
+            current = []
+        else:
+            current.append(char)
+    if ''.join(current).strip():
+        parts.append(''.join(current).strip())
+    return parts
+
+
+def schema_statements(path):
+    """Sentencias de un archivo .sql de Supabase, sin comentarios y con tipos de SQLite."""
+    with open(path, encoding='utf-8') as f:
+        text = re.sub(r'--[^\n]*', '', f.read())
+    for pattern, replacement in _TYPE_REPLACEMENTS:
+        text = pattern.sub(replacement, text)
+    return [' '.join(s.split()) for s in text.split(';') if s.strip()]
+
+
+# ---------------------------------------------------------------------------
+# Backend local
+# ---------------------------------------------------------------------------
+
+class LocalResponse:
+    """Respuesta con la forma de la de postgrest-py (`data`, `count`)."""
+
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+class LocalQuery:
+    """
+    Subconjunto del query builder de PostgREST sobre SQLite.
+
+    Cubre lo que usa el proyecto: select (con count='exact'), insert, upsert,
+    update, delete, filtros eq/neq/gt/gte/lt/lte/in_/ilike/is_, order, limit
+    y range.
+    """
+
+    def __init__(self, warehouse, table):
+        self._warehouse = warehouse
+        self._table = _quote(table)
+        self._name = table
+        self._action = 'select'
+        self._columns = '*'
+        self._count = None
+        self._payload = None
+        self._on_conflict = None
+        self._ignore_duplicates = False
+        self._where = []
+        self._params = []
+        self._order = []
+        self._limit = None
+        self._offset = None
+
+    # -- Acciones -------------------------------------------------------------
+
+    def select(self, columns='*', count=None):
+        self._action = 'select'
+        columns = [c.strip() for c in columns.split(',') if c.strip()]
+        self._columns = '*' if columns in ([], ['*']) else ', '.join(_quote(c) for c in columns)
+        self._count = count
+        return self
+
+    def insert(self, rows):
+        self._action = 'insert'
+        self._payload = rows if isinstance(rows, list) else [rows]
+        return self
+
+    def upsert(self, rows, on_conflict=None, ignore_duplicates=False):
+        self._action = 'upsert'
+        self._payload = rows if isinstance(rows, list) else [rows]
+        self._on_conflict = [c.strip() for c in on_conflict.split(',')] if on_conflict else None
+        self._ignore_duplicates = ignore_duplicates
+        return self
+
+    def update(self, values):
+        self._action = 'update'
+        self._payload = values
+        return self
+
+    def delete(self):
+        self._action = 'delete'
+        return self
+
+    # -- Filtros y orden ------------------------------------------------------
+
+    def _filter(self, column, operator, value):
+        self._where.append(f'{_quote(column)} {operator} ?')
+        self._params.append(_encode(value))
+        return self
+
+    def eq(self, column, value):
+        return self._filter(column, '=', value)
+
+    def neq(self, column, value):
+        return self._filter(column, '!=', value)
+
+    def gt(self, column, value):
+        return self._filter(column, '>', value)
+
+    def gte(self, column, value):
+        return self._filter(column, '>=', value)
+
+    def lt(self, column, value):
+        return self._filter(column, '<', value)
+
+    def lte(self, column, value):
+        return self._filter(column, '<=', value)
+
+    def ilike(self, column, pattern):
+        # LIKE de SQLite ya ignora mayúsculas/minúsculas (ASCII)
+        return self._filter(column, 'LIKE', pattern.replace('*', '%'))
+
+    def in_(self, column, values):
+        values = list(values)
+        if not values:
+            self._where.append('0')
+            return self
+        self._where.append(f"{_quote(column)} IN ({', '.join('?' * len(values))})")
+        self._params.extend(_encode(v) for v in values)
+        return self
+
+    def is_(self, column, value):
+        if value is None or str(value).lower() == 'null':
+            self._where.append(f'{_quote(column)} IS NULL')
+            return self
+        return self._filter(column, 'IS', value)
+
+    def order(self, column, desc=False, nullsfirst=None):
+        # Mismo orden de NULL que PostgreSQL: al final en ASC, al inicio en DESC
+        if nullsfirst is None:
+            nullsfirst = desc
+        self._order.append(
+            f"{_quote(column)} {'DESC' if desc else 'ASC'} NULLS {'FIRST' if nullsfirst else 'LAST'}"
+        )
+        return self
+
+    def limit(self, size):
+        self._limit = int(size)
+        return self
+
+    def range(self, start, end):
+        self._offset = int(start)
+        self._limit = int(end) - int(start) + 1
+        return self
+
+    # -- Ejecución ------------------------------------------------------------
+
+    def _where_sql(self):
+        return f" WHERE {' AND '.join(self._where)}" if self._where else ''
+
+    def execute(self):
+        if self._action == 'select':
+            return self._execute_select()
+        if self._action in ('insert', 'upsert'):
+            return self._execute_write()
+
+        conn = self._warehouse.connection()
+        if self._action == 'update':
+            assignments = ', '.join(f'{_quote(c)} = ?' for c in self._payload)
+            params = [_encode(v) for v in self._payload.values()] + self._params
+            statement = f'UPDATE {self._table} SET {assignments}{self._where_sql()}'
+        else:
+            statement = f'DELETE FROM {self._table}{self._where_sql()}'
+        with conn:
+            conn.execute(statement, self._params if self._action == 'delete' else params)
+        return LocalResponse([])
+
+    def _execute_select(self):
+        conn = self._warehouse.connection()
+        statement = f'SELECT {self._columns} FROM {self._table}{self._where_sql()}'
+        if self._order:
+            statement += f" ORDER BY {', '.join(self._order)}"
+        if self._limit is not None or self._offset is not None:
+            statement += f' LIMIT {self._limit if self._limit is not None else -1} OFFSET {self._offset or 0}'
+        cursor = conn.execute(statement, self._params)
+        columns = [d[0] for d in cursor.description]
+        types = self._warehouse.column_types(self._name)
+        data = [
+            {c: _decode(v, types.get(c)) for c, v in zip(columns, row)}
+            for row in cursor.fetchall()
+        ]
+        count = None
+        if self._count:
+            count = conn.execute(f'SELECT COUNT(*) FROM {self._table}{self._where_sql()}', self._params).fetchone()[0]
+        return LocalResponse(data, count)
+
+    def _execute_write(self):
+        rows = self._payload
+        if not rows:
+            return LocalResponse([])
+        # Como en PostgREST, todas las filas del lote llevan las columnas de la primera
+        columns = list(rows[0])
+        statement = (
+            f"INSERT INTO {self._table} ({', '.join(_quote(c) for c in columns)}) "
+            f"VALUES ({', '.join('?' * len(columns))})"
+        )
+        if self._action == 'upsert':
+            keys = self._on_conflict or self._warehouse.primary_key(self._name)
+            updates = [c for c in columns if c not in keys]
+            if self._ignore_duplicates or not updates:
+                action = 'DO NOTHING'
+            else:
+                action = 'DO UPDATE SET ' + ', '.join(f'{_quote(c)} = excluded.{_quote(c)}' for c in updates)
+            statement += f" ON CONFLICT ({', '.join(_quote(k) for k in keys)}) {action}"
+
+        conn = self._warehouse.connection()
+        with conn:
+            conn.executemany(statement, [[_encode(row.get(c)) for c in columns] for row in rows])
+        return LocalResponse(rows)
+
+
+class LocalWarehouse:
+    """
+    Warehouse embebido en un archivo SQLite con la interfaz del cliente de Supabase.
+
+    Una conexión por hilo (el motor ETL carga en paralelo) en modo WAL: las
+    lecturas no bloquean a la escritura y las escrituras se serializan con
+    `busy_timeout`. Las claves foráneas se verifican igual que en PostgreSQL.
+    """
+
+    # Esquemas ya aplicados por archivo (una vez por proceso)
+    _initialized = set()
+    _init_lock = threading.Lock()
+
+    def __init__(self, path=None):
+        """
+        Args:
+            path (str, optional): Archivo SQLite. Por defecto data/warehouse/warehouse.sqlite.
+        """
+        self.path = os.path.abspath(path or DEFAULT_SQLITE_PATH)
+        # Identidad del destino, como el cliente de Supabase (caches por warehouse)
+        self.supabase_url = f'sqlite:///{self.path}'
+        self._local = threading.local()
+        self._types = {}
+        self._keys = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._ensure_schema()
+
+    def connection(self):
+        """Conexión del hilo actual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            conn.execute('PRAGMA foreign_keys=ON')
+            self._local.conn = conn
+        return conn
+
+    def table(self, name):
+        return LocalQuery(self, name)
+
+    # Alias de supabase-py
+    from_ = table
+
+    def _ensure_schema(self):
+        with self._init_lock:
+            if self.path in self._initialized:
+                return
+            conn = self.connection()
+            with conn:
+                for filename in SCHEMA_FILES:
+                    for statement in schema_statements(os.path.join(ETL_DIR, filename)):
+                        self._apply(conn, statement)
+            self._initialized.add(self.path)
+            print(f"[WAREHOUSE] Esquema local listo: {self.path}")
+
+    def _apply(self, conn, statement):
+        """Aplica una sentencia de los esquemas de Supabase sobre SQLite."""
+        match = _CREATE_TABLE.match(statement)
+        if match:
+            table, body = match.groups()
+            existing = self._existing_columns(conn, table)
+            if not existing:
+                conn.execute(statement)
+                return
+            # La tabla ya vino de otro esquema: sumar las columnas que falten
+            for definition in _split_top_level(body):
+                if _TABLE_CONSTRAINT.match(definition):
+                    continue
+                column = definition.split()[0]
+                if column not in existing:
+                    self._add_column(conn, table, definition)
+            return
+
+        match = _ADD_COLUMN.match(statement)
+        if match:
+            table, column, definition = match.groups()
+            if column not in self._existing_columns(conn, table):
+                self._add_column(conn, table, f'{column} {definition}')
+            return
+
+        match = _CREATE_VIEW.match(statement)
+        if match:
+            view, body = match.groups()
+            conn.execute(f'DROP VIEW IF EXISTS {view}')
+            conn.execute(f'CREATE VIEW {view} AS {body}')
+            return
+
+        conn.execute(statement)
+
+    @staticmethod
+    def _existing_columns(conn, table):
+        return {row[1] for row in conn.execute(f'PRAGMA table_info({_quote(table)})')}
+
+    @staticmethod
+    def _add_column(conn, table, definition):
+        # ALTER TABLE de SQLite no admite defaults no constantes
+        definition = re.sub(r'\s+DEFAULT\s+CURRENT_TIMESTAMP\b', '', definition, flags=re.I)
+        conn.execute(f'ALTER TABLE {table} ADD COLUMN {definition}')
+
+    def _table_info(self, table):
+        with self._lock:
+            if table not in self._types:
+                info = self.connection().execute(f'PRAGMA table_info({_quote(table)})').fetchall()
+                self._types[table] = {row[1]: (row[2] or '').upper() for row in info}
+                self._keys[table] = [row[1] for row in sorted(info, key=lambda r: r[5]) if row[5]]
+            return self._types[table], self._keys[table]
+
+    def column_types(self, table):
+        """{columna: tipo declarado} de una tabla o vista."""
+        return self._table_info(table)[0]
+
+    def primary_key(self, table):
+        """Columnas de la clave primaria (destino por defecto del upsert)."""
+        keys = self._table_info(table)[1]
+        if not keys:
+            raise ValueError(f"La tabla {table} no tiene clave primaria para upsert")
+        return keys
+
+    def close(self):
+        """Cierra la conexión del hilo actual."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+def _quote(identifier):
+    if not _IDENTIFIER.match(identifier):
+        raise ValueError(f"Identificador no válido: {identifier!r}")
+    return f'"{identifier}"'
+
+
+def _encode(value):
+    """Valor de Python/JSON -> valor de SQLite."""
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, default=str)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+def _decode(value, declared_type):
+    """Valor de SQLite -> valor como lo devolvería PostgREST."""
+    if value is None or not declared_type:
+        return value
+    if declared_type == 'BOOLEAN':
+        return bool(value)
+    if declared_type == 'JSON' and isinstance(value, str):
+        return json.loads(value)
+    return value
@@ -0,0 +1,255 @@
+# -*- coding: utf-8 -*-
+"""
+Micro-benchmark de TreasuryService._process_payable_lines.
+
+Compara la implementación por lotes actual contra la versión anterior fila
+por fila (copiada abajo como referencia) con datos sintéticos del tamaño de
+un reporte CxP con per_page=10000. Verifica que la salida sea idéntica, con
+y sin fecha de corte.
+
+Uso:
+    python scripts/investigation/rendimiento_cxp_lotes.py [n_lineas]
+"""
+
+import os
+import random
+import sys
+import time
+import statistics
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.core.calculators import calcular_dias_vencido, clasificar_antiguedad
+from app.treasury.services import TreasuryService, PAYMENT_STATE_MAP, STATE_MAP
+
+
+def process_payable_lines_reference(lines, move_map, partner_map, account_map, cutoff_date=None, reconciliation_map=None, include_reconciled=False):
+    """Versión anterior (fila por fila) usada como referencia de salida."""
+    extract = TreasuryService._extract_m2o_name
+    rows = []
+    today = datetime.strptime(cutoff_date, '%Y-%m-%d').date() if cutoff_date else datetime.today().date()
+
+    for line in lines:
+        rec_info = reconciliation_map.get(line['id'], {}) if reconciliation_map else {}
+        reconcile_date = rec_info.get('max_date')
+        paid_after_cutoff = float(rec_info.get('paid_after', 0.0) or 0.0)
+
+        if cutoff_date:
+            is_reconciled_now = line.get('reconciled', False)
+            if is_reconciled_now and reconcile_date:
+                if reconcile_date <= cutoff_date and not include_reconciled:
+                    continue
+            elif is_reconciled_now and not reconcile_date:
+                if not include_reconciled:
+                    continue
+
+        move_id = line['move_id'][0] if line.get('move_id') else None
+        partner_id = line['partner_id'][0] if line.get('partner_id') else None
+        account_id = line['account_id'][0] if line.get('account_id') else None
+
+        move = move_map.get(move_id, {})
+        partner = partner_map.get(partner_id, {})
+        account = account_map.get(account_id, {})
+
+        invoice_date_due = move.get('invoice_date_due', '')
+        date_due = line.get('date_maturity') or invoice_date_due
+        dias_vencido = calcular_dias_vencido(date_due, today) if date_due else 0
+
+        antiguedad = clasificar_antiguedad(max(0, dias_vencido))
+        estado_deuda = 'VENCIDO' if dias_vencido > 0 else 'VIGENTE'
+
+        debit = line.get('debit', 0.0) or 0.0
+        credit = line.get('credit', 0.0) or 0.0
+        amount_total_line = abs(debit - credit)
+        current_residual = abs(line.get('amount_residual', 0.0) or 0.0)
+        amount_residual_line = current_residual
+        amount_residual_historical = amount_residual_line
+
+        paid_after_cutoff = paid_after_cutoff if cutoff_date else 0.0
+
+        if cutoff_date:
+            amount_residual_historical = current_residual + paid_after_cutoff
+            if reconcile_date and reconcile_date <= cutoff_date and include_reconciled:
+                amount_residual_historical = 0.0
+
+        payment_state_raw = move.get('payment_state', '')
+        payment_state_display = PAYMENT_STATE_MAP.get(payment_state_raw, payment_state_raw)
+        if cutoff_date and amount_residual_historical > 0:
+            payment_state_display = "No Pagado (al corte)"
+
+        state_raw = move.get('state', '')
+
+        rows.append({
+            'move_name': move.get('name', ''),
+            'ref': move.get('ref', ''),
+            'payment_state': payment_state_display,
+            'move_type': move.get('move_type', ''),
+            'state': STATE_MAP.get(state_raw, state_raw),
+            'invoice_date': move.get('invoice_date', ''),
+            'invoice_date_due': invoice_date_due,
+            'invoice_origin': move.get('invoice_origin', ''),
+            'invoice_payment_term_id': extract(move.get('invoice_payment_term_id')),
+            'invoice_user_id': extract(move.get('invoice_user_id')),
+            'l10n_latam_document_type_id': extract(move.get('l10n_latam_document_type_id')),
+            'l10n_latam_boe_number': move.get('l10n_latam_boe_number', ''),
+            'narration': move.get('narration', ''),
+            'fiscal_position_id': extract(move.get('fiscal_position_id')),
+            'invoice_incoterm_id': extract(move.get('invoice_incoterm_id')),
+            'company_id': extract(move.get('company_id')),
+            'supplier_vat': partner.get('vat', ''),
+            'supplier_name': partner.get('name', ''),
+            'supplier_country': extract(partner.get('country_id')),
+            'supplier_state': extract(partner.get('state_id')),
+            'supplier_city': partner.get('city', ''),
+            'supplier_email': partner.get('email', ''),
+            'supplier_rank': partner.get('supplier_rank', 0),
+            'account_code': account.get('code', ''),
+            'account_name': account.get('name', ''),
+            'currency_id': extract(line.get('currency_id') or move.get('currency_id')),
+            'amount_total': amount_total_line,
+            'amount_residual': amount_residual_line,
+            'amount_residual_historical': amount_residual_historical,
+            'amount_total_in_currency_signed': move.get('amount_total_in_currency_signed', 0.0),
+            'amount_residual_with_retention': move.get('amount_residual_with_retention', 0.0),
+            'amount_total_signed': move.get('amount_total_signed', 0.0),
+            'amount_currency': line.get('amount_currency', 0.0),
+            'amount_residual_currency': line.get('amount_residual', 0.0),
+            'paid_after_cutoff': paid_after_cutoff,
+            'debit': debit,
+            'credit': credit,
+            'date': line.get('date', ''),
+            'date_maturity': line.get('date_maturity', ''),
+            'name': line.get('name', ''),
+            'reconciled': line.get('reconciled', False),
+            'blocked': line.get('blocked', False),
+            'full_reconcile_id': extract(line.get('full_reconcile_id')),
+            'reconciliation_date': reconcile_date if cutoff_date else '',
+            'dias_vencido': dias_vencido,
+            'estado_deuda': estado_deuda,
+            'antiguedad': antiguedad,
+            'l10n_pe_retention_check': move.get('l10n_pe_retention_check', False),
+        })
+
+    return rows
+
+
+def build_dataset(n_lines, seed=42):
+    """Genera líneas, facturas, proveedores, cuentas y conciliaciones sintéticas."""
+    rng = random.Random(seed)
+    base = date(2024, 6, 1)
+
+    def rand_date():
+        return (base + timedelta(days=rng.randint(-400, 200))).strftime('%Y-%m-%d')
+
+    partner_map = {
+        pid: {
+            'id': pid, 'name': f'PROVEEDOR {pid} S.A.C.', 'vat': f'20{pid:09d}',
+            'country_id': [173, 'Perú'], 'state_id': [1, 'Lima'], 'city': 'Lima',
+            'email': f'pagos{pid}@proveedor.pe', 'supplier_rank': rng.randint(0, 5),
+        }
+        for pid in range(1, max(2, n_lines // 20))
+    }
+    account_map = {
+        1: {'id': 1, 'code': '421201', 'name': 'Facturas por pagar MN'},
+        2: {'id': 2, 'code': '421202', 'name': 'Facturas por pagar ME'},
+        3: {'id': 3, 'code': '431201', 'name': 'Relacionadas'},
+    }
+    move_map = {}
+    for mid in range(1, max(2, n_lines // 2)):
+        move_map[mid] = {
+            'id': mid, 'name': f'F001-{mid:08d}', 'ref': f'REF{mid}',
+            'payment_state': rng.choice(list(PAYMENT_STATE_MAP) + ['unknown']),
+            'move_type': 'in_invoice', 'state': rng.choice(list(STATE_MAP)),
+            'invoice_date': rand_date(), 'invoice_date_due': rng.choice([rand_date(), False]),
+            'invoice_origin': False, 'invoice_payment_term_id': [3, '30 días'],
+            'invoice_user_id': [2, 'Tesorería'], 'l10n_latam_document_type_id': [1, 'Factura'],
+            'l10n_latam_boe_number': False, 'narration': False, 'fiscal_position_id': False,
+            'invoice_incoterm_id': False, 'company_id': [1, 'AGROVET MARKET S.A.'],
+            'currency_id': rng.choice([[1, 'PEN'], [2, 'USD']]),
+            'amount_total_in_currency_signed': rng.uniform(-5000, 0),
+            'amount_residual_with_retention': rng.uniform(0, 5000),
+            'amount_total_signed': rng.uniform(-5000, 0),
+            'l10n_pe_retention_check': rng.random() < 0.2,
+        }
+
+    lines = []
+    reconciliation_map = {}
+    partner_ids = list(partner_map)
+    move_ids = list(move_map)
+    for lid in range(1, n_lines + 1):
+        amount = round(rng.uniform(10, 10000), 2)
+        reconciled = rng.random() < 0.3
+        lines.append({
+            'id': lid,
+            'move_id': [rng.choice(move_ids), 'F001'],
+            'partner_id': [rng.choice(partner_ids), 'PROVEEDOR'] if rng.random() < 0.98 else False,
+            'account_id': [rng.randint(1, 3), '421201'],
+            'name': f'Línea {lid}', 'date': rand_date(),
+            'date_maturity': rng.choice([rand_date(), False]),
+            'amount_currency': -amount, 'amount_residual': 0.0 if reconciled else -amount,
+            'currency_id': rng.choice([[1, 'PEN'], False]),
+            'debit': 0.0, 'credit': amount, 'reconciled': reconciled, 'blocked': False,
+            'full_reconcile_id': [lid, f'A{lid}'] if reconciled else False,
+        })
+        if rng.random() < 0.5:
+            reconciliation_map[lid] = {
+                'max_date': rng.choice([rand_date(), None]),
+                'paid_before': rng.uniform(0, amount),
+                'paid_after': rng.uniform(0, amount),
+            }
+
+    return lines, move_map, partner_map, account_map, reconciliation_map
+
+
+def time_it(func, repeat, **kwargs):
+    """Ejecuta la función `repeat` veces y retorna la mediana en segundos."""
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(**kwargs)
+        times.append(time.perf_counter() - start)
+    return statistics.median(times)
+
+
+def main():
+    n_lines = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    lines, move_map, partner_map, account_map, reconciliation_map = build_dataset(n_lines)
+    service = TreasuryService(None)
+
+    scenarios = [
+        ('Sin corte', {'cutoff_date': None, 'include_reconciled': False}),
+        ('Corte 2024-06-30', {'cutoff_date': '2024-06-30', 'include_reconciled': False}),
+        ('Corte 2024-06-30 + conciliados', {'cutoff_date': '2024-06-30', 'include_reconciled': True}),
+    ]
+
+    print(f"\n📊 Benchmark _process_payable_lines ({n_lines} líneas)")
+    print("=" * 60)
+
+    all_ok = True
+    for label, options in scenarios:
+        kwargs = dict(
+            lines=lines, move_map=move_map, partner_map=partner_map,
+            account_map=account_map, reconciliation_map=reconciliation_map, **options
+        )
+        expected = process_payable_lines_reference(**kwargs)
+        actual = service._process_payable_lines(**kwargs)
+        identical = expected == actual and all(list(a) == list(e) for a, e in zip(actual, expected))
+        all_ok = all_ok and identical
+
+        t_ref = time_it(process_payable_lines_reference, 5, **kwargs)
+        t_new = time_it(service._process_payable_lines, 5, **kwargs)
+
+        status_icon = "✅" if identical else "❌"
+        print(f"  {status_icon} {label}: {len(actual)} filas | "
+              f"fila por fila {t_ref * 1000:.1f} ms | lotes {t_new * 1000:.1f} ms | "
+              f"x{t_ref / t_new:.2f}")
+
+    if not all_ok:
+        print("\n❌ FAIL: la salida difiere de la implementación de referencia")
+        sys.exit(1)
+    print("\n✅ PASS: salida idéntica en todos los escenarios")
+
+
+if __name__ == '__main__':
+    main()
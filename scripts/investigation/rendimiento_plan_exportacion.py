@@ -0,0 +1,135 @@
+# -*- coding: utf-8 -*-
+"""
+Costo por fila de las exportaciones: conversión por celda vs plan compilado.
+
+Compara, con filas sintéticas del reporte CxC (mismas columnas que el Excel):
+  - Legado: la lógica por celda del exportador original (listas de claves
+    numéricas recorridas en cada celda, chequeos Many2One/None).
+  - Por celda: tipo de columna resuelto en cada celda (COLUMN_KINDS por clave).
+  - Plan: conversores resueltos una vez por columna (ExportPlan).
+Y el costo completo de escribir xlsx (con y sin hojas resumen) y csv con el plan.
+
+Uso:
+    python scripts/investigation/rendimiento_plan_exportacion.py [filas]
+"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from app.core.calculators import clasificar_antiguedad
+from app.exports.excel_service import ExcelExportService
+from app.exports.export_plan import COLUMN_KINDS, ExportPlan
+from app.exports.tabular_service import TabularExportService
+
+COLUMNS = ExcelExportService.COLLECTIONS_COLUMNS
+
+LEGACY_NUMERIC = ['amount_currency', 'amount_residual_with_retention', 'amount_residual_signed',
+                  'amount_total', 'debit', 'credit', 'amount_residual_historical',
+                  'paid_after_cutoff', 'dias_vencido']
+
+
+def sample_rows(count):
+    random.seed(42)
+    rows = []
+    for i in range(count):
+        row = {}
+        for key, _, kind, _ in COLUMNS:
+            if kind == 'money':
+                row[key] = round(random.uniform(-5000, 50000), 2)
+            elif kind == 'days':
+                row[key] = random.randint(-30, 400)
+            elif kind == 'status':
+                row[key] = random.choice(['VENCIDO', 'VIGENTE'])
+            elif key in ('patner_id', 'currency_id', 'invoice_payment_term_id'):
+                row[key] = [i, f'Valor {i % 97}']
+            else:
+                row[key] = random.choice([f'Texto {i % 131}', None, False])
+        # Agrupaciones con cardinalidad realista (pocas cuentas, un RUC por cliente)
+        code = random.choice(['1212', '1213', '1232', '1312'])
+        row['account_id/code'] = code
+        row['account_id/name'] = f'Cuenta {code}'
+        row['patner_id/vat'] = f'20{i % 97:09d}'
+        row['antiguedad'] = clasificar_antiguedad(row['dias_vencido'])
+        rows.append(row)
+    return rows
+
+
+def legacy_values(record):
+    values = []
+    for key, _, _, _ in COLUMNS:
+        value = record.get(key, '')
+        if isinstance(value, (list, tuple)) and len(value) >= 2:
+            value = str(value[1])
+        elif isinstance(value, (list, tuple)):
+            value = str(value[0]) if value else ''
+        if value is None:
+            value = ''
+        if key in LEGACY_NUMERIC:
+            try:
+                value = float(value) if value else 0
+                if key == 'dias_vencido':
+                    value = int(value)
+            except Exception:
+                value = 0
+        values.append(value)
+    return values
+
+
+def per_cell_values(record):
+    values = []
+    for key, _, kind, _ in COLUMNS:
+        values.append(COLUMN_KINDS[kind].convert(record.get(key, '')))
+    return values
+
+
+def measure(name, rows, func, baseline=None):
+    start = time.perf_counter()
+    func()
+    elapsed = time.perf_counter() - start
+    per_row = elapsed / len(rows) * 1e6
+    ratio = f" ({baseline / per_row:.1f}x)" if baseline else ""
+    print(f"  {name:<32} {elapsed * 1000:9.1f} ms  {per_row:7.2f} µs/fila{ratio}")
+    return per_row
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    rows = sample_rows(count)
+    plan = ExportPlan.compile(COLUMNS)
+    print(f"\n📊 {count} filas x {len(COLUMNS)} columnas ({count * len(COLUMNS)} celdas)")
+    print("=" * 72)
+
+    print("\nConversión de valores:")
+    base = measure('Legado (por celda)', rows, lambda: [legacy_values(r) for r in rows])
+    measure('Tipo resuelto por celda', rows, lambda: [per_cell_values(r) for r in rows], base)
+    measure('Plan compilado (Excel)', rows, lambda: [plan.values(r) for r in rows], base)
+    measure('Plan compilado (CSV/Arrow)', rows, lambda: [plan.typed_values(r) for r in rows], base)
+
+    print("\nArchivo completo con el plan:")
+    measure('xlsx (write_only)', rows, lambda: ExcelExportService.write_report(rows, COLUMNS, 'CxC').close())
+    measure('xlsx + hojas resumen', rows, lambda: ExcelExportService.write_report(
+        rows, COLUMNS, 'CxC', summaries=ExcelExportService.collections_summaries()).close())
+
+    measure('csv', rows, lambda: sum(len(c) for c in TabularExportService.iter_csv(rows, COLUMNS)))
+    if TabularExportService.is_available('parquet'):
+        import tempfile
+        with tempfile.TemporaryFile() as output:
+            measure('parquet', rows, lambda: TabularExportService.write(rows, COLUMNS, 'parquet', output))
+
+    print("\nAcumuladores de las hojas resumen (sin escribir):")
+    values = [plan.values(r) for r in rows]
+
+    def accumulate():
+        accumulators = [s.bind(plan) for s in ExcelExportService.collections_summaries()]
+        for v in values:
+            for add in accumulators:
+                add(v)
+    measure('por cuenta, antigüedad y cliente', rows, accumulate)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+Costo por destinatario de armar los correos de aceptación de letras.
+
+Compara, sin enviar nada por SMTP:
+  - Anterior: Environment Jinja nuevo por correo (recompila el template),
+    logo leído de disco por correo y strptime por fecha de cada letra.
+  - Actual: entorno del proceso, logo precargado y fechas memoizadas
+    (EmailService._render_email_template / _get_inline_asset / _format_odoo_date).
+Verifica que el HTML generado sea idéntico.
+
+Uso:
+    python scripts/investigation/rendimiento_render_correos.py [destinatarios]
+"""
+
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from jinja2 import Environment, FileSystemLoader
+
+from app import create_app
+from app.emails.email_service import EmailService, _format_odoo_date
+
+
+def sample_recipients(count, letters_per_recipient=4):
+    random.seed(7)
+    base = datetime(2026, 1, 1)
+    recipients = []
+    for i in range(count):
+        letters = []
+        for j in range(letters_per_recipient):
+            due = base + timedelta(days=random.randint(0, 120))
+            letters.append({
+                'id': i * 100 + j,
+                'number': f'LT-{i:04d}-{j}',
+                'due_date': due.strftime('%Y-%m-%d'),
+                'invoice_date': (due - timedelta(days=60)).strftime('%Y-%m-%d'),
+                'amount': round(random.uniform(500, 20000), 2),
+                'ref_docs': f'F001-{i * 10 + j:06d}',
+                'status_calc': 'Por aceptar',
+            })
+        recipients.append({'email': f'cliente{i}@example.com', 'name': f'Cliente {i}', 'letters': letters})
+    return recipients
+
+
+def legacy_build(service, recipient, today):
+    letters = []
+    for l in recipient['letters']:
+        letter_copy = l.copy()
+        for field in ('due_date', 'invoice_date'):
+            letter_copy[field] = datetime.strptime(l[field], '%Y-%m-%d').strftime('%d/%m/%Y')
+        letters.append(letter_copy)
+    env = Environment(loader=FileSystemLoader(str(service._get_frontend_templates_dir())))
+    html = env.get_template('letters_acceptance.html').render(
+        customer_name=recipient['name'], letters=letters, today=today)
+    logo_path = os.path.join(service._get_frontend_templates_dir(), '..', *EmailService.LOGO_ASSET)
+    with open(logo_path, 'rb') as f:
+        logo = f.read()
+    return html, logo
+
+
+def cached_build(service, recipient, today):
+    letters = []
+    for l in recipient['letters']:
+        letter_copy = l.copy()
+        for field in ('due_date', 'invoice_date'):
+            letter_copy[field] = _format_odoo_date(l[field])
+        letters.append(letter_copy)
+    html = service._render_email_template(
+        'letters_acceptance.html', customer_name=recipient['name'], letters=letters, today=today)
+    return html, service._get_inline_asset(*EmailService.LOGO_ASSET)
+
+
+def measure(name, recipients, build, baseline=None):
+    start = time.perf_counter()
+    outputs = [build(r) for r in recipients]
+    elapsed = time.perf_counter() - start
+    per_email = elapsed / len(recipients) * 1e6
+    ratio = f" ({baseline / per_email:.1f}x)" if baseline else ""
+    print(f"  {name:<12} {elapsed * 1000:9.1f} ms  {per_email:9.1f} µs/correo{ratio}")
+    return per_email, outputs
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    recipients = sample_recipients(count)
+    app = create_app()
+    with app.app_context():
+        service = EmailService()
+        today = '19/10/2026'
+        print(f"\n📧 {count} destinatarios x {len(recipients[0]['letters'])} letras")
+        print("=" * 60)
+        base, legacy = measure('Anterior', recipients, lambda r: legacy_build(service, r, today))
+        _, cached = measure('Con caché', recipients, lambda r: cached_build(service, r, today), base)
+        print(f"\n  HTML y logo idénticos: {legacy == cached}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+# -*- coding: utf-8 -*-
+"""
+Latencia del reporte neteado (view_treasury_netted_report): warehouse local vs Supabase.
+
+El warehouse local se llena con el mismo ETL apuntando a SQLite:
+    WAREHOUSE_BACKEND=sqlite python scripts/etl/etl_netted_sync.py
+
+Uso:
+    python scripts/investigation/rendimiento_warehouse_local.py [repeticiones] [proveedor]
+
+Mide con SUPABASE_URL/SUPABASE_KEY si están definidas; si no, solo el local.
+"""
+
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+
+from scripts.etl import settings
+from scripts.etl.warehouse import create_warehouse_client
+
+
+def netted_report(client, supplier=None):
+    """Misma consulta que TreasuryService.get_netted_report_from_supabase."""
+    query = client.table('view_treasury_netted_report').select("*")
+    if supplier:
+        query = query.ilike('supplier_name', f'%{supplier}%')
+    return query.order('date_emitted', desc=True).execute().data
+
+
+def measure(name, client, repetitions, supplier=None):
+    print(f"\n📊 {name}")
+    print("=" * 60)
+    times = []
+    rows = 0
+    for i in range(repetitions):
+        start = time.perf_counter()
+        rows = len(netted_report(client, supplier))
+        times.append(time.perf_counter() - start)
+        print(f"  Consulta {i + 1}: {times[-1] * 1000:.1f} ms - {rows} filas")
+
+    ordered = sorted(times)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(f"\n📈 {name}: media {statistics.mean(times) * 1000:.1f} ms, "
+          f"mediana {statistics.median(times) * 1000:.1f} ms, p95 {p95 * 1000:.1f} ms ({rows} filas)")
+    return statistics.median(times)
+
+
+def main():
+    repetitions = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    supplier = sys.argv[2] if len(sys.argv) > 2 else None
+
+    local = create_warehouse_client('sqlite', sqlite_path=settings.WAREHOUSE_SQLITE_PATH)
+    results = {'local': measure(f'Warehouse local ({local.path})', local, repetitions, supplier)}
+
+    if settings.SUPABASE_URL and settings.SUPABASE_KEY:
+        remote = create_warehouse_client('supabase', settings.SUPABASE_URL, settings.SUPABASE_KEY)
+        results['supabase'] = measure('Supabase', remote, repetitions, supplier)
+        print(f"\n⚡ Local es {results['supabase'] / results['local']:.1f}x más rápido (mediana)")
+    else:
+        print("\n[WARN] Sin SUPABASE_URL / SUPABASE_KEY: solo se midió el warehouse local")
+
+
+if __name__ == '__main__':
+    main()